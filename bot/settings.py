@@ -1,5 +1,7 @@
 from pathlib import Path
 import os
+import tempfile
+from urllib.parse import urlparse, unquote, parse_qsl
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -54,12 +56,35 @@ WSGI_APPLICATION = 'bot.wsgi.application'
 
 
 # Default DB (Not used for Supabase)
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Holds the job queue, dead letters and Batch API records (myapp/models.py),
+# which the web process and every worker must see. Set DATABASE_URL to a
+# Postgres database (e.g. the Supabase connection string) whenever more than
+# one machine or dyno runs; the SQLite file is per machine and only fit for a
+# single-node setup (workers and batch commands refuse to run on it)
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+if DATABASE_URL:
+    _database_url = urlparse(DATABASE_URL)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': _database_url.path.lstrip('/'),
+            'USER': unquote(_database_url.username or ''),
+            'PASSWORD': unquote(_database_url.password or ''),
+            'HOST': _database_url.hostname or '',
+            'PORT': _database_url.port or '',
+            'OPTIONS': dict(parse_qsl(_database_url.query)),  # e.g. ?sslmode=require
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Pipeline threads write concurrently; wait for the lock instead of failing
+            'OPTIONS': {'timeout': 20},
+        }
     }
-}
 
 
 # Email Configuration
@@ -106,3 +131,170 @@ LOGGING = {
         'level': 'INFO',
     },
 }
+
+
+# ===============================
+# ⚙️ ASSESSMENT PROCESSOR CONFIG
+# ===============================
+
+# Rows claimed per poll, scaled between these bounds by the backlog depth
+# The maximum also caps how many assessments are in the pipeline at once
+# (keep it small enough to finish within ASSESSMENT_LEASE_SECONDS)
+ASSESSMENT_MIN_BATCH_SIZE = int(os.getenv('ASSESSMENT_MIN_BATCH_SIZE', 5))
+ASSESSMENT_MAX_BATCH_SIZE = int(os.getenv('ASSESSMENT_MAX_BATCH_SIZE', 25))
+
+# Worker threads per pipeline stage (see myapp/pipeline.py)
+ASSESSMENT_STAGE_CONCURRENCY = {
+    'analysis': int(os.getenv('ASSESSMENT_ANALYSIS_CONCURRENCY', 4)),
+    'pdf': int(os.getenv('ASSESSMENT_PDF_CONCURRENCY', 2)),
+    'email': int(os.getenv('ASSESSMENT_EMAIL_CONCURRENCY', 2)),
+}
+
+# Capacity of each stage's queue; a full queue blocks the stage feeding it
+ASSESSMENT_STAGE_QUEUE_SIZE = int(os.getenv('ASSESSMENT_STAGE_QUEUE_SIZE', 10))
+
+# How long a claimed assessment stays leased to one worker before others may reclaim it
+ASSESSMENT_LEASE_SECONDS = int(os.getenv('ASSESSMENT_LEASE_SECONDS', 600))
+
+# Idle polling backs off exponentially from the minimum to the maximum interval
+# (seconds); while there is a backlog the processor polls back-to-back
+ASSESSMENT_MIN_POLL_SECONDS = int(os.getenv('ASSESSMENT_MIN_POLL_SECONDS', 2))
+ASSESSMENT_MAX_POLL_SECONDS = int(os.getenv('ASSESSMENT_MAX_POLL_SECONDS', 300))
+
+# Direct Postgres connection for LISTEN/NOTIFY wakeups (see myapp/sql/002_assessment_notify.sql)
+# When set, the processor wakes immediately on insert and idle polling is capped
+# by ASSESSMENT_SAFETY_POLL_SECONDS instead, as a safety net
+SUPABASE_DB_URL = os.getenv('SUPABASE_DB_URL')
+ASSESSMENT_NOTIFY_CHANNEL = 'ki_check_submissions_new'
+ASSESSMENT_SAFETY_POLL_SECONDS = int(os.getenv('ASSESSMENT_SAFETY_POLL_SECONDS', 900))
+
+# Run the processor inside every web worker (apps.py). Set to false when running
+# `python manage.py run_assessment_worker` as a separate process / dyno
+ASSESSMENT_EMBEDDED_PROCESSOR = os.getenv('ASSESSMENT_EMBEDDED_PROCESSOR', 'true').lower() == 'true'
+
+# Job queue retries (see myapp/job_queue.py): failed assessments are retried with
+# exponential backoff and moved to dead letters after ASSESSMENT_MAX_ATTEMPTS
+ASSESSMENT_MAX_ATTEMPTS = int(os.getenv('ASSESSMENT_MAX_ATTEMPTS', 5))
+ASSESSMENT_RETRY_BASE_SECONDS = int(os.getenv('ASSESSMENT_RETRY_BASE_SECONDS', 60))
+ASSESSMENT_RETRY_MAX_SECONDS = int(os.getenv('ASSESSMENT_RETRY_MAX_SECONDS', 6 * 3600))
+
+
+# ===============================
+# 🤖 AI ANALYSIS CONFIG
+# ===============================
+
+# Content-addressed cache of ChatGPT analyses (see myapp/analysis_cache.py)
+# In-process LRU with TTL, plus an optional shared tier from CACHES below
+AI_ANALYSIS_CACHE_ENABLED = os.getenv('AI_ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+AI_ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('AI_ANALYSIS_CACHE_MAX_ENTRIES', 256))
+AI_ANALYSIS_CACHE_TTL = int(os.getenv('AI_ANALYSIS_CACHE_TTL', 7 * 24 * 3600))
+
+# Alias in CACHES shared by all workers ('' disables the shared tier).
+# Use 'django.core.cache.backends.db.DatabaseCache' (+ manage.py createcachetable)
+# to share analyses across nodes
+AI_ANALYSIS_SHARED_CACHE = os.getenv('AI_ANALYSIS_SHARED_CACHE', 'analysis')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analysis': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('AI_ANALYSIS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ki_analysis_cache')),
+        'TIMEOUT': AI_ANALYSIS_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Stream the ChatGPT answer and report each section as soon as it is complete
+AI_ANALYSIS_STREAMING = os.getenv('AI_ANALYSIS_STREAMING', 'true').lower() == 'true'
+
+# Backlog mode (see myapp/batch_analysis.py): once this many assessments are
+# pending, the processor submits them as one OpenAI Batch job instead of
+# analysing them one by one (0 disables; ?mode=batch on process-pending and
+# `manage.py run_analysis_batch` work either way). Set OPENAI_BASE_URL to
+# test against a local stub of the files / batches endpoints
+AI_BATCH_BACKLOG_THRESHOLD = int(os.getenv('AI_BATCH_BACKLOG_THRESHOLD', 200))
+AI_BATCH_MAX_REQUESTS = int(os.getenv('AI_BATCH_MAX_REQUESTS', 1000))
+AI_BATCH_COMPLETION_WINDOW = os.getenv('AI_BATCH_COMPLETION_WINDOW', '24h')
+AI_BATCH_LEASE_SECONDS = int(os.getenv('AI_BATCH_LEASE_SECONDS', 25 * 3600))
+AI_BATCH_POLL_SECONDS = int(os.getenv('AI_BATCH_POLL_SECONDS', 300))
+
+# OpenAI account limits for the token-bucket limiter (see myapp/rate_limit.py).
+# Calls wait for capacity instead of failing with 429 (0 disables a limit).
+# Tokens are estimated as prompt + AI_EXPECTED_COMPLETION_TOKENS and corrected
+# with the real usage afterwards
+AI_RATE_LIMIT_RPM = int(os.getenv('AI_RATE_LIMIT_RPM', 500))
+AI_RATE_LIMIT_TPM = int(os.getenv('AI_RATE_LIMIT_TPM', 30000))
+AI_EXPECTED_COMPLETION_TOKENS = int(os.getenv('AI_EXPECTED_COMPLETION_TOKENS', 2500))
+
+# Maximum concurrent requests of the async service (0 = unlimited), used when
+# /process/pending/ analyses the pending assessments together
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 8))
+
+# The limiter counts per process: set this to the number of processes that
+# call OpenAI (web workers + dedicated run_assessment_worker processes);
+# each gets an equal share of the limits
+AI_RATE_LIMIT_PROCESSES = int(os.getenv('AI_RATE_LIMIT_PROCESSES', 1))
+
+# Token budgets of the compact analysis prompt (see myapp/prompt_builder.py):
+# per prompt section and per answer; long lists and free text are cut to fit
+AI_PROMPT_SECTION_TOKENS = int(os.getenv('AI_PROMPT_SECTION_TOKENS', 300))
+AI_PROMPT_FIELD_TOKENS = int(os.getenv('AI_PROMPT_FIELD_TOKENS', 120))
+
+# Request the analysis as several smaller parallel calls (assessment, use
+# cases, plan) merged into one result: lower latency, slightly more input tokens
+AI_ANALYSIS_FAN_OUT = os.getenv('AI_ANALYSIS_FAN_OUT', 'false').lower() == 'true'
+
+# Resilience of the OpenAI calls (see myapp/resilience.py)
+# Overall deadline per request; a hung request falls back instead of blocking a worker
+AI_REQUEST_DEADLINE_SECONDS = int(os.getenv('AI_REQUEST_DEADLINE_SECONDS', 120))
+# Send a second identical request once the first is slower than the p95 latency
+AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'false').lower() == 'true'
+AI_HEDGE_PERCENTILE = int(os.getenv('AI_HEDGE_PERCENTILE', 95))
+AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', 20))
+# Open the circuit after this many consecutive failures, probe again after the reset time
+AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('AI_CIRCUIT_FAILURE_THRESHOLD', 5))
+AI_CIRCUIT_RESET_SECONDS = int(os.getenv('AI_CIRCUIT_RESET_SECONDS', 60))
+# While the circuit is open: 'defer' the assessment (job queue retries it later
+# without using up an attempt) or send the 'fallback' analysis
+AI_CIRCUIT_OPEN_ACTION = os.getenv('AI_CIRCUIT_OPEN_ACTION', 'defer')
+
+# Compute strengths, weaknesses, strongest / weakest areas and quick-win
+# candidates locally from the rated answers (see myapp/pre_analysis.py) and
+# let the model only write the narrative
+AI_PRE_ANALYSIS = os.getenv('AI_PRE_ANALYSIS', 'true').lower() == 'true'
+
+# Reuse the analysis of a near-duplicate submission (same industry and company
+# size, cosine similarity of the hashed answer vectors above the threshold)
+# instead of calling the model; see myapp/similarity.py
+AI_SIMILARITY_ENABLED = os.getenv('AI_SIMILARITY_ENABLED', 'false').lower() == 'true'
+AI_SIMILARITY_THRESHOLD = float(os.getenv('AI_SIMILARITY_THRESHOLD', 0.98))
+AI_SIMILARITY_MAX_ENTRIES = int(os.getenv('AI_SIMILARITY_MAX_ENTRIES', 5000))
+
+# Model tiers by submission richness (see myapp/model_routing.py): the tier
+# with the highest min_richness not above the submission's richness (0..1) wins
+AI_MODEL_ROUTING = os.getenv('AI_MODEL_ROUTING', 'true').lower() == 'true'
+AI_MODEL_TIERS = [
+    {'name': 'light', 'model': os.getenv('AI_LIGHT_MODEL', 'gpt-4o-mini'), 'min_richness': 0.0},
+    {'name': 'full', 'model': os.getenv('AI_FULL_MODEL', 'gpt-4o'),
+     'min_richness': float(os.getenv('AI_FULL_MODEL_MIN_RICHNESS', 0.4))},
+]
+
+# PDF rendering in worker processes (see myapp/pdf_pool.py), so report layout
+# does not compete with the web requests for the GIL; 0 renders in-process.
+# Workers are replaced after MAX_TASKS_PER_CHILD reports, and a report that
+# takes longer than the timeout fails (the stuck worker is killed)
+PDF_RENDER_PROCESSES = int(os.getenv('PDF_RENDER_PROCESSES', 2))
+PDF_RENDER_TIMEOUT_SECONDS = int(os.getenv('PDF_RENDER_TIMEOUT_SECONDS', 60))
+PDF_RENDER_MAX_TASKS_PER_CHILD = int(os.getenv('PDF_RENDER_MAX_TASKS_PER_CHILD', 100))
+
+# Lay out the static title page, headings and footer once per template version
+# and only stamp the company data and score per report (see myapp/pdf_templates.py)
+PDF_TEMPLATE_MODE = os.getenv('PDF_TEMPLATE_MODE', 'true').lower() == 'true'
+
+# Rendered reports are spooled to files here until their email is sent
+# (see myapp/pdf_artifacts.py); files older than the max age are left-overs
+# of crashed workers and are removed on startup
+PDF_ARTIFACT_DIR = os.getenv('PDF_ARTIFACT_DIR', os.path.join(tempfile.gettempdir(), 'ki_reports'))
+PDF_ARTIFACT_MAX_AGE_SECONDS = int(os.getenv('PDF_ARTIFACT_MAX_AGE_SECONDS', 86400))
@@ -30,5 +30,9 @@ urlpatterns = [
     path('process/latest/', process_latest_assessment, name='process_latest'),
     path('process/<str:assessment_id>/', process_assessment_by_id, name='process_by_id'),
 
+    # Non-blocking webhook (202 Accepted) and job status
+    path('webhook/new-assessment/', webhook_new_assessment, name='webhook_new_assessment'),
+    path('status/<str:assessment_id>/', assessment_status, name='assessment_status'),
+
 
 ]
@@ -1,3 +1,34 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AssessmentJob, DeadLetterJob, AnalysisBatch
+
+
+@admin.register(AssessmentJob)
+class AssessmentJobAdmin(admin.ModelAdmin):
+    list_display = ('assessment_id', 'status', 'attempts', 'max_attempts', 'next_attempt_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('assessment_id',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(DeadLetterJob)
+class DeadLetterJobAdmin(admin.ModelAdmin):
+    list_display = ('assessment_id', 'attempts', 'failed_at', 'last_error')
+    search_fields = ('assessment_id', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description='Erneut in die Warteschlange stellen')
+    def requeue(self, request, queryset):
+        from .job_queue import requeue_dead
+
+        for dead in queryset:
+            requeue_dead(dead.assessment_id)
+        self.message_user(request, f"{queryset.count()} Job(s) erneut eingereiht")
+
+
+@admin.register(AnalysisBatch)
+class AnalysisBatchAdmin(admin.ModelAdmin):
+    list_display = ('batch_id', 'status', 'request_count', 'succeeded', 'failed', 'created_at', 'completed_at')
+    list_filter = ('status',)
+    search_fields = ('batch_id',)
+    readonly_fields = ('created_at', 'completed_at')
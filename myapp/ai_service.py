@@ -1,197 +1,358 @@
-from openai import OpenAI
-from typing import Dict, Any
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import os
+import asyncio
+import contextlib
+import time
+import weakref
+from itertools import chain
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from django.conf import settings
 import json
+import logging
+from .analysis_cache import AnalysisCache, get_analysis_cache
+from .json_stream import IncrementalObjectParser
+from .rate_limit import get_rate_limiter, estimate_request_tokens
+from .prompt_builder import build_messages, SECTION_GROUPS
+from .pre_analysis import pre_analyze
+from .similarity import find_reusable_analysis, remember_analysis
+from .model_routing import route, get_tier_metrics
+from .resilience import (
+    ProviderUnavailable, DeadlineExceeded, FIRST_CHUNK, get_circuit_breaker, get_latency_tracker,
+    hedge_delay, hedged_call, hedged_call_async
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class AIReadinessService:
     def __init__(self):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
         self.client = OpenAI(api_key=api_key)
+        # For deadline-bounded calls: the SDK retries twice by default, timeouts
+        # included, which would stretch a call to about three deadlines plus
+        # backoff. The job queue retries failed assessments instead
+        self.bounded_client = self.client.with_options(max_retries=0)
     
-    def _extract_text_from_raw(self, raw_value):
-        """Extract text from raw_answers format"""
-        if isinstance(raw_value, dict) and 'text' in raw_value:
-            return raw_value['text']
-        elif isinstance(raw_value, list):
-            return [item.get('text', str(item)) if isinstance(item, dict) else str(item) for item in raw_value]
-        return str(raw_value) if raw_value else 'N/A'
-    
-    def _extract_values_from_raw(self, raw_value):
-        """Extract values (ratings) from raw_answers format"""
-        if isinstance(raw_value, list):
-            values = []
-            for item in raw_value:
-                if isinstance(item, dict):
-                    if 'text' in item:
-                        text = item['text']
-                        value = item.get('value', 0)
-                        values.append(f"{text} (Bewertung: {value})")
-            return values if values else [str(item) for item in raw_value]
-        return []
-    
-    def analyze_assessment(self, assessment_data: Dict[Any, Any]) -> Dict[str, Any]:
+    def analyze_assessment(self, assessment_data: Dict[Any, Any],
+                           on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
         """
         Main method to analyze assessment data
         This is called from your views
         """
-        return self.analyze_from_supabase(assessment_data)
+        return self.analyze_from_supabase(assessment_data, on_section=on_section)
     
-    def analyze_from_supabase(self, assessment_data: Dict[Any, Any]) -> Dict[str, Any]:
+    def analyze_from_supabase(self, assessment_data: Dict[Any, Any],
+                              on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
         """
         Analyze assessment data from Supabase and generate comprehensive report in German
+        
+        If on_section is given the response is streamed and on_section(key, value)
+        is called for every top-level section (executive_summary, strengths, ...)
+        as soon as it is complete
+        
+        With AI_ANALYSIS_FAN_OUT the section groups are requested in parallel
+        and merged into the same result
+        
+        With AI_SIMILARITY_ENABLED the analysis of a near-duplicate submission
+        is reused instead (see similarity.py)
         """
+        reused = self._reuse_similar(find_reusable_analysis(assessment_data), on_section)
+        if reused is not None:
+            return reused
         
-        # Extract raw_answers for more detailed analysis
-        raw_answers = assessment_data.get('raw_answers', {})
+        if getattr(settings, 'AI_ANALYSIS_FAN_OUT', False):
+            return self._analyze_fan_out(assessment_data, on_section)
         
-        # Build comprehensive prompt from Supabase data
-        prompt = f"""Analysiere diese umfassende KI-Readiness-Bewertung und erstelle einen detaillierten Bericht AUF DEUTSCH.
-
-UNTERNEHMENSDATEN:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Unternehmensname: {assessment_data.get('company_name', 'N/A')}
-• Branche: {assessment_data.get('industry') or 'Nicht angegeben'}
-• Unternehmensgröße: {assessment_data.get('company_size') or 'Nicht angegeben'}
-• Umsatz: {assessment_data.get('revenue') or 'Nicht angegeben'}
-
-HAUPTZIELE & STRATEGIE:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Hauptziele mit Priorität: {', '.join(self._extract_values_from_raw(raw_answers.get('mainGoal', [])))}
-• Dringlichkeit: {assessment_data.get('urgency') or 'Nicht angegeben'}
-• Budget: {assessment_data.get('budget') or 'Nicht angegeben'}
-• Verantwortliche Person: {assessment_data.get('responsible_person') or 'Nicht angegeben'}
-
-AKTUELLE PROZESSE & HERAUSFORDERUNGEN:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Prioritätsprozesse mit Bewertung: {', '.join(self._extract_values_from_raw(raw_answers.get('priorityProcesses', [])))}
-• Schmerzpunkte mit Intensität: {', '.join(self._extract_values_from_raw(raw_answers.get('painPoints', [])))}
-• Detaillierte Herausforderungen: {self._extract_text_from_raw(raw_answers.get('detailedChallenges', 'N/A'))}
-• Wiederkehrende Aufgaben mit Häufigkeit: {', '.join(self._extract_values_from_raw(raw_answers.get('recurringTasks', [])))}
-
-TECHNOLOGIE-STACK:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• CRM-System: {assessment_data.get('crm_system') or 'Keines'}
-• Marketing-Tools mit Nutzungsintensität: {', '.join(self._extract_values_from_raw(raw_answers.get('marketingTools', [])))}
-• Service-Tools mit Nutzungsintensität: {', '.join(self._extract_values_from_raw(raw_answers.get('serviceTools', [])))}
-• Datenquellen mit Wichtigkeit: {', '.join(self._extract_values_from_raw(raw_answers.get('dataSources', [])))}
-• API-Zugang: {assessment_data.get('api_access') or 'Nicht angegeben'}
-
-AKTUELLE METRIKEN:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Monatliche Leads: {assessment_data.get('monthly_leads', 'N/A')}
-• Monatliche Tickets: {assessment_data.get('monthly_tickets', 'N/A')}
-• Gewünschte Ergebnisse mit Priorität: {', '.join(self._extract_values_from_raw(raw_answers.get('desiredOutputs', [])))}
-
-ANFORDERUNGEN & PRÄFERENZEN:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Datenschutz-Wichtigkeit: {assessment_data.get('data_privacy_importance') or 'Nicht angegeben'}
-• Sprachen mit Wichtigkeit: {', '.join(self._extract_values_from_raw(raw_answers.get('languages', [])))}
-• Erfolgsmetriken mit Priorität: {', '.join(self._extract_values_from_raw(raw_answers.get('successMetrics', [])))}
-• Team-Akzeptanz: {assessment_data.get('team_acceptance') or 'Nicht angegeben'}
-
-ZUSÄTZLICHE INFORMATIONEN:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Bisherige Erfahrung: {raw_answers.get('previousExperience', 'Nicht angegeben')}
-• Gewünschte Implementierungsgeschwindigkeit: {raw_answers.get('implementationSpeed', 'Nicht angegeben')}
-• Größte Sorge: {raw_answers.get('biggestConcern', 'Nicht angegeben')}
-• Zusätzliche Infos: {self._extract_text_from_raw(raw_answers.get('additionalInfo', 'Keine'))}
-
-WICHTIG: 
-- Der Score {assessment_data.get('calculated_score', 50)} wurde bereits berechnet (0-100 Skala)
-- Berücksichtige die Bewertungen (value) in den Antworten - höhere Werte bedeuten höhere Priorität/Intensität
-- Erstelle eine VOLLSTÄNDIGE Analyse AUF DEUTSCH
-
-Analysiere basierend auf allen bereitgestellten Informationen:
-1. Die aktuelle digitale Reife und KI-Bereitschaft (nutze den Score {assessment_data.get('calculated_score', 50)})
-2. Konkrete Stärken basierend auf hohen Bewertungen (value >= 4)
-3. Verbesserungsbereiche basierend auf niedrigen Bewertungen
-4. Spezifische KI-Anwendungsfälle, die zu den priorisierten Prozessen passen
-5. Sofort umsetzbare Quick Wins (3-6 Monate) basierend auf wiederkehrenden Aufgaben
-6. Langfristige strategische Schritte
-7. Konkrete Empfehlungen basierend auf Budget, Dringlichkeit und Team-Akzeptanz
-
-Gib deine Antwort als JSON-Objekt mit folgenden Feldern zurück:
-
-{{
-  "score": {assessment_data.get('calculated_score', 50)} (übernimm diesen Wert),
-  "score_level": "Hoch" | "Mittel" | "Niedrig" (basierend auf Score: >=70=Hoch, 40-69=Mittel, <40=Niedrig),
-  "executive_summary": "2-3 Sätze Zusammenfassung auf Deutsch, die die Hauptstärken und wichtigsten Handlungsfelder hervorhebt",
-  "strengths": ["Konkrete Stärke 1", "Konkrete Stärke 2", ...] (4-6 Punkte auf Deutsch, fokussiere auf Bereiche mit hohen Bewertungen),
-  "weaknesses": ["Konkrete Schwäche 1", "Konkrete Schwäche 2", ...] (4-6 Punkte auf Deutsch, fokussiere auf Lücken und niedrige Bewertungen),
-  "recommended_use_cases": [
-    {{
-      "title": "Präziser Titel des Use Case",
-      "description": "Detaillierte Beschreibung wie dieser Use Case das Unternehmen konkret unterstützt",
-      "impact": "Konkreter erwarteter Impact mit Zahlen wenn möglich",
-      "effort": "Gering" | "Mittel" | "Hoch",
-      "priority": "Sofort" | "Kurzfristig" | "Langfristig"
-    }},
-    ... (6-8 Use Cases, priorisiert nach den Hauptzielen)
-  ],
-  "quick_wins": [
-    {{
-      "title": "Konkreter Quick Win Titel",
-      "description": "Detaillierte Beschreibung was genau zu tun ist",
-      "timeframe": "Konkreter Zeitrahmen (z.B. 2-3 Monate)",
-      "expected_benefit": "Konkreter erwarteter Nutzen mit messbaren Ergebnissen"
-    }},
-    ... (4-6 Quick Wins)
-  ],
-  "strategic_steps": [
-    {{
-      "phase": "Phase 1: Aussagekräftiger Name",
-      "description": "Detaillierte Beschreibung der Phase",
-      "timeframe": "Konkreter Zeitrahmen",
-      "key_actions": ["Konkrete Aktion 1", "Konkrete Aktion 2", ...]
-    }},
-    ... (3-4 Phasen)
-  ],
-  "budget_recommendation": "Konkrete Budget-Empfehlung mit Aufschlüsselung nach Phasen, wenn Budget angegeben wurde",
-  "next_actions": ["Nächster konkreter Schritt mit Verantwortlichkeit"] (4-5 Punkte)
-}}
-
-Gib NUR das JSON-Objekt zurück, keinen anderen Text."""
-
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Du bist ein erfahrener KI-Strategieberater mit Expertise in digitaler Transformation und Geschäftsprozessoptimierung. Du analysierst Bewertungsskalen genau und gibst präzise, umsetzbare Empfehlungen. Antworte IMMER auf Deutsch und nur mit validem JSON."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            
-            # Ensure score_level is set correctly for new scale
-            if 'score' in result:
-                score = result['score']
-                if score >= 70:
-                    result['score_level'] = "Hoch"
-                elif score >= 40:
-                    result['score_level'] = "Mittel"
-                else:
-                    result['score_level'] = "Niedrig"
-            
+            result = self._complete(self.build_request(assessment_data), on_section)
+            remember_analysis(assessment_data)
             return result
-            
+        except ProviderUnavailable as e:
+            return self._on_unavailable(e, assessment_data)
         except Exception as e:
-            print(f"Error in ChatGPT analysis: {str(e)}")
+            logger.error(f"❌ Error in ChatGPT analysis: {str(e)}")
             return self._get_fallback_analysis(assessment_data)
     
+    def _reuse_similar(self, reused: Optional[Dict[str, Any]],
+                       on_section: Optional[Callable[[str, Any], None]] = None) -> Optional[Dict[str, Any]]:
+        """Finish a personalised analysis taken over from a similar submission"""
+        if reused is None:
+            return None
+        self._normalize_score_level(reused)
+        if on_section:
+            for key, value in reused.items():
+                self._emit_section(on_section, key, value)
+        return reused
+    
+    def _on_unavailable(self, error: ProviderUnavailable, assessment_data: Dict[Any, Any]) -> Dict[str, Any]:
+        """
+        The circuit is open: re-raise so the job queue defers the assessment
+        (AI_CIRCUIT_OPEN_ACTION = 'defer') or answer with the fallback analysis
+        """
+        if getattr(settings, 'AI_CIRCUIT_OPEN_ACTION', 'defer') == 'defer':
+            raise error
+        logger.warning(f"⚠️  AI provider unavailable, using fallback: {str(error)}")
+        return self._get_fallback_analysis(assessment_data)
+    
+    def _complete(self, request: Dict[str, Any],
+                  on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """Run one (cached, rate limited) completion request and parse its JSON answer"""
+        cache, cache_key, cached = self._lookup_cache(request, on_section)
+        if cached is not None:
+            return cached
+        
+        # Fail fast while the provider is unhealthy
+        breaker = get_circuit_breaker()
+        breaker.check()
+        
+        # Stay below the account's RPM / TPM limits instead of provoking 429s
+        limiter = get_rate_limiter()
+        estimate = limiter.acquire(estimate_request_tokens(request))
+        deadline = getattr(settings, 'AI_REQUEST_DEADLINE_SECONDS', 0) or None
+        started = time.monotonic()
+        
+        calls = []
+        
+        def charge():
+            if calls:
+                # The hedged duplicate costs tokens as well
+                limiter.acquire(estimate)
+            calls.append(charge)
+        
+        try:
+            if on_section:
+                result, usage = self._complete_streaming(request, on_section, deadline, charge)
+            else:
+                def call():
+                    charge()
+                    return self._client(deadline).chat.completions.create(**request, timeout=deadline)
+                
+                response = hedged_call(call, deadline, hedge_delay(request['model']))
+                usage = response.usage
+            get_latency_tracker(request['model']).record(time.monotonic() - started)
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        self._record_usage(request, time.monotonic() - started, usage)
+        
+        if on_section:
+            self._normalize_score_level(result)
+        else:
+            result = self.parse_result(response.choices[0].message.content)
+        
+        limiter.settle(estimate, usage.total_tokens if usage else None)
+        
+        # Only real answers are cached, never the fallback
+        if cache:
+            cache.set(cache_key, result)
+        
+        return result
+    
+    def _analyze_fan_out(self, assessment_data: Dict[Any, Any],
+                         on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """One concurrent request per section group; wall time is the slowest group"""
+        with ThreadPoolExecutor(max_workers=len(SECTION_GROUPS)) as pool:
+            futures = {
+                name: pool.submit(self._complete, self.build_request(assessment_data, sections=keys), on_section)
+                for name, keys in SECTION_GROUPS
+            }
+            parts = {}
+            for name, future in futures.items():
+                try:
+                    parts[name] = future.result()
+                except Exception as e:
+                    parts[name] = e
+        
+        return self._merge_sections(assessment_data, parts)
+    
+    def _merge_sections(self, assessment_data: Dict[Any, Any], parts: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge the answers of the section groups into one analysis
+        Groups that failed (and keys a group left out) are filled from the
+        fallback analysis
+        """
+        merged = {}
+        fallback = self._get_fallback_analysis(assessment_data)
+        complete = True
+        
+        for name, keys in SECTION_GROUPS:
+            part = parts.get(name)
+            if isinstance(part, ProviderUnavailable):
+                self._on_unavailable(part, assessment_data)
+            if isinstance(part, Exception) or not isinstance(part, dict):
+                logger.error(f"❌ Error in ChatGPT analysis ({name}): {str(part)}")
+                part = fallback
+                complete = False
+            for key in keys:
+                merged[key] = part[key] if key in part else fallback[key]
+        
+        self._normalize_score_level(merged)
+        if complete:
+            remember_analysis(assessment_data)
+        return merged
+    
+    def _record_usage(self, request: Dict[str, Any], seconds: float, usage: Any):
+        """Per-tier metrics, including how much of the prompt the provider served from its cache"""
+        get_tier_metrics().record(request['model'], seconds, usage)
+        if usage is None:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', 0) or 0
+        if usage.prompt_tokens:
+            logger.debug(f"Prompt cache: {cached}/{usage.prompt_tokens} tokens cached ({cached / usage.prompt_tokens:.0%})")
+    
+    def _lookup_cache(self, request: Dict[str, Any],
+                      on_section: Optional[Callable[[str, Any], None]] = None) -> Tuple[Any, Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Identical prompt + model + parameters -> reuse the earlier analysis
+        Returns (cache, cache_key, cached analysis or None)
+        """
+        cache = get_analysis_cache()
+        if not cache:
+            return None, None, None
+        
+        cache_key = AnalysisCache.make_key(request)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached ChatGPT analysis")
+            if on_section:
+                for key, value in cached.items():
+                    self._emit_section(on_section, key, value)
+        return cache, cache_key, cached
+    
+    def build_request(self, assessment_data: Dict[Any, Any],
+                      sections: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        """
+        Build the chat completion request (model, messages, parameters)
+        Shared by the synchronous, streaming and Batch API paths
+        With `sections` only those keys of the analysis are requested
+        
+        With AI_PRE_ANALYSIS the rated answers are evaluated locally first
+        (pre_analysis.py) and the model only phrases the results
+        """
+        facts = pre_analyze(assessment_data) if getattr(settings, 'AI_PRE_ANALYSIS', True) else None
+        tier = route(assessment_data)
+        # Static, versioned prefix first (cacheable by the provider), assessment last
+        messages, prompt_tokens = build_messages(
+            assessment_data,
+            section_budget=getattr(settings, 'AI_PROMPT_SECTION_TOKENS', None),
+            field_budget=getattr(settings, 'AI_PROMPT_FIELD_TOKENS', None),
+            sections=sections,
+            facts=facts
+        )
+        logger.debug(f"Prompt built: {prompt_tokens} tokens, tier '{tier['name']}' (richness {tier['richness']})")
+        
+        request = {
+            "model": tier['model'],
+            "messages": messages,
+            "temperature": 0.7,
+            "response_format": {"type": "json_object"}
+        }
+        
+        return request
+    
+    def parse_result(self, content: str) -> Dict[str, Any]:
+        """Parse a JSON answer from the model and normalize its score_level"""
+        result = json.loads(content)
+        self._normalize_score_level(result)
+        return result
+    
+    def _client(self, deadline: Optional[float]) -> OpenAI:
+        """The client without SDK retries for deadline-bounded calls"""
+        return self.bounded_client if deadline else self.client
+    
+    def _complete_streaming(self, request: Dict[str, Any],
+                            on_section: Callable[[str, Any], None],
+                            deadline: Optional[float] = None,
+                            charge: Optional[Callable[[], None]] = None) -> Tuple[Dict[str, Any], Any]:
+        """
+        Stream the completion and emit each top-level section once it closes
+        
+        Opening the stream is hedged on the time to its first chunk (the
+        losing stream is closed before it emits anything); reading the rest
+        runs under the same waiter, so `deadline` bounds the whole stream even
+        if the connection stalls between chunks
+        Returns (result, usage or None)
+        """
+        started = time.monotonic()
+        client = self._client(deadline)
+        
+        def open_stream():
+            if charge:
+                charge()
+            stream = client.chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}, timeout=deadline
+            )
+            return stream, next(stream, None)
+        
+        stream, first = hedged_call(
+            open_stream, deadline, hedge_delay(request['model'], FIRST_CHUNK),
+            discard=lambda opened: opened[0].close()
+        )
+        get_latency_tracker(request['model'], FIRST_CHUNK).record(time.monotonic() - started)
+        
+        parser = IncrementalObjectParser()
+        content = []
+        usage = []
+        expired = Event()
+        
+        def read_stream():
+            for chunk in chain([first] if first is not None else [], stream):
+                if expired.is_set():
+                    return
+                if getattr(chunk, 'usage', None):
+                    usage.append(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                
+                content.append(delta)
+                for key, value in parser.feed(delta):
+                    self._emit_section(on_section, key, value)
+        
+        remaining = None if deadline is None else deadline - (time.monotonic() - started)
+        try:
+            hedged_call(read_stream, remaining)
+        except DeadlineExceeded:
+            expired.set()
+            stream.close()
+            raise DeadlineExceeded(f"AI stream exceeded its {deadline}s deadline")
+        
+        return self._stream_result(parser, content), usage[-1] if usage else None
+    
+    def _stream_result(self, parser: IncrementalObjectParser, content: List[str]) -> Dict[str, Any]:
+        if not parser.done:
+            # Let json raise a proper error for truncated output
+            return json.loads(''.join(content))
+        return parser.result
+    
+    def _emit_section(self, on_section: Callable[[str, Any], None], key: str, value: Any):
+        """Call the section callback without letting it break the analysis"""
+        try:
+            on_section(key, value)
+        except Exception as e:
+            logger.error(f"❌ Error in section callback for {key}: {str(e)}")
+    
+    def _normalize_score_level(self, result: Dict[str, Any]):
+        """Ensure score_level is set correctly for new scale"""
+        if 'score' in result:
+            score = result['score']
+            if score >= 70:
+                result['score_level'] = "Hoch"
+            elif score >= 40:
+                result['score_level'] = "Mittel"
+            else:
+                result['score_level'] = "Niedrig"
+    
     def _get_fallback_analysis(self, assessment_data: Dict[Any, Any]) -> Dict[str, Any]:
         """Fallback analysis if ChatGPT fails"""
         score = assessment_data.get('calculated_score', 50)
@@ -261,7 +422,168 @@ Gib NUR das JSON-Objekt zurück, keinen anderen Text."""
         }
 
 
-# Singleton instance
+class AsyncAIReadinessService(AIReadinessService):
+    """
+    Async variant on AsyncOpenAI for running many analyses concurrently
+    
+    Prompts, parsing, cache, circuit breaker and the RPM / TPM limiter are
+    shared with the synchronous service; at most AI_MAX_CONCURRENCY requests
+    are in flight per event loop. The HTTP connections belong to the event
+    loop they were opened in, so create one service per loop and close() it
+    (see pipeline.run_analysis_stage_many)
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.bounded_client = self.client.with_options(max_retries=0)
+        self._semaphores = weakref.WeakKeyDictionary()
+    
+    async def close(self):
+        await self.client.close()
+    
+    def _slot(self):
+        """Concurrency slot for the running event loop (no limit if AI_MAX_CONCURRENCY is 0)"""
+        limit = get_rate_limiter().max_concurrency
+        if not limit:
+            return contextlib.nullcontext()
+        
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(limit)
+        return semaphore
+    
+    async def analyze_assessment(self, assessment_data: Dict[Any, Any],
+                                 on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        return await self.analyze_from_supabase(assessment_data, on_section=on_section)
+    
+    async def analyze_from_supabase(self, assessment_data: Dict[Any, Any],
+                                    on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """Async counterpart of AIReadinessService.analyze_from_supabase"""
+        reused = self._reuse_similar(
+            await asyncio.to_thread(find_reusable_analysis, assessment_data), on_section
+        )
+        if reused is not None:
+            return reused
+        
+        if getattr(settings, 'AI_ANALYSIS_FAN_OUT', False):
+            results = await asyncio.gather(*(
+                self._complete_async(self.build_request(assessment_data, sections=keys), on_section)
+                for _, keys in SECTION_GROUPS
+            ), return_exceptions=True)
+            return self._merge_sections(
+                assessment_data, {name: result for (name, _), result in zip(SECTION_GROUPS, results)}
+            )
+        
+        try:
+            result = await self._complete_async(self.build_request(assessment_data), on_section)
+            await asyncio.to_thread(remember_analysis, assessment_data)
+            return result
+        except ProviderUnavailable as e:
+            return self._on_unavailable(e, assessment_data)
+        except Exception as e:
+            logger.error(f"❌ Error in ChatGPT analysis: {str(e)}")
+            return self._get_fallback_analysis(assessment_data)
+    
+    async def analyze_many(self, assessments: List[Dict[Any, Any]]) -> List[Any]:
+        """
+        Analyze several assessments concurrently
+        Results are in input order; an analysis that raised is returned as its exception
+        """
+        return await asyncio.gather(*(self.analyze_assessment(a) for a in assessments), return_exceptions=True)
+    
+    async def _complete_async(self, request: Dict[str, Any],
+                              on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Async counterpart of AIReadinessService._complete
+        Streams are bounded by the deadline but not hedged
+        """
+        cache, cache_key, cached = self._lookup_cache(request, on_section)
+        if cached is not None:
+            return cached
+        
+        breaker = get_circuit_breaker()
+        breaker.check()
+        
+        limiter = get_rate_limiter()
+        deadline = getattr(settings, 'AI_REQUEST_DEADLINE_SECONDS', 0) or None
+        client = self._client(deadline)
+        async with self._slot():
+            estimate = await limiter.acquire_async(estimate_request_tokens(request))
+            started = time.monotonic()
+            
+            try:
+                if on_section:
+                    result, usage = await asyncio.wait_for(
+                        self._complete_streaming_async(client, request, on_section, deadline), timeout=deadline
+                    )
+                else:
+                    calls = []
+                    
+                    async def call():
+                        if calls:
+                            # The hedged duplicate costs tokens as well
+                            await limiter.acquire_async(estimate)
+                        calls.append(call)
+                        return await client.chat.completions.create(**request, timeout=deadline)
+                    
+                    response = await hedged_call_async(call, deadline, hedge_delay(request['model']))
+                    usage = response.usage
+                get_latency_tracker(request['model']).record(time.monotonic() - started)
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                raise DeadlineExceeded(f"AI stream exceeded its {deadline}s deadline")
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            self._record_usage(request, time.monotonic() - started, usage)
+        
+        if on_section:
+            self._normalize_score_level(result)
+        else:
+            result = self.parse_result(response.choices[0].message.content)
+        
+        limiter.settle(estimate, usage.total_tokens if usage else None)
+        
+        # Only real answers are cached, never the fallback
+        if cache:
+            cache.set(cache_key, result)
+        
+        return result
+    
+    async def _complete_streaming_async(self, client: AsyncOpenAI, request: Dict[str, Any],
+                                        on_section: Callable[[str, Any], None],
+                                        deadline: Optional[float] = None) -> Tuple[Dict[str, Any], Any]:
+        parser = IncrementalObjectParser()
+        content = []
+        usage = None
+        
+        stream = await client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}, timeout=deadline
+        )
+        try:
+            async for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                
+                content.append(delta)
+                for key, value in parser.feed(delta):
+                    self._emit_section(on_section, key, value)
+        finally:
+            # Also when wait_for cancels us at the deadline
+            await stream.close()
+        
+        return self._stream_result(parser, content), usage
+
+
+# Singleton instances
 _ai_service_instance = None
 
 def get_ai_service() -> AIReadinessService:
@@ -272,4 +594,4 @@ def get_ai_service() -> AIReadinessService:
     global _ai_service_instance
     if _ai_service_instance is None:
         _ai_service_instance = AIReadinessService()
-    return _ai_service_instance
\ No newline at end of file
+    return _ai_service_instance
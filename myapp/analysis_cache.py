@@ -0,0 +1,128 @@
+# myapp/analysis_cache.py
+# Content-addressed cache for ChatGPT analyses
+#
+# Keys are a SHA-256 of the normalized request (model, messages, parameters),
+# so re-running an assessment whose inputs did not change costs no tokens.
+# Two tiers:
+#   1. in-process LRU with TTL
+#   2. optional shared Django cache (AI_ANALYSIS_SHARED_CACHE alias in CACHES),
+#      e.g. FileBasedCache for all workers on one machine or DatabaseCache
+#      for all nodes
+
+import copy
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCache:
+    """LRU + TTL cache of analysis results, optionally backed by a shared Django cache"""
+
+    def __init__(self, max_entries=256, ttl=7 * 24 * 3600, shared_alias=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(request):
+        """Hash of the normalized request (model, messages and parameters)"""
+        normalized = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return 'analysis:' + hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _shared(self):
+        if not self.shared_alias:
+            return None
+        try:
+            from django.core.cache import caches
+            return caches[self.shared_alias]
+        except Exception as e:
+            logger.warning(f"⚠️  Shared analysis cache '{self.shared_alias}' unavailable: {str(e)}")
+            return None
+
+    def get(self, key):
+        """Return a copy of the cached analysis, or None"""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            if entry:
+                del self._entries[key]
+
+        shared = self._shared()
+        if shared is not None:
+            try:
+                value = shared.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️  Shared analysis cache read failed: {str(e)}")
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return copy.deepcopy(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Store an analysis in both tiers"""
+        self._remember(key, copy.deepcopy(value))
+
+        shared = self._shared()
+        if shared is not None:
+            try:
+                shared.set(key, value, timeout=self.ttl)
+            except Exception as e:
+                logger.warning(f"⚠️  Shared analysis cache write failed: {str(e)}")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses
+            }
+
+
+_analysis_cache = None
+
+def get_analysis_cache():
+    """
+    Get the process-wide analysis cache configured from settings
+    Returns None if caching is disabled
+    """
+    global _analysis_cache
+    if not getattr(settings, 'AI_ANALYSIS_CACHE_ENABLED', True):
+        return None
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache(
+            max_entries=getattr(settings, 'AI_ANALYSIS_CACHE_MAX_ENTRIES', 256),
+            ttl=getattr(settings, 'AI_ANALYSIS_CACHE_TTL', 7 * 24 * 3600),
+            shared_alias=getattr(settings, 'AI_ANALYSIS_SHARED_CACHE', None)
+        )
+    return _analysis_cache
@@ -14,14 +14,30 @@ class MyappConfig(AppConfig):
         """
         Start background scheduler when Django starts
         This runs automatically when Django loads the app
+        
+        Set ASSESSMENT_EMBEDDED_PROCESSOR=false when a dedicated
+        `manage.py run_assessment_worker` process does the processing
         """
+        import os
         import sys
+        from django.conf import settings
+        
+        if not getattr(settings, 'ASSESSMENT_EMBEDDED_PROCESSOR', True):
+            logger.info("⏭️  Embedded processor disabled - using dedicated worker")
+            return
+        
+        # Only the web server (gunicorn, runserver) runs the embedded processor.
+        # The worker command starts its own; any other management command
+        # (run_analysis_batch, rescore_assessments, tests, migrate, ...) would
+        # claim rows and then exit with them still leased
+        command = sys.argv[1] if len(sys.argv) > 1 else None
+        if os.path.basename(sys.argv[0]) in ('manage.py', 'django-admin') and command != 'runserver':
+            return
         
         # Only start in the main process, not in the reloader process
         # This prevents the scheduler from starting twice
         if 'runserver' in sys.argv and '--noreload' not in sys.argv:
             # Check if this is the reloader process
-            import os
             if os.environ.get('RUN_MAIN') != 'true':
                 logger.info("⏭️  Skipping scheduler in reloader process")
                 return
@@ -0,0 +1,208 @@
+# myapp/batch_analysis.py
+# Backlog catch-up through the OpenAI Batch API
+#
+# After an outage hundreds of rows can pile up; analysing them one synchronous
+# chat completion at a time is slow, expensive and runs into rate limits.
+# Backlog mode instead:
+#   1. claims pending rows, builds the same requests as the live path and
+#      uploads them as one JSONL Batch job (half price, separate rate limits)
+#   2. hands the leases over to the batch ('batch:<id>'), so no worker analyses
+#      those rows twice while the batch runs
+#   3. polls the batch; finished analyses are written back with
+#      analysis_completed = true and the rows released, so the normal pipeline
+#      only generates the PDF and sends the email
+# Rows the batch could not analyse are released and processed synchronously.
+#
+# Works against any OpenAI compatible server: point OPENAI_BASE_URL at a local
+# stub of /v1/files and /v1/batches to test it without real API calls.
+
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AnalysisBatch
+from .supabase_client import get_supabase
+from .submissions import (
+    TABLE, ANALYSIS_COLUMNS, claim_batch, release, hand_over, release_holder
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# Batch statuses that still need polling
+OPEN_STATUSES = ('validating', 'in_progress', 'finalizing', 'cancelling')
+
+
+def _holder(batch_id):
+    return f'batch:{batch_id}'
+
+
+def submit_backlog_batch(limit=None):
+    """
+    Claim up to `limit` pending assessments and submit their analyses as one Batch job
+
+    Returns:
+        AnalysisBatch: the recorded batch, or None if nothing needed an analysis
+    """
+    from .ai_service import get_ai_service
+
+    limit = limit or getattr(settings, 'AI_BATCH_MAX_REQUESTS', 1000)
+    rows = claim_batch(limit)
+    if not rows:
+        return None
+
+    # Rows that only miss the PDF / email go straight back to the pipeline
+    done = [row['id'] for row in rows if row.get('analysis_completed')]
+    for assessment_id in done:
+        release(assessment_id)
+
+    ids = [row['id'] for row in rows if not row.get('analysis_completed')]
+    if not ids:
+        return None
+
+    try:
+        response = get_supabase().table(TABLE).select(ANALYSIS_COLUMNS).in_('id', ids).execute()
+        assessments = response.data or []
+
+        ai_service = get_ai_service()
+        lines = [
+            json.dumps({
+                'custom_id': assessment['id'],
+                'method': 'POST',
+                'url': BATCH_ENDPOINT,
+                'body': ai_service.build_request(assessment)
+            }, ensure_ascii=False)
+            for assessment in assessments
+        ]
+
+        input_file = ai_service.client.files.create(
+            file=('ki_check_backlog.jsonl', '\n'.join(lines).encode('utf-8')),
+            purpose='batch'
+        )
+        batch = ai_service.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=getattr(settings, 'AI_BATCH_COMPLETION_WINDOW', '24h'),
+            metadata={'source': TABLE}
+        )
+    except Exception:
+        for assessment_id in ids:
+            release(assessment_id)
+        raise
+
+    submitted = [assessment['id'] for assessment in assessments]
+    skipped = set(ids) - set(submitted)
+    for assessment_id in skipped:
+        release(assessment_id)
+
+    # Hold the rows for the whole completion window (plus slack); collect_batches
+    # releases them earlier as soon as the batch is done
+    lease = timedelta(seconds=getattr(settings, 'AI_BATCH_LEASE_SECONDS', 25 * 3600))
+    hand_over(submitted, _holder(batch.id), timezone.now() + lease)
+
+    record = AnalysisBatch.objects.create(
+        batch_id=batch.id,
+        status=batch.status,
+        assessment_ids=submitted,
+        request_count=len(submitted)
+    )
+    logger.info(f"📦 Submitted batch {batch.id} with {len(submitted)} analyses")
+    return record
+
+
+def collect_batches():
+    """
+    Poll all open batches and write finished analyses back to ki_check_submissions
+
+    Returns:
+        int: number of assessments whose analysis was applied
+    """
+    from .ai_service import get_ai_service
+
+    applied = 0
+    open_batches = list(AnalysisBatch.objects.filter(status__in=OPEN_STATUSES))
+    if not open_batches:
+        return 0
+
+    client = get_ai_service().client
+    for record in open_batches:
+        try:
+            batch = client.batches.retrieve(record.batch_id)
+        except Exception as e:
+            logger.error(f"❌ Could not poll batch {record.batch_id}: {str(e)}")
+            continue
+
+        record.status = batch.status
+        if batch.status in OPEN_STATUSES:
+            record.save(update_fields=['status'])
+            continue
+
+        # completed, failed, expired or cancelled: apply whatever finished
+        # (expired batches still return partial output) and release the rest
+        analysed = set()
+        if batch.output_file_id:
+            analysed = _apply_results(record, client.files.content(batch.output_file_id).text)
+
+        pending = [i for i in record.assessment_ids if i not in analysed]
+        release_holder(pending, _holder(record.batch_id))
+
+        record.succeeded = len(analysed)
+        record.failed = len(pending)
+        record.completed_at = timezone.now()
+        record.save()
+        applied += len(analysed)
+
+        logger.info(
+            f"📦 Batch {record.batch_id} {batch.status}: {len(analysed)} analysed, "
+            f"{len(pending)} handed back to the pipeline"
+        )
+
+    return applied
+
+
+def _apply_results(record, output):
+    """
+    Write every successful result line of a batch output file to its row
+
+    Returns:
+        set: ids of the assessments that were analysed
+    """
+    from .ai_service import get_ai_service
+
+    ai_service = get_ai_service()
+    holder = _holder(record.batch_id)
+    analysed = set()
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            assessment_id = item['custom_id']
+            response = item.get('response') or {}
+            if item.get('error') or response.get('status_code') != 200:
+                logger.warning(f"⚠️  Batch request for {assessment_id[:8]} failed: {item.get('error')}")
+                continue
+
+            analysis = ai_service.parse_result(response['body']['choices'][0]['message']['content'])
+
+            # Only rows still held by this batch: a row released in the meantime
+            # may already be analysed by the pipeline
+            get_supabase().table(TABLE).update({
+                'calculated_score': analysis['score'],
+                'score_level': analysis['score_level'],
+                'chatgpt_analysis': analysis,
+                'analysis_completed': True,
+                'claimed_by': None,
+                'lease_expires_at': None
+            }, returning='minimal').eq('id', assessment_id).eq('claimed_by', holder).execute()
+            analysed.add(assessment_id)
+
+        except Exception as e:
+            logger.error(f"❌ Could not apply batch result: {str(e)}")
+
+    return analysed
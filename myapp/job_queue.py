@@ -0,0 +1,167 @@
+# myapp/job_queue.py
+# Durable assessment job queue backed by the Django database
+#
+# Every claimed ki_check_submissions row gets an AssessmentJob that counts
+# attempts. Failures are retried with exponential backoff; after max_attempts
+# the job moves to DeadLetterJob and the row is parked, so poison rows stop
+# eating worker capacity. Backoff is enforced across nodes by holding the
+# Supabase lease until the next attempt (see submissions.defer / park).
+#
+# The counts are only durable across nodes if every process uses the same
+# database (DATABASE_URL). The SQLite fallback is a file per machine: a
+# separate worker dyno would count attempts in its own copy, so the worker
+# and batch commands call require_shared_database() first.
+
+import random
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AssessmentJob, DeadLetterJob
+from .submissions import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+
+def is_shared_database():
+    """True if the default database is a server all processes and machines share"""
+    return connection.vendor != 'sqlite'
+
+
+def require_shared_database(purpose):
+    """Raise ImproperlyConfigured if `purpose` would keep job state in a per-machine SQLite file"""
+    if not is_shared_database():
+        raise ImproperlyConfigured(
+            f"{purpose} needs a database shared with the web process: set DATABASE_URL "
+            f"(job attempts, dead letters and batches live in the default database)"
+        )
+
+
+def enqueue(assessment_id):
+    """Create the job for an assessment if it does not exist yet (idempotent)"""
+    job, created = AssessmentJob.objects.get_or_create(
+        assessment_id=assessment_id,
+        defaults={'max_attempts': getattr(settings, 'ASSESSMENT_MAX_ATTEMPTS', 5)}
+    )
+    if created:
+        logger.info(f"📥 Job queued for {str(assessment_id)[:8]}")
+    return job
+
+
+def begin_attempt(assessment_id):
+    """
+    Start a new attempt for an assessment
+
+    Returns:
+        tuple: (job, started) - started is False while the job is backing off
+        or dead-lettered, in which case the caller must not process it
+    """
+    job = enqueue(assessment_id)
+
+    started = AssessmentJob.objects.filter(
+        pk=job.pk,
+        next_attempt_at__lte=timezone.now()
+    ).exclude(
+        status=AssessmentJob.STATUS_DEAD
+    ).update(
+        status=AssessmentJob.STATUS_RUNNING,
+        attempts=F('attempts') + 1,
+        locked_by=WORKER_ID,
+        updated_at=timezone.now()
+    )
+
+    job.refresh_from_db()
+    return job, bool(started)
+
+
+def complete(assessment_id):
+    """Mark the job as succeeded"""
+    AssessmentJob.objects.filter(assessment_id=assessment_id).update(
+        status=AssessmentJob.STATUS_SUCCEEDED,
+        locked_by='',
+        last_error='',
+        updated_at=timezone.now()
+    )
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with +/-20% jitter, capped at ASSESSMENT_RETRY_MAX_SECONDS"""
+    base = getattr(settings, 'ASSESSMENT_RETRY_BASE_SECONDS', 60)
+    cap = getattr(settings, 'ASSESSMENT_RETRY_MAX_SECONDS', 6 * 3600)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def fail(assessment_id, error):
+    """
+    Record a failed attempt
+
+    Returns:
+        datetime: when the next attempt is due, or None if the job was dead-lettered
+    """
+    with transaction.atomic():
+        job = AssessmentJob.objects.select_for_update().get(assessment_id=assessment_id)
+        job.last_error = str(error or 'Unknown error')[:2000]
+        job.locked_by = ''
+
+        if job.attempts >= job.max_attempts:
+            job.status = AssessmentJob.STATUS_DEAD
+            job.save()
+            DeadLetterJob.objects.create(
+                assessment_id=job.assessment_id,
+                attempts=job.attempts,
+                last_error=job.last_error
+            )
+            logger.error(f"☠️  {str(assessment_id)[:8]} failed {job.attempts} times - moved to dead letters")
+            return None
+
+        job.status = AssessmentJob.STATUS_PENDING
+        job.next_attempt_at = timezone.now() + backoff_delay(job.attempts)
+        job.save()
+
+    logger.warning(
+        f"🔁 {str(assessment_id)[:8]} failed (attempt {job.attempts}/{job.max_attempts}), "
+        f"retrying at {job.next_attempt_at:%H:%M:%S}"
+    )
+    return job.next_attempt_at
+
+
+def postpone(assessment_id, seconds):
+    """
+    Put a running job back without counting the attempt (e.g. while the AI
+    provider circuit is open)
+
+    Returns:
+        datetime: when the next attempt is due
+    """
+    next_attempt_at = timezone.now() + timedelta(seconds=seconds * random.uniform(1.0, 1.5))
+    AssessmentJob.objects.filter(assessment_id=assessment_id, attempts__gt=0).update(
+        status=AssessmentJob.STATUS_PENDING,
+        attempts=F('attempts') - 1,
+        next_attempt_at=next_attempt_at,
+        locked_by='',
+        updated_at=timezone.now()
+    )
+    logger.info(f"⏸️  {str(assessment_id)[:8]} postponed until {next_attempt_at:%H:%M:%S}")
+    return next_attempt_at
+
+
+def requeue_dead(assessment_id):
+    """Give a dead-lettered assessment a fresh set of attempts"""
+    from .submissions import unpark
+
+    AssessmentJob.objects.filter(assessment_id=assessment_id).update(
+        status=AssessmentJob.STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        last_error='',
+        updated_at=timezone.now()
+    )
+    DeadLetterJob.objects.filter(assessment_id=assessment_id).delete()
+    unpark(assessment_id)
+    logger.info(f"♻️  Requeued dead-lettered assessment {str(assessment_id)[:8]}")
@@ -0,0 +1,80 @@
+# myapp/json_stream.py
+# Incremental parser for a streamed JSON object
+#
+# Feed it the text chunks of a streamed chat completion; every top-level
+# member ("executive_summary", "strengths", ...) is returned as soon as its
+# value closes, long before the last token of the answer arrives.
+
+import json
+
+
+class IncrementalObjectParser:
+    """
+    Parses a single JSON object from text chunks and emits its top-level
+    members as (key, value) pairs once each one is complete
+    """
+
+    def __init__(self):
+        self.result = {}
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member = []
+
+    def feed(self, chunk):
+        """
+        Consume the next chunk of text
+
+        Returns:
+            list: (key, value) pairs completed by this chunk
+        """
+        completed = []
+
+        for char in chunk:
+            if self.done:
+                break
+
+            # Skip anything before the opening brace (whitespace, code fences)
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._flush())
+                    self.done = True
+                    continue
+            elif char == ',' and self._depth == 1:
+                completed.extend(self._flush())
+                continue
+
+            self._member.append(char)
+
+        return completed
+
+    def _flush(self):
+        text = ''.join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+
+        member = json.loads('{' + text + '}')
+        self.result.update(member)
+        return list(member.items())
@@ -0,0 +1,224 @@
+# myapp/management/commands/benchmark_pdf.py
+# Measure PDF rendering cost on a batch of large synthetic reports
+#
+# Usage:
+#   python manage.py benchmark_pdf                  # 200 reports, 12 items per list
+#   python manage.py benchmark_pdf --reports 1000 --items 20
+#   python manage.py benchmark_pdf --pool --concurrency 4
+#
+# Reports CPU time per report (time.process_time) with the shared report
+# theme and, for comparison, with the theme rebuilt for every report (each
+# render used to build its styles itself, plus one TableStyle per box), and
+# in template mode (pre-laid-out title page, headings and footer).
+#
+# --pool renders the batch from --concurrency threads, once in-process and
+# once through the PDF worker processes, while a probe thread stands in for a
+# web request (sleep 10 ms, then a little Python work). Its extra latency
+# shows how much the renders hold up the request threads.
+#
+# --memory renders and MIME-encodes the batch in a fresh process per variant,
+# --in-flight reports at a time (like the pipeline queues), once as bytes in
+# memory and once spooled to disk (pdf_artifacts.py), and reports peak RSS.
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+def sample_assessment(number, items):
+    """A large synthetic assessment with `items` entries in every list"""
+    text = ('Die Automatisierung wiederkehrender Abläufe entlastet das Team '
+            'und schafft Freiraum für wertschöpfende Tätigkeiten. ') * 3
+    return {
+        'id': f'benchmark-{number}',
+        'company_name': f'Beispiel GmbH {number}',
+        'industry': 'Handel',
+        'company_size': '50-249',
+        'calculated_score': 35 + number % 60,
+        'score_level': 'Mittel',
+        'chatgpt_analysis': {
+            'executive_summary': text * 4,
+            'strengths': [f'Stärke {i}: {text}' for i in range(items)],
+            'weaknesses': [f'Schwäche {i}: {text}' for i in range(items)],
+            'recommended_use_cases': [
+                {'title': f'Anwendungsfall {i}', 'description': text, 'impact': 'Hoch',
+                 'effort': 'Mittel', 'priority': 'Hoch'}
+                for i in range(items)
+            ],
+            'quick_wins': [
+                {'title': f'Quick Win {i}', 'description': text, 'timeframe': '4 Wochen',
+                 'expected_benefit': 'Zeitersparnis'}
+                for i in range(items)
+            ],
+            'strategic_steps': [
+                {'phase': f'Phase {i}', 'description': text, 'timeframe': '3 Monate',
+                 'key_actions': [f'Aktion {a}' for a in range(4)]}
+                for i in range(items)
+            ],
+            'budget_recommendation': '15.000 - 40.000 EUR im ersten Jahr',
+            'next_actions': [f'Schritt {i}' for i in range(items)],
+        }
+    }
+
+
+def memory_run(spooled, reports, items, in_flight):
+    """
+    Render and encode the report emails of a batch in this (fresh) process
+
+    Returns:
+        tuple: (RSS after warm-up, peak RSS) in MB
+    """
+    import resource
+
+    from myapp.pdf_artifacts import PDFArtifact, new_artifact_path, discard
+    from myapp.pdf_generator import generate_assessment_pdf, write_assessment_pdf
+    from myapp.views import build_assessment_email
+
+    def peak_rss():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def render(assessment):
+        if not spooled:
+            return generate_assessment_pdf(assessment, template=True)
+        path = new_artifact_path()
+        write_assessment_pdf(assessment, path, template=True)
+        return PDFArtifact(path, os.path.getsize(path))
+
+    warm_up = sample_assessment(0, 1)
+    warm_up['email'] = 'benchmark@example.com'
+    pdf = render(warm_up)
+    build_assessment_email(warm_up, pdf).message().as_bytes()
+    discard(pdf)
+    baseline = peak_rss()
+
+    for start in range(0, reports, in_flight):
+        batch = []
+        for number in range(start, min(start + in_flight, reports)):
+            assessment = sample_assessment(number, items)
+            assessment['email'] = 'benchmark@example.com'
+            batch.append((assessment, render(assessment)))
+        for assessment, pdf in batch:
+            build_assessment_email(assessment, pdf).message().as_bytes()
+            discard(pdf)
+
+    return baseline, peak_rss()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark PDF rendering (CPU time per report)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=200,
+                            help='Reports rendered by each variant')
+        parser.add_argument('--items', type=int, default=12,
+                            help='Entries per list in each synthetic report')
+        parser.add_argument('--pool', action='store_true',
+                            help='Also compare in-process rendering with the worker processes')
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Rendering threads / worker processes with --pool')
+        parser.add_argument('--memory', action='store_true',
+                            help='Compare peak RSS of in-memory and spooled reports')
+        parser.add_argument('--in-flight', type=int, default=10,
+                            help='Reports held at once with --memory')
+
+    def handle(self, *args, **options):
+        from myapp.pdf_generator import ReportTheme, generate_professional_pdf, get_report_theme
+
+        assessments = [sample_assessment(n, options['items']) for n in range(options['reports'])]
+        variants = {
+            'Theme per report:': lambda a: generate_professional_pdf(a, theme=ReportTheme()),
+            'Shared theme:': lambda a: generate_professional_pdf(a, theme=get_report_theme()),
+            'Template mode:': lambda a: generate_professional_pdf(a, template=True),
+        }
+        for render in variants.values():
+            render(assessments[0])  # warm up fonts and caches
+
+        # Interleaved report by report, so drift in machine load hits all variants alike
+        cpu = dict.fromkeys(variants, 0.0)
+        size = 0
+        for assessment in assessments:
+            for label, render in variants.items():
+                started = time.process_time()
+                size += len(render(assessment))
+                cpu[label] += time.process_time() - started
+        per_report = {label: total / len(assessments) for label, total in cpu.items()}
+
+        started = time.process_time()
+        for _ in range(200):
+            ReportTheme()
+        theme_cost = (time.process_time() - started) / 200
+
+        self.stdout.write(
+            f"📄 {len(assessments)} reports, {options['items']} items per list, "
+            f"~{size // len(assessments) // len(variants) // 1024}KB each"
+        )
+        for label, seconds in per_report.items():
+            self.stdout.write(f"   {label:<18} {seconds * 1000:.2f} ms CPU/report")
+        self.stdout.write(f"   Theme construction alone: {theme_cost * 1000:.3f} ms")
+
+        baseline = per_report['Theme per report:']
+        for label in ('Shared theme:', 'Template mode:'):
+            saved = baseline - per_report[label]
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {label[:-1]} saves {saved * 1000:.2f} ms CPU per report ({saved / baseline * 100:.1f}%)"
+            ))
+
+        if options['pool']:
+            self._compare_pool(assessments, options['concurrency'])
+
+        if options['memory']:
+            self._compare_memory(options['reports'], options['items'], options['in_flight'])
+
+    def _compare_pool(self, assessments, concurrency):
+        from myapp.pdf_generator import generate_assessment_pdf
+        from myapp.pdf_pool import PDFRenderPool
+
+        pool = PDFRenderPool(processes=concurrency, timeout=600, max_tasks_per_child=None)
+        for assessment in assessments[:concurrency]:
+            pool.render(assessment)  # start and warm up the workers
+
+        def run(render):
+            stop = threading.Event()
+            delays = []
+
+            def probe():
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    time.sleep(0.01)
+                    sum(range(20000))
+                    delays.append(time.perf_counter() - started - 0.01)
+
+            thread = threading.Thread(target=probe, daemon=True)
+            thread.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(render, assessments))
+            wall = time.perf_counter() - started
+            stop.set()
+            thread.join()
+
+            delays.sort()
+            return wall, delays[len(delays) // 2] * 1000, delays[int(len(delays) * 0.95)] * 1000
+
+        try:
+            for label, render in (('In-process:', generate_assessment_pdf), ('Worker processes:', pool.render)):
+                wall, p50, p95 = run(render)
+                self.stdout.write(
+                    f"   {label:<18} {len(assessments) / wall:.1f} reports/s, "
+                    f"request probe p50 {p50:.2f} ms / p95 {p95:.2f} ms"
+                )
+        finally:
+            pool.shutdown()
+
+    def _compare_memory(self, reports, items, in_flight):
+        for label, spooled in (('Bytes in memory:', False), ('Spooled to disk:', True)):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                baseline, peak = executor.submit(memory_run, spooled, reports, items, in_flight).result()
+            self.stdout.write(
+                f"   {label:<18} peak RSS {peak:.1f} MB "
+                f"(+{peak - baseline:.1f} MB over {baseline:.1f} MB after warm-up, {in_flight} in flight)"
+            )
@@ -0,0 +1,73 @@
+# myapp/management/commands/rescore_assessments.py
+# Re-run the local pre-analysis over the whole ki_check_submissions table
+#
+# Usage:
+#   python manage.py rescore_assessments            # report only
+#   python manage.py rescore_assessments --write    # also fix score_level
+#
+# No model calls: everything is computed by myapp/pre_analysis.py in bulk.
+
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Re-score all assessments with the local pre-analysis (no AI calls)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000,
+                            help='Rows fetched per request')
+        parser.add_argument('--write', action='store_true',
+                            help='Store score levels that differ from the recomputed ones')
+
+    def handle(self, *args, **options):
+        from myapp.pre_analysis import pre_analyze_many
+        from myapp.submissions import TABLE
+        from myapp.supabase_client import get_supabase
+
+        supabase = get_supabase()
+        page_size = options['page_size']
+        started = time.monotonic()
+
+        rows = []
+        while True:
+            response = supabase.table(TABLE).select(
+                'id, calculated_score, score_level, raw_answers'
+            ).order('created_at').range(len(rows), len(rows) + page_size - 1).execute()
+            rows.extend(response.data or [])
+            if len(response.data or []) < page_size:
+                break
+        fetched = time.monotonic()
+
+        results = pre_analyze_many(rows)
+        computed = time.monotonic()
+
+        levels = Counter(result['score_level'] for result in results)
+        strongest = Counter(area for result in results for area, _ in result['strongest_areas'][:1])
+        weakest = Counter(area for result in results for area, _ in result['weakest_areas'][:1])
+        changed = {}
+        for row, result in zip(rows, results):
+            if row.get('score_level') != result['score_level']:
+                changed.setdefault(result['score_level'], []).append(row['id'])
+
+        self.stdout.write(
+            f"📊 {len(rows)} assessments: fetched in {fetched - started:.1f}s, "
+            f"analysed in {computed - fetched:.2f}s"
+        )
+        self.stdout.write(f"   Score levels: {dict(levels)}")
+        self.stdout.write(f"   Most common strongest area: {strongest.most_common(3)}")
+        self.stdout.write(f"   Most common weakest area: {weakest.most_common(3)}")
+        self.stdout.write(f"   Score level differs: {sum(len(ids) for ids in changed.values())}")
+
+        if not options['write']:
+            return
+
+        # One update per level and chunk instead of one per row
+        for level, ids in changed.items():
+            for start in range(0, len(ids), 200):
+                supabase.table(TABLE).update(
+                    {'score_level': level}, returning='minimal'
+                ).in_('id', ids[start:start + 200]).execute()
+        self.stdout.write(self.style.SUCCESS("✅ Score levels updated"))
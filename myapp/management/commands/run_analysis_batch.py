@@ -0,0 +1,64 @@
+# myapp/management/commands/run_analysis_batch.py
+# Submit the pending backlog as an OpenAI Batch job and / or collect results
+#
+# Usage:
+#   python manage.py run_analysis_batch --submit --limit 500
+#   python manage.py run_analysis_batch --collect --wait
+#
+# With OPENAI_BASE_URL pointing at a local stub this exercises the whole
+# batch round trip without real API calls. Needs DATABASE_URL, so the batch
+# is recorded where the processors collecting it can see it.
+
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Analyse pending assessments through the OpenAI Batch API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submit', action='store_true',
+                            help='Claim pending assessments and submit them as one batch')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Maximum assessments per batch (AI_BATCH_MAX_REQUESTS)')
+        parser.add_argument('--collect', action='store_true',
+                            help='Poll open batches and write finished analyses back')
+        parser.add_argument('--wait', action='store_true',
+                            help='Keep collecting until no batch is open')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Seconds between polls with --wait (AI_BATCH_POLL_SECONDS)')
+
+    def handle(self, *args, **options):
+        from myapp.batch_analysis import submit_backlog_batch, collect_batches, OPEN_STATUSES
+        from myapp.job_queue import require_shared_database
+        from myapp.models import AnalysisBatch
+
+        if not options['submit'] and not options['collect']:
+            raise CommandError('Use --submit and/or --collect')
+
+        try:
+            require_shared_database('run_analysis_batch')
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        if options['submit']:
+            batch = submit_backlog_batch(options['limit'])
+            if batch is None:
+                self.stdout.write("✓ No pending assessments need an analysis")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"📦 Submitted batch {batch.batch_id} with {batch.request_count} analyses"
+                ))
+
+        if options['collect']:
+            interval = options['interval'] or getattr(settings, 'AI_BATCH_POLL_SECONDS', 300)
+            while True:
+                applied = collect_batches()
+                open_count = AnalysisBatch.objects.filter(status__in=OPEN_STATUSES).count()
+                self.stdout.write(f"📦 {applied} analyses applied, {open_count} batch(es) still open")
+                if not options['wait'] or not open_count:
+                    break
+                time.sleep(interval)
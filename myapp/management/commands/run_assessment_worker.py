@@ -0,0 +1,88 @@
+# myapp/management/commands/run_assessment_worker.py
+# Standalone assessment worker, decoupled from the web process
+#
+# Usage:
+#   python manage.py run_assessment_worker --analysis-workers 8 --email-workers 4
+#
+# Run web dynos with ASSESSMENT_EMBEDDED_PROCESSOR=false so only these
+# worker processes do the processing; each can be scaled independently.
+# Needs DATABASE_URL: the job queue must be shared with the web dynos.
+
+import signal
+import time
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the background assessment processor (analysis -> PDF -> email) in the foreground'
+
+    def add_arguments(self, parser):
+        stage_defaults = getattr(settings, 'ASSESSMENT_STAGE_CONCURRENCY', {})
+
+        parser.add_argument('--analysis-workers', type=int, default=stage_defaults.get('analysis', 4),
+                            help='Worker threads for the ChatGPT analysis stage')
+        parser.add_argument('--pdf-workers', type=int, default=stage_defaults.get('pdf', 2),
+                            help='Worker threads for the PDF stage')
+        parser.add_argument('--email-workers', type=int, default=stage_defaults.get('email', 2),
+                            help='Worker threads for the email stage')
+        parser.add_argument('--min-batch', type=int, default=None,
+                            help='Minimum rows claimed per poll (ASSESSMENT_MIN_BATCH_SIZE)')
+        parser.add_argument('--max-batch', type=int, default=None,
+                            help='Maximum rows claimed per poll / in flight (ASSESSMENT_MAX_BATCH_SIZE)')
+        parser.add_argument('--shutdown-timeout', type=int, default=25,
+                            help='Seconds to wait for in-flight assessments on SIGTERM')
+
+    def handle(self, *args, **options):
+        from myapp.job_queue import require_shared_database
+        from myapp.tasks import start_assessment_processor, stop_assessment_processor
+
+        try:
+            require_shared_database('run_assessment_worker')
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        processor = start_assessment_processor(
+            min_batch_size=options['min_batch'],
+            max_batch_size=options['max_batch'],
+            stage_workers={
+                'analysis': options['analysis_workers'],
+                'pdf': options['pdf_workers'],
+                'email': options['email_workers'],
+            }
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Assessment worker started (stages: {processor.pipeline.stage_workers})"
+        ))
+
+        stopping = []
+
+        def request_stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        while not stopping:
+            time.sleep(1)
+
+        self.stdout.write("🛑 Shutting down assessment worker...")
+        stop_assessment_processor()
+
+        # Give in-flight assessments a chance to finish; leftover leases expire
+        deadline = time.monotonic() + options['shutdown_timeout']
+        while processor.pipeline.stats()['in_flight'] and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+        remaining = processor.pipeline.stats()['in_flight']
+        if remaining:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  {remaining} assessment(s) still in flight; their leases will expire"
+            ))
+        self.stdout.write(self.style.SUCCESS("✋ Assessment worker stopped"))
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.5 on 2026-10-17 10:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_aiassessment_delete_companyassessment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_id', models.UUIDField(unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Wartend'), ('running', 'In Bearbeitung'), ('succeeded', 'Erfolgreich'), ('dead', 'Fehlgeschlagen')], db_index=True, default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=5)),
+                ('next_attempt_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=255)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Bewertungs-Job',
+                'verbose_name_plural': 'Bewertungs-Jobs',
+                'ordering': ['next_attempt_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeadLetterJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_id', models.UUIDField(db_index=True)),
+                ('attempts', models.IntegerField()),
+                ('last_error', models.TextField(blank=True)),
+                ('failed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Fehlgeschlagener Job',
+                'verbose_name_plural': 'Fehlgeschlagene Jobs',
+                'ordering': ['-failed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_assessmentjob_deadletterjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=255, unique=True)),
+                ('status', models.CharField(db_index=True, max_length=50)),
+                ('assessment_ids', models.JSONField(default=list)),
+                ('request_count', models.IntegerField(default=0)),
+                ('succeeded', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Analyse-Batch',
+                'verbose_name_plural': 'Analyse-Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+# myapp/model_routing.py
+# Route each assessment to a model tier by how much information it contains
+#
+# Sparse submissions (mostly unanswered) get the same generic advice from a
+# smaller model, so they are sent to the cheaper, faster tier; rich ones keep
+# the flagship model. Richness is 0..1:
+#   70% share of answered fields (columns, rated lists, free text)
+#   30% amount of free text (saturates at RICH_FREE_TEXT_TOKENS)
+# Tiers and thresholds come from AI_MODEL_TIERS; per-tier call counts,
+# latency, tokens and the share of prompt tokens served from the provider's
+# prompt cache are kept for the processor status.
+
+from collections import deque
+from threading import Lock
+
+from django.conf import settings
+
+from .prompt_builder import SECTIONS, count_tokens, is_empty, answer_text
+from .pre_analysis import parse_raw_answers
+
+RICH_FREE_TEXT_TOKENS = 150
+
+DEFAULT_TIERS = (
+    {'name': 'light', 'model': 'gpt-4o-mini', 'min_richness': 0.0},
+    {'name': 'full', 'model': 'gpt-4o', 'min_richness': 0.4},
+)
+
+
+def richness(assessment):
+    """How much information a submission contains, 0 (empty) .. 1 (complete)"""
+    raw = parse_raw_answers(assessment)
+    answered = total = free_text = 0
+
+    for _, fields in SECTIONS:
+        for _, source, key in fields:
+            total += 1
+            value = assessment.get(key) if source == 'column' else raw.get(key)
+            if is_empty(value) or (source != 'column' and is_empty(answer_text(value))):
+                continue
+            answered += 1
+            if source == 'text':
+                free_text += count_tokens(answer_text(value))
+
+    return round(0.7 * answered / total + 0.3 * min(1.0, free_text / RICH_FREE_TEXT_TOKENS), 3)
+
+
+def get_tiers():
+    """Configured tiers, lowest min_richness first"""
+    tiers = getattr(settings, 'AI_MODEL_TIERS', None) or DEFAULT_TIERS
+    return sorted(tiers, key=lambda tier: tier['min_richness'])
+
+
+def route(assessment):
+    """
+    Pick the tier for an assessment
+
+    Returns:
+        dict: the tier (name, model, min_richness) plus the computed richness
+    """
+    tiers = get_tiers()
+    if not getattr(settings, 'AI_MODEL_ROUTING', True):
+        return dict(tiers[-1], richness=None)
+
+    score = richness(assessment)
+    chosen = tiers[0]
+    for tier in tiers:
+        if score >= tier['min_richness']:
+            chosen = tier
+    return dict(chosen, richness=score)
+
+
+class TierMetrics:
+    """Calls, latency, tokens and prompt-cache hits per model tier"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._tiers = {}
+
+    def _tier_name(self, model):
+        for tier in get_tiers():
+            if tier['model'] == model:
+                return tier['name']
+        return model
+
+    def record(self, model, seconds, usage=None):
+        """Record one call; `usage` is the usage object of the response (or None)"""
+        name = self._tier_name(model)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        with self._lock:
+            entry = self._tiers.setdefault(name, {
+                'model': model, 'calls': 0, 'tokens': 0, 'prompt_tokens': 0, 'cached_tokens': 0,
+                'latencies': deque(maxlen=500)
+            })
+            entry['calls'] += 1
+            entry['tokens'] += getattr(usage, 'total_tokens', 0) or 0
+            entry['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+            entry['cached_tokens'] += getattr(details, 'cached_tokens', 0) or 0
+            entry['latencies'].append(seconds)
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for name, entry in self._tiers.items():
+                latencies = sorted(entry['latencies'])
+                result[name] = {
+                    'model': entry['model'],
+                    'calls': entry['calls'],
+                    'tokens': entry['tokens'],
+                    'cached_ratio': round(entry['cached_tokens'] / entry['prompt_tokens'], 3) if entry['prompt_tokens'] else None,
+                    'latency_p50': round(latencies[len(latencies) // 2], 2) if latencies else None,
+                    'latency_p95': round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None
+                }
+            return result
+
+
+_tier_metrics = TierMetrics()
+
+def get_tier_metrics():
+    """Process-wide per-tier metrics"""
+    return _tier_metrics
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 
 class AIAssessment(models.Model):
@@ -79,4 +80,80 @@ class AIAssessment(models.Model):
         elif self.calculated_score >= 40:
             return "Entwicklungsbedarf"
         else:
-            return "Hohes Potenzial"
\ No newline at end of file
+            return "Hohes Potenzial"
+
+class AssessmentJob(models.Model):
+    """
+    Durable processing job for one ki_check_submissions row
+    Tracks attempts and exponential backoff (see job_queue.py)
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Wartend'),
+        (STATUS_RUNNING, 'In Bearbeitung'),
+        (STATUS_SUCCEEDED, 'Erfolgreich'),
+        (STATUS_DEAD, 'Fehlgeschlagen'),
+    ]
+    
+    assessment_id = models.UUIDField(unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        verbose_name = 'Bewertungs-Job'
+        verbose_name_plural = 'Bewertungs-Jobs'
+    
+    def __str__(self):
+        return f"{self.assessment_id} ({self.status}, {self.attempts}/{self.max_attempts})"
+
+
+class DeadLetterJob(models.Model):
+    """
+    Assessment that failed max_attempts times and is no longer retried
+    Requeue it from the admin once the cause is fixed
+    """
+    assessment_id = models.UUIDField(db_index=True)
+    attempts = models.IntegerField()
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-failed_at']
+        verbose_name = 'Fehlgeschlagener Job'
+        verbose_name_plural = 'Fehlgeschlagene Jobs'
+    
+    def __str__(self):
+        return f"{self.assessment_id} ({self.attempts} Versuche)"
+
+
+class AnalysisBatch(models.Model):
+    """
+    OpenAI Batch API job analysing a backlog of assessments (see batch_analysis.py)
+    The assessments stay leased to the batch until its results are applied
+    """
+    batch_id = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=50, db_index=True)
+    assessment_ids = models.JSONField(default=list)
+    request_count = models.IntegerField(default=0)
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Analyse-Batch'
+        verbose_name_plural = 'Analyse-Batches'
+    
+    def __str__(self):
+        return f"{self.batch_id} ({self.status}, {self.request_count} Anfragen)"
@@ -0,0 +1,81 @@
+# myapp/notifications.py
+# Postgres LISTEN/NOTIFY listener that wakes the processor on new submissions
+#
+# Requires the trigger from sql/002_assessment_notify.sql and a direct
+# Postgres connection string in SUPABASE_DB_URL (Supabase: Settings -> Database)
+
+import time
+import select
+import logging
+from threading import Thread
+
+logger = logging.getLogger(__name__)
+
+
+class AssessmentListener:
+    """
+    Background thread that LISTENs on a Postgres channel and calls
+    `on_notify(payload)` for every notification received.
+    Reconnects automatically if the connection drops.
+    """
+
+    def __init__(self, dsn, channel, on_notify, reconnect_delay=5):
+        self.dsn = dsn
+        self.channel = channel
+        self.on_notify = on_notify
+        self.reconnect_delay = reconnect_delay
+        self.running = False
+        self.connected = False
+        self.thread = None
+
+    def start(self):
+        """Start listening in a daemon thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = Thread(target=self._listen_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"👂 Listening for new assessments on '{self.channel}'")
+
+    def stop(self):
+        """Stop listening (the thread exits within one select timeout)"""
+        self.running = False
+
+    def _listen_loop(self):
+        while self.running:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"❌ Notification listener error: {str(e)}")
+            finally:
+                self.connected = False
+
+            if self.running:
+                time.sleep(self.reconnect_delay)
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}";')
+            self.connected = True
+
+            # Wake once after (re)connecting in case we missed notifications
+            self.on_notify(None)
+
+            while self.running:
+                # Wait up to 5 seconds so stop() is noticed promptly
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    logger.info(f"🔔 New assessment notification: {notify.payload[:8]}...")
+                    self.on_notify(notify.payload)
+        finally:
+            conn.close()
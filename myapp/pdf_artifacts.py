@@ -0,0 +1,120 @@
+# myapp/pdf_artifacts.py
+# Rendered PDF reports spooled to disk
+#
+# The render workers write each report straight into a file in
+# PDF_ARTIFACT_DIR and only a PDFArtifact (path + size) travels through the
+# pipeline queues, so queued reports take no memory. The email attachment is
+# base64-encoded from the file in chunks and the raw PDF is never read whole.
+#
+# The attachment itself is not streamed: the email package needs the payload
+# as one str and Django's SMTP backend serialises the whole message to bytes
+# for smtplib.sendmail() before anything is sent. While one email is built and
+# sent the encoded attachment therefore exists in full a few times over; the
+# saving is in the reports waiting in the queues, not in the send itself.
+#
+# Artifacts are deleted when their job finishes; files left behind by a
+# crashed process are removed after PDF_ARTIFACT_MAX_AGE_SECONDS.
+
+import os
+import time
+import base64
+import logging
+import tempfile
+from email.mime.base import MIMEBase
+from threading import Lock
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 57 input bytes are one 76-character base64 line
+ENCODE_CHUNK = 57 * 1024
+
+_spool_dir = None
+_spool_lock = Lock()
+
+
+class PDFArtifact:
+    """A rendered PDF report in a file"""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"PDFArtifact({self.path!r}, {self.size})"
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read(self):
+        """The whole PDF as bytes (for callers that need them)"""
+        with self.open() as f:
+            return f.read()
+
+    def mime_attachment(self, filename):
+        """
+        application/pdf attachment, base64-encoded from the file chunk by chunk
+        (the encoded lines are joined into the one str payload MIMEBase needs)
+        """
+        lines = []
+        with self.open() as f:
+            for chunk in iter(lambda: f.read(ENCODE_CHUNK), b''):
+                lines.append(base64.encodebytes(chunk).decode('ascii'))
+
+        part = MIMEBase('application', 'pdf')
+        part.set_payload(''.join(lines))
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header('Content-Disposition', 'attachment', filename=filename)
+        return part
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_stale(directory, max_age):
+    """Delete report files older than `max_age` seconds; returns how many were removed"""
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith('.pdf') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def get_spool_dir():
+    """PDF_ARTIFACT_DIR, created (and cleared of stale files) on first use"""
+    global _spool_dir
+    with _spool_lock:
+        if _spool_dir is None:
+            directory = getattr(settings, 'PDF_ARTIFACT_DIR', None) or os.path.join(tempfile.gettempdir(), 'ki_reports')
+            os.makedirs(directory, exist_ok=True)
+            removed = remove_stale(directory, getattr(settings, 'PDF_ARTIFACT_MAX_AGE_SECONDS', 86400))
+            if removed:
+                logger.info(f"🧹 Removed {removed} stale report file(s) from {directory}")
+            _spool_dir = directory
+    return _spool_dir
+
+
+def new_artifact_path():
+    """Path of a new, empty report file in the spool directory"""
+    fd, path = tempfile.mkstemp(prefix='report-', suffix='.pdf', dir=get_spool_dir())
+    os.close(fd)
+    return path
+
+
+def discard(pdf):
+    """Delete a report if it is a spooled artifact (bytes and None are ignored)"""
+    if isinstance(pdf, PDFArtifact):
+        pdf.delete()
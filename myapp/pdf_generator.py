@@ -1,31 +1,220 @@
+# myapp/pdf_generator.py
+# German AI Readiness Assessment PDF report
+#
+# All paragraph and table styles are compiled once per process into a
+# ReportTheme (get_report_theme()) and shared by every report; styles are
+# only read during layout, so concurrent renders can use the same instance.
+# manage.py benchmark_pdf compares this with building the theme per report.
+#
+# With template=True the title page, section headings and footer come from
+# pdf_templates.py (laid out once per template version, stamped per report)
+# and only the analysis sections are flowed.
+#
+# write_assessment_pdf() builds straight into a file, so the worker
+# processes can spool reports to disk (see pdf_artifacts.py) instead of
+# holding and returning the whole PDF as bytes.
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import (SimpleDocTemplate, Table, TableStyle, Paragraph, 
+from reportlab.platypus import (SimpleDocTemplate, Table, TableStyle, Paragraph,
                                 Spacer, PageBreak)
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 from io import BytesIO
 from datetime import datetime
 
-def generate_assessment_pdf(assessment_data: dict) -> bytes:
+from .pdf_templates import StaticText, TitlePage, ReportFooter
+
+CONTENT_WIDTH = 16*cm
+
+# Score frame colour per level (>=70, 40-69, <40)
+SCORE_COLORS = {
+    'Hoch': colors.HexColor('#28a745'),     # Green
+    'Mittel': colors.HexColor('#17a2b8'),   # Blue
+    'Niedrig': colors.HexColor('#ffc107'),  # Yellow
+}
+
+# Boxed list items: (background, border width, border colour, vertical padding)
+BOX_STYLES = {
+    'strength': ('#e8f5e9', 1, '#4caf50', 10),
+    'weakness': ('#fff3e0', 1, '#ff9800', 10),
+    'use_case': ('#e3f2fd', 1.5, '#2196f3', 12),
+    'quick_win': ('#f3e5f5', 2, '#9c27b0', 12),
+    'roadmap': ('#fafafa', 1.5, '#607d8b', 12),
+}
+
+
+def _score_band(score):
+    if score >= 70:
+        return 'Hoch'
+    if score >= 40:
+        return 'Mittel'
+    return 'Niedrig'
+
+
+class ReportTheme:
+    """Paragraph and table styles of the report, compiled once and reused"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+
+        # Custom Professional Styles
+        self.title = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=28,
+            textColor=colors.HexColor('#1a1a2e'),
+            spaceAfter=10,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            leading=32
+        )
+
+        self.subtitle = ParagraphStyle(
+            'SubTitle',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#16213e'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName='Helvetica',
+            leading=18
+        )
+
+        self.section_heading = ParagraphStyle(
+            'SectionHeading',
+            parent=styles['Heading2'],
+            fontSize=18,
+            textColor=colors.HexColor('#0f3460'),
+            spaceAfter=15,
+            spaceBefore=25,
+            fontName='Helvetica-Bold'
+        )
+
+        self.subsection_heading = ParagraphStyle(
+            'SubsectionHeading',
+            parent=styles['Heading3'],
+            fontSize=14,
+            textColor=colors.HexColor('#16213e'),
+            spaceAfter=10,
+            spaceBefore=15,
+            fontName='Helvetica-Bold'
+        )
+
+        self.body = ParagraphStyle(
+            'CustomBody',
+            parent=styles['BodyText'],
+            fontSize=11,
+            leading=16,
+            alignment=TA_JUSTIFY,
+            spaceAfter=12,
+            textColor=colors.HexColor('#2d2d2d')
+        )
+
+        self.highlight = ParagraphStyle(
+            'Highlight',
+            parent=self.body,
+            fontSize=12,
+            leading=18,
+            textColor=colors.HexColor('#0f3460'),
+            fontName='Helvetica-Bold'
+        )
+
+        self.info_box = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8f9fa')),
+            ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#0f3460')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 20),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 20),
+            ('TOPPADDING', (0, 0), (-1, -1), 15),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+        ])
+
+        self.score_boxes = {
+            band: TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+                ('BOX', (0, 0), (-1, -1), 3, color),
+                ('TOPPADDING', (0, 0), (-1, -1), 30),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 30),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ])
+            for band, color in SCORE_COLORS.items()
+        }
+
+        self.boxes = {
+            kind: TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(background)),
+                ('LEFTPADDING', (0, 0), (-1, -1), 15),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+                ('TOPPADDING', (0, 0), (-1, -1), padding),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+                ('BOX', (0, 0), (-1, -1), width, colors.HexColor(border)),
+            ])
+            for kind, (background, width, border, padding) in BOX_STYLES.items()
+        }
+
+    def box(self, content, kind):
+        """Full-width single-cell table around a body paragraph"""
+        table = Table([[Paragraph(content, self.body)]], colWidths=[CONTENT_WIDTH])
+        table.setStyle(self.boxes[kind])
+        return table
+
+
+_report_theme = None
+
+def get_report_theme():
+    """Process-wide report theme"""
+    global _report_theme
+    if _report_theme is None:
+        _report_theme = ReportTheme()
+    return _report_theme
+
+
+def generate_assessment_pdf(assessment_data: dict, template: bool = False) -> bytes:
     """
     Generate a highly professional German AI Readiness Assessment PDF
     This is the main function called from your views
     Updated for new database structure
     """
-    return generate_professional_pdf(assessment_data)
+    return generate_professional_pdf(assessment_data, template=template)
+
+
+def write_assessment_pdf(assessment_data: dict, output, template: bool = False) -> None:
+    """Render the report into `output` (a file path or a binary file object)"""
+    build_professional_pdf(assessment_data, output, template=template)
 
 
-def generate_professional_pdf(assessment_data: dict) -> bytes:
+def generate_professional_pdf(assessment_data: dict, theme: ReportTheme = None,
+                              template: bool = False) -> bytes:
     """
     Generate a highly professional German AI Readiness Assessment PDF
     Updated for new database structure
     """
     buffer = BytesIO()
-    
+    build_professional_pdf(assessment_data, buffer, theme=theme, template=template)
+
+    pdf_content = buffer.getvalue()
+    buffer.close()
+
+    return pdf_content
+
+
+def build_professional_pdf(assessment_data: dict, output, theme: ReportTheme = None,
+                           template: bool = False) -> None:
+    """
+    Lay out the report and write it to `output` (a file path or a binary file object)
+
+    `theme` defaults to the shared process-wide theme; `template` uses the
+    pre-laid-out title page, headings and footer (see pdf_templates.py)
+    """
+    theme = theme or get_report_theme()
+
+    def heading(text, style=theme.section_heading):
+        return StaticText(text, style) if template else Paragraph(text, style)
+
     doc = SimpleDocTemplate(
-        buffer,
+        output,
         pagesize=A4,
         topMargin=1.5*cm,
         bottomMargin=2*cm,
@@ -33,192 +222,61 @@ def generate_professional_pdf(assessment_data: dict) -> bytes:
         rightMargin=2*cm,
         title=f"KI-Readiness Bewertung - {assessment_data.get('company_name', 'Unternehmen')}"
     )
-    
+
     elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom Professional Styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=28,
-        textColor=colors.HexColor('#1a1a2e'),
-        spaceAfter=10,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold',
-        leading=32
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'SubTitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#16213e'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica',
-        leading=18
-    )
-    
-    section_heading = ParagraphStyle(
-        'SectionHeading',
-        parent=styles['Heading2'],
-        fontSize=18,
-        textColor=colors.HexColor('#0f3460'),
-        spaceAfter=15,
-        spaceBefore=25,
-        fontName='Helvetica-Bold'
-    )
-    
-    subsection_heading = ParagraphStyle(
-        'SubsectionHeading',
-        parent=styles['Heading3'],
-        fontSize=14,
-        textColor=colors.HexColor('#16213e'),
-        spaceAfter=10,
-        spaceBefore=15,
-        fontName='Helvetica-Bold'
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=11,
-        leading=16,
-        alignment=TA_JUSTIFY,
-        spaceAfter=12,
-        textColor=colors.HexColor('#2d2d2d')
-    )
-    
-    highlight_style = ParagraphStyle(
-        'Highlight',
-        parent=body_style,
-        fontSize=12,
-        leading=18,
-        textColor=colors.HexColor('#0f3460'),
-        fontName='Helvetica-Bold'
-    )
-    
-    # === TITLE PAGE ===
-    elements.append(Spacer(1, 1.5*cm))
-    elements.append(Paragraph("KI-READINESS BEWERTUNG", title_style))
-    elements.append(Paragraph("Professionelle Analyse & Strategische Handlungsempfehlungen", subtitle_style))
-    elements.append(Spacer(1, 1*cm))
-    
-    # Company Info Box
-    company_info = f"""
-    <b>Unternehmen:</b> {assessment_data.get('company_name', 'N/A')}<br/>
-    <b>Branche:</b> {assessment_data.get('industry') or 'Nicht angegeben'}<br/>
-    <b>Unternehmensgröße:</b> {assessment_data.get('company_size') or 'Nicht angegeben'}<br/>
-    <b>Bewertungsdatum:</b> {datetime.now().strftime('%d. %B %Y')}
-    """
-    
-    info_table_data = [[Paragraph(company_info, body_style)]]
-    info_table = Table(info_table_data, colWidths=[16*cm])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8f9fa')),
-        ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#0f3460')),
-        ('LEFTPADDING', (0, 0), (-1, -1), 20),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 20),
-        ('TOPPADDING', (0, 0), (-1, -1), 15),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-    ]))
-    
-    elements.append(info_table)
-    elements.append(Spacer(1, 1.5*cm))
-    
-    # === SCORE DISPLAY ===
+
+    # === SCORE ===
     score = assessment_data.get('calculated_score', 0)
     score_level = assessment_data.get('score_level', 'N/A')
-    
+
     # Determine color based on new scale
-    if score >= 70:
-        score_color = colors.HexColor('#28a745')  # Green - Hoch
-    elif score >= 40:
-        score_color = colors.HexColor('#17a2b8')  # Blue - Mittel
+    band = _score_band(score)
+    score_color = SCORE_COLORS[band]
+
+    if template:
+        # === TITLE PAGE (stamped) ===
+        elements.append(TitlePage(theme, CONTENT_WIDTH, (
+            assessment_data.get('company_name', 'N/A'),
+            assessment_data.get('industry') or 'Nicht angegeben',
+            assessment_data.get('company_size') or 'Nicht angegeben',
+            datetime.now().strftime('%d. %B %Y')
+        ), score, score_level, score_color))
+        elements.append(PageBreak())
     else:
-        score_color = colors.HexColor('#ffc107')  # Yellow - Niedrig
-    
-    score_heading = Paragraph("IHRE KI-READINESS BEWERTUNG", section_heading)
-    elements.append(score_heading)
-    
-    score_display = f"""
-    <para alignment="center">
-        <font size="60" color="{score_color.hexval()}"><b>{score}</b></font><br/>
-        <font size="20" color="#666666">/100 Punkte</font><br/>
-        <font size="16" color="{score_color.hexval()}"><b>{score_level}</b></font>
-    </para>
-    """
-    
-    score_table = Table([[Paragraph(score_display, body_style)]], colWidths=[16*cm])
-    score_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-        ('BOX', (0, 0), (-1, -1), 3, score_color),
-        ('TOPPADDING', (0, 0), (-1, -1), 30),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 30),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    elements.append(score_table)
-    elements.append(PageBreak())
-    
+        elements.extend(_title_page(assessment_data, theme, score, score_level, score_color, band))
+
     # === EXECUTIVE SUMMARY ===
     analysis = assessment_data.get('chatgpt_analysis', {})
-    
-    elements.append(Paragraph("EXECUTIVE SUMMARY", section_heading))
+
+    elements.append(heading("EXECUTIVE SUMMARY"))
     summary_text = analysis.get('executive_summary', 'Analyse wird durchgeführt.')
-    elements.append(Paragraph(summary_text, body_style))
+    elements.append(Paragraph(summary_text, theme.body))
     elements.append(Spacer(1, 0.5*cm))
-    
+
     # === STRENGTHS ===
-    elements.append(Paragraph("IHRE STÄRKEN", section_heading))
+    elements.append(heading("IHRE STÄRKEN"))
     strengths = analysis.get('strengths', [])
-    
+
     for strength in strengths:
-        strength_box = Table(
-            [[Paragraph(f"<b>✓</b> {strength}", body_style)]],
-            colWidths=[16*cm]
-        )
-        strength_box.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e8f5e9')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#4caf50')),
-        ]))
-        elements.append(strength_box)
+        elements.append(theme.box(f"<b>✓</b> {strength}", 'strength'))
         elements.append(Spacer(1, 0.3*cm))
-    
+
     elements.append(Spacer(1, 0.5*cm))
-    
+
     # === IMPROVEMENT AREAS ===
-    elements.append(Paragraph("VERBESSERUNGSBEREICHE", section_heading))
+    elements.append(heading("VERBESSERUNGSBEREICHE"))
     weaknesses = analysis.get('weaknesses', [])
-    
+
     for weakness in weaknesses:
-        weakness_box = Table(
-            [[Paragraph(f"<b>→</b> {weakness}", body_style)]],
-            colWidths=[16*cm]
-        )
-        weakness_box.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fff3e0')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#ff9800')),
-        ]))
-        elements.append(weakness_box)
+        elements.append(theme.box(f"<b>→</b> {weakness}", 'weakness'))
         elements.append(Spacer(1, 0.3*cm))
-    
+
     elements.append(PageBreak())
-    
+
     # === RECOMMENDED USE CASES ===
-    elements.append(Paragraph("EMPFOHLENE KI-ANWENDUNGSFÄLLE", section_heading))
+    elements.append(heading("EMPFOHLENE KI-ANWENDUNGSFÄLLE"))
     use_cases = analysis.get('recommended_use_cases', [])
-    
+
     for i, use_case in enumerate(use_cases, 1):
         if isinstance(use_case, dict):
             title = use_case.get('title', f'Use Case {i}')
@@ -226,7 +284,7 @@ def generate_professional_pdf(assessment_data: dict) -> bytes:
             impact = use_case.get('impact', '')
             effort = use_case.get('effort', 'Mittel')
             priority = use_case.get('priority', 'Mittel')
-            
+
             use_case_content = f"""
             <b>{i}. {title}</b><br/>
             {description}<br/>
@@ -235,35 +293,23 @@ def generate_professional_pdf(assessment_data: dict) -> bytes:
             """
         else:
             use_case_content = f"<b>{i}.</b> {use_case}"
-        
-        use_case_box = Table(
-            [[Paragraph(use_case_content, body_style)]],
-            colWidths=[16*cm]
-        )
-        use_case_box.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e3f2fd')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-            ('TOPPADDING', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#2196f3')),
-        ]))
-        elements.append(use_case_box)
+
+        elements.append(theme.box(use_case_content, 'use_case'))
         elements.append(Spacer(1, 0.4*cm))
-    
+
     elements.append(PageBreak())
-    
+
     # === QUICK WINS ===
-    elements.append(Paragraph("QUICK WINS - SOFORT UMSETZBAR", section_heading))
+    elements.append(heading("QUICK WINS - SOFORT UMSETZBAR"))
     quick_wins = analysis.get('quick_wins', [])
-    
+
     for i, win in enumerate(quick_wins, 1):
         if isinstance(win, dict):
             win_title = win.get('title', f'Quick Win {i}')
             win_desc = win.get('description', '')
             timeframe = win.get('timeframe', '')
             benefit = win.get('expected_benefit', '')
-            
+
             win_content = f"""
             <b>🚀 {win_title}</b><br/>
             {win_desc}<br/>
@@ -272,37 +318,25 @@ def generate_professional_pdf(assessment_data: dict) -> bytes:
             """
         else:
             win_content = f"<b>🚀 Quick Win {i}</b><br/>{win}"
-        
-        win_box = Table(
-            [[Paragraph(win_content, body_style)]],
-            colWidths=[16*cm]
-        )
-        win_box.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f3e5f5')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-            ('TOPPADDING', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#9c27b0')),
-        ]))
-        elements.append(win_box)
+
+        elements.append(theme.box(win_content, 'quick_win'))
         elements.append(Spacer(1, 0.4*cm))
-    
+
     elements.append(PageBreak())
-    
+
     # === STRATEGIC ROADMAP ===
-    elements.append(Paragraph("STRATEGISCHE ROADMAP", section_heading))
+    elements.append(heading("STRATEGISCHE ROADMAP"))
     strategic_steps = analysis.get('strategic_steps', [])
-    
+
     for i, step in enumerate(strategic_steps, 1):
         if isinstance(step, dict):
             phase = step.get('phase', f'Phase {i}')
             description = step.get('description', '')
             timeframe = step.get('timeframe', '')
             actions = step.get('key_actions', [])
-            
+
             actions_text = '<br/>'.join([f"• {action}" for action in actions]) if actions else ''
-            
+
             step_content = f"""
             <b>{phase}</b><br/>
             {description}<br/>
@@ -312,57 +346,86 @@ def generate_professional_pdf(assessment_data: dict) -> bytes:
             """
         else:
             step_content = f"<b>Phase {i}</b><br/>{step}"
-        
-        step_box = Table(
-            [[Paragraph(step_content, body_style)]],
-            colWidths=[16*cm]
-        )
-        step_box.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fafafa')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-            ('TOPPADDING', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#607d8b')),
-        ]))
-        elements.append(step_box)
+
+        elements.append(theme.box(step_content, 'roadmap'))
         elements.append(Spacer(1, 0.4*cm))
-    
+
     # === BUDGET & NEXT ACTIONS ===
     elements.append(Spacer(1, 0.5*cm))
-    
+
     budget_rec = analysis.get('budget_recommendation', '')
     if budget_rec:
-        elements.append(Paragraph("BUDGET-EMPFEHLUNG", subsection_heading))
-        elements.append(Paragraph(budget_rec, highlight_style))
+        elements.append(heading("BUDGET-EMPFEHLUNG", theme.subsection_heading))
+        elements.append(Paragraph(budget_rec, theme.highlight))
         elements.append(Spacer(1, 0.5*cm))
-    
+
     next_actions = analysis.get('next_actions', [])
     if next_actions:
-        elements.append(Paragraph("NÄCHSTE KONKRETE SCHRITTE", subsection_heading))
+        elements.append(heading("NÄCHSTE KONKRETE SCHRITTE", theme.subsection_heading))
         for action in next_actions:
-            elements.append(Paragraph(f"→ {action}", body_style))
+            elements.append(Paragraph(f"→ {action}", theme.body))
         elements.append(Spacer(1, 0.5*cm))
-    
+
     # === FOOTER ===
     elements.append(Spacer(1, 1*cm))
-    
-    footer_text = """
+
+    if template:
+        elements.append(ReportFooter())
+    else:
+        footer_text = """
+        <para alignment="center">
+        <font size="9" color="#666666">
+        ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━<br/>
+        Dieser Bericht wurde automatisch generiert und dient als strategische Entscheidungsgrundlage.<br/>
+        Für eine detaillierte Beratung und individuelle Unterstützung stehen wir Ihnen gerne zur Verfügung.<br/>
+        © 2025 KI-Readiness Assessment | Vertraulich & Persönlich
+        </font>
+        </para>
+        """
+        elements.append(Paragraph(footer_text, theme.body))
+
+    # Build PDF
+    doc.build(elements)
+
+
+def _title_page(assessment_data, theme, score, score_level, score_color, band):
+    """Flowed title page: company info box and score frame"""
+    elements = []
+    elements.append(Spacer(1, 1.5*cm))
+    elements.append(Paragraph("KI-READINESS BEWERTUNG", theme.title))
+    elements.append(Paragraph("Professionelle Analyse & Strategische Handlungsempfehlungen", theme.subtitle))
+    elements.append(Spacer(1, 1*cm))
+
+    # Company Info Box
+    company_info = f"""
+    <b>Unternehmen:</b> {assessment_data.get('company_name', 'N/A')}<br/>
+    <b>Branche:</b> {assessment_data.get('industry') or 'Nicht angegeben'}<br/>
+    <b>Unternehmensgröße:</b> {assessment_data.get('company_size') or 'Nicht angegeben'}<br/>
+    <b>Bewertungsdatum:</b> {datetime.now().strftime('%d. %B %Y')}
+    """
+
+    info_table = Table([[Paragraph(company_info, theme.body)]], colWidths=[CONTENT_WIDTH])
+    info_table.setStyle(theme.info_box)
+
+    elements.append(info_table)
+    elements.append(Spacer(1, 1.5*cm))
+
+    # === SCORE DISPLAY ===
+    score_heading = Paragraph("IHRE KI-READINESS BEWERTUNG", theme.section_heading)
+    elements.append(score_heading)
+
+    score_display = f"""
     <para alignment="center">
-    <font size="9" color="#666666">
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━<br/>
-    Dieser Bericht wurde automatisch generiert und dient als strategische Entscheidungsgrundlage.<br/>
-    Für eine detaillierte Beratung und individuelle Unterstützung stehen wir Ihnen gerne zur Verfügung.<br/>
-    © 2025 KI-Readiness Assessment | Vertraulich & Persönlich
-    </font>
+        <font size="60" color="{score_color.hexval()}"><b>{score}</b></font><br/>
+        <font size="20" color="#666666">/100 Punkte</font><br/>
+        <font size="16" color="{score_color.hexval()}"><b>{score_level}</b></font>
     </para>
     """
-    elements.append(Paragraph(footer_text, body_style))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    pdf_content = buffer.getvalue()
-    buffer.close()
-    
-    return pdf_content
\ No newline at end of file
+
+    score_table = Table([[Paragraph(score_display, theme.body)]], colWidths=[CONTENT_WIDTH])
+    score_table.setStyle(theme.score_boxes[band])
+
+    elements.append(score_table)
+    elements.append(PageBreak())
+
+    return elements
@@ -0,0 +1,240 @@
+# myapp/pdf_pool.py
+# Render PDF reports in a pool of worker processes
+#
+# ReportLab layout is pure-Python CPU work. Run inside the gunicorn worker it
+# holds the GIL that the request threads need, so a burst of reports slows
+# every web request down. render_pdf() hands the report fields to a bounded
+# ProcessPoolExecutor instead; the worker writes the PDF into a spool file
+# and only its size comes back (see pdf_artifacts.py):
+# - PDF_RENDER_PROCESSES workers (0 renders in the calling thread)
+# - a worker is replaced after PDF_RENDER_MAX_TASKS_PER_CHILD reports, which
+#   bounds memory growth from ReportLab's font and style caches
+# - at most PDF_RENDER_PROCESSES reports are handed to the pool at a time;
+#   further callers wait for a free worker first, so the timeout below only
+#   counts rendering (plus starting the worker, for the first report of a pool)
+# - a report not rendered within PDF_RENDER_TIMEOUT_SECONDS raises
+#   PDFRenderTimeout; new reports go to a fresh pool, and the old one is
+#   killed (with the stuck worker) once its other reports are done
+# - a crashed worker (BrokenProcessPool) replaces the pool and the report is
+#   tried once more
+#
+# Workers are started with 'spawn': forking the threaded web process is
+# unsafe, and worker recycling needs a non-fork start method anyway.
+
+import os
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock, Thread
+
+from django.conf import settings
+
+from .pdf_artifacts import PDFArtifact, new_artifact_path
+
+logger = logging.getLogger(__name__)
+
+# The only fields the report uses; everything else stays in this process
+REPORT_FIELDS = (
+    'company_name', 'industry', 'company_size',
+    'calculated_score', 'score_level', 'chatgpt_analysis'
+)
+
+
+class PDFRenderTimeout(TimeoutError):
+    pass
+
+
+def _warm_up():
+    """Worker initializer: import ReportLab and compile the theme before the first report"""
+    from .pdf_generator import get_report_theme
+    get_report_theme()
+
+
+def _render(report, template, path):
+    from .pdf_generator import write_assessment_pdf
+    write_assessment_pdf(report, path, template=template)
+    return os.path.getsize(path)
+
+
+def report_fields(assessment):
+    """The part of an assessment row that is sent to the render worker"""
+    return {field: assessment.get(field) for field in REPORT_FIELDS if field in assessment}
+
+
+class PDFRenderPool:
+    """Bounded process pool for PDF rendering with timeouts and worker recycling"""
+
+    def __init__(self, processes=2, timeout=60, max_tasks_per_child=100, template=True):
+        self.processes = processes
+        self.template = template
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.rendered = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.restarts = 0
+        self._pool = None
+        self._lock = Lock()
+        self._slots = BoundedSemaphore(processes)
+        self._in_flight = {}  # pool -> futures submitted to it
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_up,
+                    max_tasks_per_child=self.max_tasks_per_child or None
+                )
+            return self._pool
+
+    def _detach(self, pool):
+        """Stop handing reports to `pool`; returns False if another thread already did"""
+        with self._lock:
+            if self._pool is not pool:
+                return False
+            self._pool = None
+            self.restarts += 1
+            return True
+
+    def _kill(self, pool):
+        """The executor cannot cancel a running task, so its workers are killed"""
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._in_flight.pop(pool, None)
+
+    def _replace(self, pool):
+        """Drop a broken pool; the next render starts a new one"""
+        self._detach(pool)
+        self._kill(pool)
+
+    def _retire(self, pool, stuck):
+        """
+        Drop a pool with a stuck worker: new reports go to a fresh pool at once,
+        the old one is killed once its other reports are done (or time out too)
+        """
+        if not self._detach(pool):
+            return
+
+        def finish():
+            with self._lock:
+                others = [f for f in self._in_flight.get(pool, ()) if f is not stuck and not f.done()]
+            wait(others, timeout=self.timeout)
+            self._kill(pool)
+
+        Thread(target=finish, name='pdf-pool-retire', daemon=True).start()
+
+    def _run(self, fn, *args):
+        """
+        Run `fn(*args)` in a worker within the timeout (one retry after a crash)
+        Waits for a free worker first; only the time in the worker counts
+        """
+        with self._slots:
+            for attempt in (1, 2):
+                pool = self._get_pool()
+                future = pool.submit(fn, *args)
+                with self._lock:
+                    self._in_flight.setdefault(pool, set()).add(future)
+                try:
+                    return future.result(timeout=self.timeout)
+                except FutureTimeout:
+                    with self._lock:
+                        self.timeouts += 1
+                    self._retire(pool, future)
+                    raise PDFRenderTimeout(f"PDF not rendered within {self.timeout}s")
+                except BrokenProcessPool:
+                    with self._lock:
+                        self.crashes += 1
+                    self._replace(pool)
+                    if attempt == 2:
+                        raise
+                    logger.warning("⚠️  PDF worker died, retrying in a new pool")
+                finally:
+                    with self._lock:
+                        self._in_flight.get(pool, set()).discard(future)
+
+    def render(self, assessment):
+        """
+        Render the PDF report of an assessment in a worker process
+
+        Returns:
+            PDFArtifact: the spooled PDF
+        Raises:
+            PDFRenderTimeout: if the report was not rendered in time
+        """
+        path = new_artifact_path()
+        try:
+            size = self._run(_render, report_fields(assessment), self.template, path)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        with self._lock:
+            self.rendered += 1
+        return PDFArtifact(path, size)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'rendered': self.rendered,
+                'timeouts': self.timeouts,
+                'crashes': self.crashes,
+                'restarts': self.restarts
+            }
+
+
+_pdf_pool = None
+_pool_lock = Lock()
+
+
+def get_pdf_pool():
+    """Process-wide render pool, or None if PDF_RENDER_PROCESSES is 0"""
+    global _pdf_pool
+    processes = getattr(settings, 'PDF_RENDER_PROCESSES', 2)
+    if not processes:
+        return None
+    with _pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = PDFRenderPool(
+                processes=processes,
+                timeout=getattr(settings, 'PDF_RENDER_TIMEOUT_SECONDS', 60),
+                max_tasks_per_child=getattr(settings, 'PDF_RENDER_MAX_TASKS_PER_CHILD', 100),
+                template=getattr(settings, 'PDF_TEMPLATE_MODE', True)
+            )
+            atexit.register(_pdf_pool.shutdown)
+    return _pdf_pool
+
+
+def get_pdf_pool_stats():
+    """Render counters of the pool, or None if it has not been used yet"""
+    return _pdf_pool.stats() if _pdf_pool is not None else None
+
+
+def render_pdf(assessment):
+    """
+    Render an assessment report into a spool file, in the pool when enabled
+    The caller deletes the returned PDFArtifact once it has been sent
+    """
+    pool = get_pdf_pool()
+    if pool is not None:
+        return pool.render(assessment)
+
+    path = new_artifact_path()
+    try:
+        _render(report_fields(assessment), getattr(settings, 'PDF_TEMPLATE_MODE', True), path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return PDFArtifact(path, os.path.getsize(path))
@@ -0,0 +1,253 @@
+# myapp/pdf_templates.py
+# Pre-laid-out page furniture for the PDF report (template mode)
+#
+# Most of the title page, all section headings and the closing footer are the
+# same in every report; only the company data, date, score and level change.
+# In template mode these parts are laid out once per TEMPLATE_VERSION and
+# content width (line breaking, string widths, positions) into a display list
+# of drawing operations, cached for the life of the process. Each report
+# replays the display list and stamps its few dynamic strings into fixed
+# slots; only the analysis sections are still flowed as paragraphs.
+#
+# Bump TEMPLATE_VERSION whenever the furniture below changes.
+
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth, getAscent
+from reportlab.platypus import Flowable
+
+TEMPLATE_VERSION = '2026-10.1'
+
+TITLE = "KI-READINESS BEWERTUNG"
+SUBTITLE = "Professionelle Analyse & Strategische Handlungsempfehlungen"
+SCORE_HEADING = "IHRE KI-READINESS BEWERTUNG"
+INFO_LABELS = ("Unternehmen:", "Branche:", "Unternehmensgröße:", "Bewertungsdatum:")
+FOOTER_LINES = (
+    "Dieser Bericht wurde automatisch generiert und dient als strategische Entscheidungsgrundlage.",
+    "Für eine detaillierte Beratung und individuelle Unterstützung stehen wir Ihnen gerne zur Verfügung.",
+    "© 2025 KI-Readiness Assessment | Vertraulich & Persönlich",
+)
+
+FOOTER_COLOR = colors.HexColor('#666666')
+INFO_BACKGROUND = colors.HexColor('#f8f9fa')
+INFO_BORDER = colors.HexColor('#0f3460')
+
+SCORE_FRAME_HEIGHT = 130
+MIN_FONT_SIZE = 7
+
+
+def _replay(canvas, ops):
+    """Draw a display list: ('font', name, size), ('color', fill), ('text', x, y, s),
+    ('centred', x, y, s), ('rect', x, y, w, h, fill, stroke, width), ('line', x1, y1, x2, y2, color, width)"""
+    for op in ops:
+        kind = op[0]
+        if kind == 'font':
+            canvas.setFont(op[1], op[2])
+        elif kind == 'color':
+            canvas.setFillColor(op[1])
+        elif kind == 'text':
+            canvas.drawString(op[1], op[2], op[3])
+        elif kind == 'centred':
+            canvas.drawCentredString(op[1], op[2], op[3])
+        elif kind == 'rect':
+            _, x, y, w, h, fill, stroke, width = op
+            canvas.setLineWidth(width)
+            if fill is not None:
+                canvas.setFillColor(fill)
+            if stroke is not None:
+                canvas.setStrokeColor(stroke)
+            canvas.rect(x, y, w, h, stroke=int(stroke is not None), fill=int(fill is not None))
+        elif kind == 'line':
+            _, x1, y1, x2, y2, color, width = op
+            canvas.setStrokeColor(color)
+            canvas.setLineWidth(width)
+            canvas.line(x1, y1, x2, y2)
+
+
+def _text_ops(lines, style, width, top):
+    """Display list for lines of plain text in a paragraph style, first line at `top`"""
+    ops = [('font', style.fontName, style.fontSize), ('color', style.textColor)]
+    y = top - getAscent(style.fontName, style.fontSize)
+    for line in lines:
+        if style.alignment == TA_CENTER:
+            ops.append(('centred', width / 2, y, line))
+        elif style.alignment == TA_RIGHT:
+            ops.append(('text', width - style.rightIndent - stringWidth(line, style.fontName, style.fontSize), y, line))
+        else:
+            ops.append(('text', style.leftIndent, y, line))
+        y -= style.leading
+    return ops
+
+
+def fit_text(text, font, size, width):
+    """Shrink `text` to fit `width` (down to MIN_FONT_SIZE, then cut with an ellipsis)"""
+    text = ' '.join(str(text).split())
+    while size > MIN_FONT_SIZE and stringWidth(text, font, size) > width:
+        size -= 0.5
+    if stringWidth(text, font, size) > width:
+        while text and stringWidth(text + '…', font, size) > width:
+            text = text[:-1]
+        text += '…'
+    return text, size
+
+
+@lru_cache(maxsize=256)
+def _static_text(version, text, style, width):
+    lines = simpleSplit(text, style.fontName, style.fontSize, width - style.leftIndent - style.rightIndent)
+    height = len(lines) * style.leading
+    return height, tuple(_text_ops(lines, style, width, height))
+
+
+class StaticText(Flowable):
+    """Fixed plain text in a paragraph style, laid out once per template version and width"""
+
+    def __init__(self, text, style):
+        super().__init__()
+        self.text = text
+        self.style = style
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height, self._ops = _static_text(TEMPLATE_VERSION, self.text, self.style, availWidth)
+        return self.width, self.height
+
+    def getSpaceBefore(self):
+        return self.style.spaceBefore
+
+    def getSpaceAfter(self):
+        return self.style.spaceAfter
+
+    def draw(self):
+        _replay(self.canv, self._ops)
+
+
+@lru_cache(maxsize=8)
+def _title_template(version, theme, width, box_width):
+    """
+    Display list of the static title page and the slots for the dynamic strings
+
+    Returns:
+        tuple: (height, static ops, slots) with slots 'values' (x, y, max width)
+        per info line, 'score' / 'points' / 'level' (centre x, y) and 'frame' (x, y, w, h)
+    """
+    title, subtitle, heading, body = theme.title, theme.subtitle, theme.section_heading, theme.body
+    left = (width - box_width) / 2
+    padding_x, padding_y = 20, 15
+    info_height = len(INFO_LABELS) * body.leading + 2 * padding_y
+
+    # Top-down layout, like the flowed title page
+    top = 1.5*cm
+    title_top = top
+    subtitle_top = title_top + title.leading + title.spaceAfter
+    info_top = subtitle_top + subtitle.leading + subtitle.spaceAfter + 1*cm
+    heading_top = info_top + info_height + 1.5*cm + heading.spaceBefore
+    frame_top = heading_top + heading.leading + heading.spaceAfter
+    height = frame_top + SCORE_FRAME_HEIGHT
+
+    def y(offset):
+        return height - offset
+
+    ops = []
+    ops += _text_ops([TITLE], title, width, y(title_top))
+    ops += _text_ops([SUBTITLE], subtitle, width, y(subtitle_top))
+    ops.append(('rect', left, y(info_top + info_height), box_width, info_height, INFO_BACKGROUND, INFO_BORDER, 2))
+
+    bold = 'Helvetica-Bold'
+    ops += [('font', bold, body.fontSize), ('color', body.textColor)]
+    values = []
+    baseline = y(info_top + padding_y) - getAscent(bold, body.fontSize)
+    for label in INFO_LABELS:
+        x = left + padding_x
+        ops.append(('text', x, baseline, label))
+        value_x = x + stringWidth(label + ' ', bold, body.fontSize)
+        values.append((value_x, baseline, left + box_width - padding_x - value_x))
+        baseline -= body.leading
+
+    ops += _text_ops([SCORE_HEADING], heading, width, y(heading_top))
+
+    frame = (left, y(height), box_width, SCORE_FRAME_HEIGHT)
+    centre = width / 2
+    score_y = y(frame_top) - 24 - getAscent(bold, 60)
+    slots = {
+        'values': tuple(values),
+        'frame': frame,
+        'score': (centre, score_y),
+        'points': (centre, score_y - 28),
+        'level': (centre, score_y - 54),
+    }
+    return height, tuple(ops), slots
+
+
+class TitlePage(Flowable):
+    """Title page: cached static layout plus the stamped company data and score"""
+
+    def __init__(self, theme, box_width, values, score, level, color):
+        super().__init__()
+        self.theme = theme
+        self.box_width = box_width
+        self.values = values
+        self.score = score
+        self.level = level
+        self.color = color
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height, self._ops, self._slots = _title_template(
+            TEMPLATE_VERSION, self.theme, availWidth, self.box_width
+        )
+        return self.width, self.height
+
+    def draw(self):
+        canvas = self.canv
+        body = self.theme.body
+        _replay(canvas, self._ops)
+
+        canvas.setFillColor(body.textColor)
+        for value, (x, y, max_width) in zip(self.values, self._slots['values']):
+            text, size = fit_text(value, body.fontName, body.fontSize, max_width)
+            canvas.setFont(body.fontName, size)
+            canvas.drawString(x, y, text)
+
+        x, y, w, h = self._slots['frame']
+        _replay(canvas, [('rect', x, y, w, h, None, self.color, 3)])
+
+        canvas.setFillColor(self.color)
+        canvas.setFont('Helvetica-Bold', 60)
+        canvas.drawCentredString(*self._slots['score'], str(self.score))
+        canvas.setFillColor(FOOTER_COLOR)
+        canvas.setFont('Helvetica', 20)
+        canvas.drawCentredString(*self._slots['points'], "/100 Punkte")
+        canvas.setFillColor(self.color)
+        text, size = fit_text(self.level, 'Helvetica-Bold', 16, w - 40)
+        canvas.setFont('Helvetica-Bold', size)
+        canvas.drawCentredString(*self._slots['level'], text)
+
+
+@lru_cache(maxsize=8)
+def _footer_template(version, width):
+    size, leading = 9, 14
+    rule_width = min(width, 15*cm)
+    height = 6 + len(FOOTER_LINES) * leading
+    ops = [('line', (width - rule_width) / 2, height - 1, (width + rule_width) / 2, height - 1, FOOTER_COLOR, 1.5),
+           ('font', 'Helvetica', size), ('color', FOOTER_COLOR)]
+    y = height - 6 - getAscent('Helvetica', size)
+    for line in FOOTER_LINES:
+        ops.append(('centred', width / 2, y, line))
+        y -= leading
+    return height, tuple(ops)
+
+
+class ReportFooter(Flowable):
+    """Closing footer (rule and three lines), laid out once per template version and width"""
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height, self._ops = _footer_template(TEMPLATE_VERSION, availWidth)
+        return self.width, self.height
+
+    def draw(self):
+        _replay(self.canv, self._ops)
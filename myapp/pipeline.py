@@ -0,0 +1,511 @@
+# myapp/pipeline.py
+# Staged assessment pipeline: analysis -> pdf -> email
+#
+# Each stage has its own bounded queue and worker threads, so a slow SMTP
+# handshake never holds up the next OpenAI call. The analysis_completed,
+# pdf_generated and email_sent flags act as stage checkpoints.
+#
+# The lease is renewed at every stage boundary. A job whose lease expired and
+# was taken over by another worker is dropped there, so the email is never
+# sent by two workers.
+#
+# Writes are merged into the in-memory row instead of refetching it, and the
+# status changes after the PDF are coalesced into a single update, so a row
+# costs one fetch and at most two writes.
+
+import time
+import asyncio
+import logging
+import traceback
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+
+from django.conf import settings
+
+from .supabase_client import get_supabase
+from .resilience import ProviderUnavailable
+from .pdf_artifacts import discard
+from .submissions import (
+    TABLE, STATUS_COLUMNS, ANALYSIS_COLUMNS, REPORT_COLUMNS,
+    claim_one, release, update_row
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# ANALYSIS PROGRESS
+# ============================================================
+# Sections of a streamed analysis that have arrived so far, per assessment,
+# for assessment_status. Kept in memory of the processing process, so only
+# visible to status requests served by the same process (embedded processor).
+
+_section_progress = {}
+_progress_lock = Lock()
+
+
+def record_section(assessment_id, key):
+    """Note that section `key` of an assessment's analysis has arrived"""
+    with _progress_lock:
+        sections = _section_progress.setdefault(assessment_id, [])
+        if key not in sections:
+            sections.append(key)
+
+
+def get_section_progress(assessment_id):
+    """Sections of the running analysis received so far, or None if none is running here"""
+    with _progress_lock:
+        sections = _section_progress.get(assessment_id)
+        return list(sections) if sections is not None else None
+
+
+def clear_section_progress(assessment_id):
+    with _progress_lock:
+        _section_progress.pop(assessment_id, None)
+
+
+# ============================================================
+# STAGE FUNCTIONS
+# ============================================================
+
+def keep_lease(assessment_id):
+    """
+    Renew our lease before the next stage
+    Returns False if it expired and another worker has taken the row over;
+    the caller must stop then (above all, not send the email)
+    """
+    if claim_one(assessment_id):
+        return True
+    logger.warning(f"⚠️  Lost the lease on {assessment_id[:8]} to another worker, dropping it")
+    return False
+
+
+def fetch_assessment(assessment_id, columns='*'):
+    """Fetch an assessment row (only the given columns), or None if it does not exist"""
+    response = get_supabase().table(TABLE).select(columns).eq(
+        'id', assessment_id
+    ).single().execute()
+    return response.data
+
+
+def fetch_for_processing(assessment_id, status=None):
+    """
+    Fetch the row with only the columns the remaining stages need
+    - raw_answers when the analysis still has to run
+    - chatgpt_analysis when only the PDF / email are left
+
+    `status` (checkpoint flags, e.g. a row returned by claim_batch) saves the
+    lightweight status fetch. Rows whose email was already sent are returned
+    without the heavy columns.
+    """
+    if not status or 'analysis_completed' not in status:
+        status = fetch_assessment(assessment_id, STATUS_COLUMNS)
+
+    if not status or status.get('email_sent', False):
+        return status
+
+    columns = REPORT_COLUMNS if status.get('analysis_completed', False) else ANALYSIS_COLUMNS
+    return fetch_assessment(assessment_id, columns)
+
+
+def run_analysis_stage(assessment):
+    """
+    Generate the ChatGPT analysis unless analysis_completed is already set
+    Returns the (refreshed) assessment row
+    """
+    if assessment.get('analysis_completed', False):
+        logger.info("✓ Analysis already completed, skipping...")
+        return assessment
+
+    logger.info("⏳ Step 1/3: Generating ChatGPT analysis...")
+
+    try:
+        from .ai_service import get_ai_service
+
+        ai_service = get_ai_service()
+
+        if getattr(settings, 'AI_ANALYSIS_STREAMING', True):
+            # Report sections as they arrive instead of waiting for the whole answer
+            started = time.monotonic()
+            assessment_id = assessment['id']
+            with _progress_lock:
+                _section_progress[assessment_id] = []
+
+            def on_section(key, value):
+                record_section(assessment_id, key)
+                logger.info(f"   📝 {assessment_id[:8]}: '{key}' ready after {time.monotonic() - started:.1f}s")
+
+            try:
+                analysis = ai_service.analyze_assessment(assessment, on_section=on_section)
+            finally:
+                clear_section_progress(assessment_id)
+        else:
+            analysis = ai_service.analyze_assessment(assessment)
+
+        store_analysis(assessment, analysis)
+        return assessment
+
+    except Exception as e:
+        logger.error(f"❌ ChatGPT analysis failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+def store_analysis(assessment, analysis):
+    """Write the analysis and its checkpoint, merged into the in-memory row"""
+    # FIXED: Only update columns that exist
+    fields = {
+        'calculated_score': analysis['score'],
+        'score_level': analysis['score_level'],
+        'chatgpt_analysis': analysis,
+        'analysis_completed': True
+    }
+    update_row(assessment['id'], fields)
+
+    # Merge into the in-memory row instead of refetching it
+    assessment.update(fields)
+
+    logger.info(f"✅ Analysis complete - Score: {analysis['score']}/100 ({analysis['score_level']})")
+
+
+def run_analysis_stage_many(assessments):
+    """
+    Analysis stage for several assessments at once: the analyses run
+    concurrently on the async service (AI_MAX_CONCURRENCY requests in flight,
+    paced by the RPM / TPM limiter) and are stored as they come back
+    Rows without a row (None), already analysed or already sent are skipped.
+    Failures are logged and leave analysis_completed unset (never raises)
+    """
+    pending = [
+        a for a in assessments
+        if a and not a.get('analysis_completed', False) and not a.get('email_sent', False)
+    ]
+    if not pending:
+        return
+
+    logger.info(f"⏳ Step 1/3: Generating {len(pending)} ChatGPT analyses concurrently...")
+
+    from .ai_service import AsyncAIReadinessService
+
+    async def analyze():
+        service = AsyncAIReadinessService()
+        try:
+            return await service.analyze_many(pending)
+        finally:
+            await service.close()
+
+    try:
+        analyses = asyncio.run(analyze())
+    except Exception as e:
+        logger.error(f"❌ Concurrent analysis failed: {str(e)}")
+        return
+
+    for assessment, analysis in zip(pending, analyses):
+        try:
+            if isinstance(analysis, BaseException):
+                raise analysis
+            store_analysis(assessment, analysis)
+        except Exception as e:
+            logger.error(f"❌ ChatGPT analysis failed for {assessment['id'][:8]}: {str(e)}")
+
+
+def run_pdf_stage(assessment):
+    """
+    Render the PDF report
+    The PDF itself is not stored, so it is rendered whenever the email is still due.
+    The pdf_generated checkpoint is written together with the email outcome.
+    Rendering runs in the PDF worker processes (see pdf_pool.py); the report is
+    returned as a spooled PDFArtifact, which the caller discards when done.
+    """
+    logger.info("⏳ Step 2/3: Generating professional PDF...")
+
+    try:
+        from .pdf_pool import render_pdf
+
+        pdf_buffer = render_pdf(assessment)
+
+        logger.info(f"✅ PDF created ({len(pdf_buffer) // 1024}KB)")
+        return pdf_buffer
+
+    except Exception as e:
+        logger.error(f"❌ PDF generation failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+def run_email_stage(assessment, pdf_buffer):
+    """
+    Send the report email and write the pdf_generated / email_sent checkpoints
+    On success the same update also releases the lease (claimed_by is cleared
+    on the in-memory row, so callers know not to release it again)
+    Returns True if the email was sent, False otherwise (never raises)
+    """
+    if assessment.get('email_sent', False):
+        logger.info("✓ Email already sent, skipping...")
+        return True
+
+    logger.info("⏳ Step 3/3: Sending email with PDF...")
+
+    assessment_id = assessment['id']
+    email_sent = False
+
+    try:
+        from .views import send_assessment_email
+
+        email_sent = send_assessment_email(assessment, pdf_buffer)
+
+        if not email_sent:
+            logger.error(f"❌ Failed to send email")
+
+    except Exception as e:
+        logger.error(f"❌ Email sending exception: {str(e)}")
+        logger.error(traceback.format_exc())
+
+    try:
+        if email_sent:
+            # One write for both checkpoints and the lease
+            fields = {
+                'pdf_generated': True,
+                'email_sent': True,
+                'claimed_by': None,
+                'lease_expires_at': None
+            }
+        elif not assessment.get('pdf_generated', False):
+            # email_sent stays false so it can be retried
+            fields = {'pdf_generated': True}
+        else:
+            fields = None
+
+        if fields:
+            update_row(assessment_id, fields)
+            assessment.update(fields)
+
+    except Exception as e:
+        logger.error(f"❌ Could not update status for {assessment_id}: {str(e)}")
+
+    if email_sent:
+        logger.info(f"✅ Email sent successfully to {assessment.get('email')}")
+    return email_sent
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+class PipelineJob:
+    """One assessment travelling through the pipeline"""
+
+    def __init__(self, assessment_id, on_done=None, status=None):
+        self.assessment_id = assessment_id
+        self.status = status
+        self.assessment = None
+        self.pdf_buffer = None
+        self.on_done = on_done
+
+
+class AssessmentPipeline:
+    """
+    Runs assessments through the analysis, pdf and email stages
+    Each stage has a bounded queue and ASSESSMENT_STAGE_CONCURRENCY workers,
+    so I/O-bound and CPU-bound stages overlap across assessments.
+    """
+
+    STAGES = ('analysis', 'pdf', 'email')
+
+    def __init__(self, stage_workers=None, queue_size=None):
+        stage_workers = stage_workers or getattr(settings, 'ASSESSMENT_STAGE_CONCURRENCY', {})
+        queue_size = queue_size or getattr(settings, 'ASSESSMENT_STAGE_QUEUE_SIZE', 10)
+
+        self.stage_workers = {stage: max(1, int(stage_workers.get(stage, 1))) for stage in self.STAGES}
+        self.queues = {stage: Queue(maxsize=queue_size) for stage in self.STAGES}
+        self.threads = []
+        self.running = False
+
+        self.lock = Lock()
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker threads for every stage"""
+        if self.running:
+            return
+
+        self.running = True
+        for stage in self.STAGES:
+            for n in range(self.stage_workers[stage]):
+                thread = Thread(
+                    target=self._worker,
+                    args=(stage,),
+                    name=f'assessment-{stage}-{n + 1}',
+                    daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+        logger.info(f"🏭 Assessment pipeline started ({self.stage_workers})")
+
+    def stop(self):
+        """
+        Ask the workers to exit once they finish their current job
+        Never blocks: queued jobs are taken out and handed back (their leases
+        released) to make room for the stop markers
+        """
+        self.running = False
+        for stage in self.STAGES:
+            self._drain(stage)
+            for _ in range(self.stage_workers[stage]):
+                while True:
+                    try:
+                        self.queues[stage].put_nowait(None)
+                        break
+                    except Full:
+                        self._drain(stage)
+        self.threads = []
+
+    def _drain(self, stage):
+        """Hand back every job waiting in a stage queue"""
+        while True:
+            try:
+                job = self.queues[stage].get_nowait()
+            except Empty:
+                return
+            if job is not None:
+                self._hand_back(job)
+
+    def submit(self, assessment_id, claimed=False, on_done=None, status=None):
+        """
+        Queue an assessment for processing
+        Blocks while the analysis queue is full (backpressure)
+
+        Args:
+            assessment_id (str): UUID of the assessment
+            claimed (bool): True if the caller already holds the lease
+            on_done (callable): called as on_done(assessment_id, success, error)
+                before the lease is released
+            status (dict): checkpoint flags if already known (saves a fetch)
+
+        Returns:
+            bool: True if queued, False if another worker holds the lease
+        """
+        if not claimed and not claim_one(assessment_id):
+            logger.info(f"⏭️  Assessment {assessment_id} is being processed by another worker, skipping")
+            return False
+
+        with self.lock:
+            self.in_flight += 1
+
+        self.queues['analysis'].put(PipelineJob(assessment_id, on_done, status))
+        return True
+
+    def stats(self):
+        """Queue depths and counters, for monitoring"""
+        with self.lock:
+            return {
+                'running': self.running,
+                'in_flight': self.in_flight,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'workers': dict(self.stage_workers),
+                'queued': {stage: self.queues[stage].qsize() for stage in self.STAGES}
+            }
+
+    def _worker(self, stage):
+        while True:
+            job = self.queues[stage].get()
+            if job is None:
+                break
+
+            try:
+                if stage != 'analysis' and not keep_lease(job.assessment_id):
+                    self._hand_back(job, 'lease lost')
+                    continue
+
+                next_stage = self._run_stage(stage, job)
+                if next_stage and not self.running:
+                    # Stopping: the finished stages are checkpointed, the rest is retried later
+                    self._hand_back(job)
+                elif next_stage:
+                    self.queues[next_stage].put(job)
+            except ProviderUnavailable as e:
+                # Passed on as is, so the callback can defer without counting an attempt
+                logger.warning(f"⏸️  {stage} stage deferred for {job.assessment_id[:8]}: {str(e)}")
+                self._finish(job, False, e)
+            except Exception as e:
+                logger.error(f"❌ {stage} stage failed for {job.assessment_id[:8]}: {str(e)}")
+                self._finish(job, False, f"{stage}: {str(e)}")
+
+    def _run_stage(self, stage, job):
+        """Run one stage for a job and return the next stage (None when finished)"""
+        if stage == 'analysis':
+            job.assessment = fetch_for_processing(job.assessment_id, job.status)
+
+            if not job.assessment:
+                logger.error(f"❌ Assessment {job.assessment_id} not found")
+                self._finish(job, False, 'Assessment not found')
+                return None
+
+            if job.assessment.get('email_sent', False):
+                logger.info(f"✓ Email already sent for {job.assessment_id[:8]}, skipping...")
+                self._finish(job, True)
+                return None
+
+            logger.info(f"🔄 Processing: {job.assessment.get('company_name', 'N/A')} ({job.assessment_id[:8]})")
+            job.assessment = run_analysis_stage(job.assessment)
+            return 'pdf'
+
+        if stage == 'pdf':
+            job.pdf_buffer = run_pdf_stage(job.assessment)
+            return 'email'
+
+        success = run_email_stage(job.assessment, job.pdf_buffer)
+        self._finish(job, success, None if success else 'email: could not be sent')
+        return None
+
+    def _hand_back(self, job, reason='pipeline stopping'):
+        """
+        Give up an unfinished job without counting it as failed (pipeline
+        stopping, lease lost). The callback sees ProviderUnavailable, so no
+        attempt is used up; release() leaves a lease held by another worker alone
+        """
+        discard(job.pdf_buffer)
+        job.pdf_buffer = None
+
+        with self.lock:
+            self.in_flight -= 1
+
+        logger.info(f"↩️  Handing back {job.assessment_id[:8]} ({reason})")
+        if job.on_done:
+            try:
+                job.on_done(job.assessment_id, False, ProviderUnavailable(f"Handed back: {reason}", retry_after=0))
+            except Exception as e:
+                logger.error(f"❌ Pipeline callback failed: {str(e)}")
+        release(job.assessment_id)
+
+    def _finish(self, job, success, error=None):
+        discard(job.pdf_buffer)
+        job.pdf_buffer = None
+
+        with self.lock:
+            self.in_flight -= 1
+            if success:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+        if success:
+            logger.info(f"✅ Successfully processed: {job.assessment_id[:8]}")
+        else:
+            logger.error(f"❌ Failed to process: {job.assessment_id[:8]}")
+
+        # The callback may hand the lease over (e.g. to a retry backoff),
+        # so it runs before our own lease is released
+        if job.on_done:
+            try:
+                job.on_done(job.assessment_id, success, error)
+            except Exception as e:
+                logger.error(f"❌ Pipeline callback failed: {str(e)}")
+
+        # The final status update already cleared the lease on success
+        if job.assessment is None or job.assessment.get('claimed_by'):
+            release(job.assessment_id)
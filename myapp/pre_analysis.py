@@ -0,0 +1,196 @@
+# myapp/pre_analysis.py
+# Deterministic pre-analysis of the rated answers in raw_answers
+#
+# Strengths (capabilities rated >= 4), weaknesses (capabilities rated <= 2,
+# pain points rated >= 4), the strongest and weakest areas, quick-win
+# candidates (frequent recurring tasks) and the score level are plain
+# arithmetic, so they are computed here with NumPy instead of by the model.
+# The prompt passes the results on and asks for the narrative; rated items the
+# results do not list (middle or missing ratings) stay in the profile.
+#
+# Works on many assessments at once: all rated items of all rows are
+# flattened into arrays and aggregated in one go, which makes re-scoring the
+# whole table (manage.py rescore_assessments) a matter of seconds.
+
+import json
+
+import numpy as np
+
+# Kinds of rated categories
+PRIORITY = 0    # what the company wants (goals, outputs, metrics)
+CAPABILITY = 1  # what the company has / uses (higher is better)
+PAIN = 2        # problems (higher is worse)
+TASK = 3        # recurring manual work (higher frequency = better automation target)
+
+# (raw_answers key, label, kind)
+CATEGORIES = (
+    ('mainGoal', 'Hauptziele', PRIORITY),
+    ('priorityProcesses', 'Prioritätsprozesse', PRIORITY),
+    ('painPoints', 'Schmerzpunkte', PAIN),
+    ('recurringTasks', 'Wiederkehrende Aufgaben', TASK),
+    ('marketingTools', 'Marketing-Tools', CAPABILITY),
+    ('serviceTools', 'Service-Tools', CAPABILITY),
+    ('dataSources', 'Datenquellen', CAPABILITY),
+    ('desiredOutputs', 'Gewünschte Ergebnisse', PRIORITY),
+    ('languages', 'Sprachen', PRIORITY),
+    ('successMetrics', 'Erfolgsmetriken', PRIORITY),
+)
+
+STRENGTH_MIN = 4
+WEAKNESS_MAX = 2
+PAIN_MIN = 4
+QUICK_WIN_MIN = 3
+MAX_VALUE = 5
+
+MAX_ITEMS = {'strengths': 6, 'weaknesses': 6, 'quick_win_candidates': 4}
+MAX_AREAS = 2
+
+_KINDS = np.array([kind for _, _, kind in CATEGORIES])
+
+
+def score_levels(scores):
+    """Vectorized score -> 'Hoch' / 'Mittel' / 'Niedrig' (>=70, 40-69, <40)"""
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= 70, scores >= 40], ['Hoch', 'Mittel'], 'Niedrig')
+
+
+def parse_raw_answers(assessment):
+    """raw_answers of an assessment as a dict (also accepts a JSON string)"""
+    raw = assessment.get('raw_answers') or {}
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = {}
+    return raw if isinstance(raw, dict) else {}
+
+
+def to_number(value):
+    """float(value), or None if it is not a number"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _flatten(assessments):
+    """
+    All rated items of all assessments as parallel arrays (row, category, value) + texts
+    Items without a numeric rating are left out
+    """
+    rows, categories, values, texts = [], [], [], []
+
+    for row, assessment in enumerate(assessments):
+        raw = parse_raw_answers(assessment)
+        for category, (key, _, _) in enumerate(CATEGORIES):
+            items = raw.get(key)
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if not isinstance(item, dict) or not item.get('text'):
+                    continue
+                value = to_number(item.get('value'))
+                if value is None:
+                    continue
+                rows.append(row)
+                categories.append(category)
+                values.append(value)
+                texts.append(str(item['text']))
+
+    return (
+        np.array(rows, dtype=np.intp),
+        np.array(categories, dtype=np.intp),
+        np.array(values, dtype=float),
+        texts
+    )
+
+
+def _per_row(mask, order, rows, count):
+    """Item indices selected by `mask`, grouped by row (highest value first)"""
+    selected = order[mask[order]]
+    bounds = np.searchsorted(rows[selected], np.arange(count + 1))
+    return [selected[bounds[r]:bounds[r + 1]] for r in range(count)]
+
+
+def pre_analyze_many(assessments):
+    """
+    Pre-analyse many assessments at once
+
+    Returns:
+        list: one dict per assessment with score, score_level, strengths,
+        weaknesses, strongest_areas, weakest_areas, quick_win_candidates and
+        summarised ({raw_answers key: [(text, rating), ...]} of the items
+        listed in strengths, weaknesses and quick_win_candidates)
+    """
+    count = len(assessments)
+    if not count:
+        return []
+
+    rows, categories, values, texts = _flatten(assessments)
+    kinds = _KINDS[categories]
+
+    # Mean rating per (assessment, category); NaN where nothing was answered
+    sums = np.zeros((count, len(CATEGORIES)))
+    counts = np.zeros((count, len(CATEGORIES)))
+    np.add.at(sums, (rows, categories), values)
+    np.add.at(counts, (rows, categories), 1)
+    means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+    # Readiness per area: capabilities as rated, pain points inverted,
+    # goals and tasks are no readiness signal. Mild pain points make an area
+    # less weak but are no strength, so only capabilities rank as strongest
+    readiness = means.copy()
+    readiness[:, _KINDS == PAIN] = MAX_VALUE + 1 - readiness[:, _KINDS == PAIN]
+    readiness[:, (_KINDS == PRIORITY) | (_KINDS == TASK)] = np.nan
+    capabilities = np.where(_KINDS == CAPABILITY, readiness, np.nan)
+    strongest = np.argsort(-capabilities, axis=1, kind='stable')  # NaN sorts last
+    weakest = np.argsort(readiness, axis=1, kind='stable')
+
+    # Items ordered by assessment, then by rating (highest first)
+    order = np.lexsort((-values, rows))
+    masks = {
+        'strengths': (kinds == CAPABILITY) & (values >= STRENGTH_MIN),
+        'weaknesses': ((kinds == CAPABILITY) & (values <= WEAKNESS_MAX)) | ((kinds == PAIN) & (values >= PAIN_MIN)),
+        'quick_win_candidates': (kinds == TASK) & (values >= QUICK_WIN_MIN),
+    }
+    grouped = {name: _per_row(mask, order, rows, count) for name, mask in masks.items()}
+
+    scores = np.array([to_number(a.get('calculated_score')) for a in assessments], dtype=float)
+    scores = np.where(np.isnan(scores), 50, scores)
+    levels = score_levels(scores)
+
+    def item_label(index):
+        value = values[index]
+        rating = int(value) if value.is_integer() else round(float(value), 1)
+        return f"{CATEGORIES[categories[index]][1]}: {texts[index]} ({rating})"
+
+    def areas(ranking, ratings, row, exclude=()):
+        return [
+            (CATEGORIES[c][1], round(float(ratings[row, c]), 1))
+            for c in ranking[row] if not np.isnan(ratings[row, c]) and CATEGORIES[c][1] not in exclude
+        ][:MAX_AREAS]
+
+    results = []
+    for row in range(count):
+        top = areas(strongest, capabilities, row)
+        result = {
+            'score': int(round(scores[row])),
+            'score_level': str(levels[row]),
+            'strongest_areas': top,
+            'weakest_areas': areas(weakest, readiness, row, exclude={label for label, _ in top}),
+            'summarised': {},
+        }
+        for name, indices in grouped.items():
+            listed = indices[row][:MAX_ITEMS[name]]
+            result[name] = [item_label(i) for i in listed]
+            for i in listed:
+                key = CATEGORIES[categories[i]][0]
+                result['summarised'].setdefault(key, []).append((texts[i], float(values[i])))
+        results.append(result)
+
+    return results
+
+
+def pre_analyze(assessment):
+    """Pre-analysis of a single assessment"""
+    return pre_analyze_many([assessment])[0]
@@ -0,0 +1,352 @@
+# myapp/prompt_builder.py
+# Compact, token-budgeted prompt for the ChatGPT analysis
+#
+# Only answered fields are included, rated answers are listed as
+# "Text (Bewertung)" ordered by rating, and every field and section has a
+# token budget: long lists lose their lowest-rated items first and long free
+# text (detailedChallenges, additionalInfo, ...) is cut at a word boundary.
+# The JSON schema is a compact skeleton instead of prose.
+#
+# Layout for provider-side prompt caching: the system message is a static,
+# versioned prefix (role, task, schema); everything specific to the
+# assessment follows in the user message. The provider only caches from 1024
+# identical leading tokens on and the prefix is a few hundred, so it is not
+# padded to get there: cached_tokens in the model usage stats shows whether
+# a longer shared start (e.g. a future reference section) would pay off.
+#
+# Token counts use tiktoken when it is installed, otherwise an estimate.
+
+import json
+from functools import lru_cache
+
+from .pre_analysis import to_number
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+# Defaults, overridable per call (see AI_PROMPT_* settings)
+SECTION_TOKEN_BUDGET = 300
+FIELD_TOKEN_BUDGET = 120
+
+# Rough chars per token for German text without a tokenizer
+CHARS_PER_TOKEN = 3.5
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Number of tokens in `text` (exact with tiktoken, estimated otherwise)"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding('o200k_base')
+        return len(_encoding.encode(text))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def truncate_tokens(text, budget):
+    """
+    Cut `text` at a word boundary so it fits into `budget` tokens
+    Text without a space in the kept part (URLs, long compounds) is cut mid-word
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    # Shrink proportionally until it fits (usually one or two rounds)
+    while text and count_tokens(text + ' …') > budget:
+        cut = int(len(text) * budget / count_tokens(text + ' …')) - 1
+        text = text[:max(0, cut)]
+        if ' ' in text:
+            text = text.rsplit(' ', 1)[0]
+        text = text.rstrip(' ,.;:-')
+    return f'{text} …' if text else ''
+
+
+# Sections of the prompt: (title, [(label, source, key), ...])
+#   column - column of ki_check_submissions
+#   rated  - raw_answers list of {"text", "value"} items
+#   text   - raw_answers free text
+SECTIONS = (
+    ('Unternehmen', (
+        ('Name', 'column', 'company_name'),
+        ('Branche', 'column', 'industry'),
+        ('Größe', 'column', 'company_size'),
+        ('Umsatz', 'column', 'revenue'),
+    )),
+    ('Ziele & Strategie', (
+        ('Hauptziele', 'rated', 'mainGoal'),
+        ('Dringlichkeit', 'column', 'urgency'),
+        ('Budget', 'column', 'budget'),
+        ('Verantwortlich', 'column', 'responsible_person'),
+    )),
+    ('Prozesse & Herausforderungen', (
+        ('Prioritätsprozesse', 'rated', 'priorityProcesses'),
+        ('Schmerzpunkte', 'rated', 'painPoints'),
+        ('Wiederkehrende Aufgaben', 'rated', 'recurringTasks'),
+        ('Herausforderungen', 'text', 'detailedChallenges'),
+    )),
+    ('Technologie', (
+        ('CRM', 'column', 'crm_system'),
+        ('API-Zugang', 'column', 'api_access'),
+        ('Marketing-Tools', 'rated', 'marketingTools'),
+        ('Service-Tools', 'rated', 'serviceTools'),
+        ('Datenquellen', 'rated', 'dataSources'),
+    )),
+    ('Metriken', (
+        ('Leads/Monat', 'column', 'monthly_leads'),
+        ('Tickets/Monat', 'column', 'monthly_tickets'),
+        ('Gewünschte Ergebnisse', 'rated', 'desiredOutputs'),
+    )),
+    ('Anforderungen', (
+        ('Datenschutz', 'column', 'data_privacy_importance'),
+        ('Team-Akzeptanz', 'column', 'team_acceptance'),
+        ('Sprachen', 'rated', 'languages'),
+        ('Erfolgsmetriken', 'rated', 'successMetrics'),
+    )),
+    ('Sonstiges', (
+        ('Erfahrung', 'text', 'previousExperience'),
+        ('Umsetzungstempo', 'text', 'implementationSpeed'),
+        ('Größte Sorge', 'text', 'biggestConcern'),
+        ('Zusatzinfos', 'text', 'additionalInfo'),
+    )),
+)
+
+# Static prefix (see build_static_prefix). Bump the version on every change to
+# the role, instructions or schema so cached prefixes and analyses roll over
+PROMPT_VERSION = '2026-10.3'
+
+SYSTEM_ROLE = (
+    "Du bist ein erfahrener KI-Strategieberater mit Expertise in digitaler Transformation und "
+    "Geschäftsprozessoptimierung. Du analysierst Bewertungsskalen genau und gibst präzise, umsetzbare "
+    "Empfehlungen. Antworte IMMER auf Deutsch und nur mit validem JSON."
+)
+
+INSTRUCTIONS = """Aufgabe: Vollständige KI-Readiness-Analyse AUF DEUTSCH. Bewertungen in Klammern: höher = wichtiger/intensiver.
+1. Digitale Reife und KI-Bereitschaft anhand des Scores
+2. Stärken aus hohen Bewertungen (>= 4), Schwächen aus Lücken und niedrigen Bewertungen
+3. Use Cases passend zu den priorisierten Prozessen und Hauptzielen
+4. Quick Wins (3-6 Monate) aus wiederkehrenden Aufgaben
+5. Strategische Schritte und Empfehlungen nach Budget, Dringlichkeit und Team-Akzeptanz"""
+
+# Answer schema, one entry per top-level key of the analysis
+SCHEMA_FIELDS = (
+    ('score', '"score": <Score übernehmen>'),
+    ('score_level', '"score_level": "Hoch"|"Mittel"|"Niedrig" (>=70, 40-69, <40)'),
+    ('executive_summary', '"executive_summary": "2-3 Sätze: Hauptstärken und wichtigste Handlungsfelder"'),
+    ('strengths', '"strengths": ["..."] (4-6)'),
+    ('weaknesses', '"weaknesses": ["..."] (4-6)'),
+    ('recommended_use_cases', '"recommended_use_cases": [{"title", "description", "impact": "mit Zahlen wenn möglich", '
+                              '"effort": "Gering"|"Mittel"|"Hoch", "priority": "Sofort"|"Kurzfristig"|"Langfristig"}] '
+                              '(6-8, nach Hauptzielen priorisiert)'),
+    ('quick_wins', '"quick_wins": [{"title", "description", "timeframe", "expected_benefit": "messbar"}] (4-6)'),
+    ('strategic_steps', '"strategic_steps": [{"phase": "Phase 1: Name", "description", "timeframe", "key_actions": ["..."]}] (3-4)'),
+    ('budget_recommendation', '"budget_recommendation": "nach Phasen aufgeschlüsselt"'),
+    ('next_actions', '"next_actions": ["Schritt mit Verantwortlichkeit"] (4-5)'),
+)
+
+# Independent parts of the analysis for the fan-out mode: one request each,
+# merged back in this order into the same dict as a single request
+SECTION_GROUPS = (
+    ('assessment', ('score', 'score_level', 'executive_summary', 'strengths', 'weaknesses')),
+    ('use_cases', ('recommended_use_cases',)),
+    ('plan', ('quick_wins', 'strategic_steps', 'budget_recommendation', 'next_actions')),
+)
+
+
+def build_schema(sections=None):
+    """JSON skeleton of the answer, limited to `sections` (keys) if given"""
+    fields = [line for key, line in SCHEMA_FIELDS if sections is None or key in sections]
+    return 'Antworte NUR mit diesem JSON:\n{' + ',\n'.join(fields) + '}'
+
+
+def is_empty(value):
+    """True for unanswered fields (None, blank, 'N/A', 'Nicht angegeben', [])"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip() or value.strip() in ('N/A', 'Nicht angegeben', 'Keine')
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def answer_text(value):
+    """Free text from a raw answer ({"text": ...}, list of items or scalar)"""
+    if isinstance(value, dict):
+        return str(value.get('text', '')).strip()
+    if isinstance(value, list):
+        return ', '.join(answer_text(item) for item in value if not is_empty(item))
+    return str(value).strip()
+
+
+def _rated_items(value, skip=()):
+    """
+    'Text (value)' strings of a rated answer list, highest rating first
+    (items whose (text, rating) is in `skip` are left out)
+    """
+    if not isinstance(value, list):
+        return [answer_text(value)] if not is_empty(value) else []
+
+    rated = []
+    for position, item in enumerate(value):
+        if isinstance(item, dict) and item.get('text'):
+            rating = item.get('value')
+            if (str(item['text']), to_number(rating)) in skip:
+                continue
+            label = f"{item['text']} ({rating})" if rating not in (None, '') else str(item['text'])
+            try:
+                order = -float(rating)
+            except (TypeError, ValueError):
+                order = 0.0
+            rated.append((order, position, label))
+        elif not is_empty(item):
+            rated.append((0.0, position, answer_text(item)))
+    return [label for _, _, label in sorted(rated)]
+
+
+def _fit_items(label, items, budget):
+    """'label: a; b; c' with as many (highest-rated) items as fit into `budget`"""
+    line = f'{label}: '
+    taken = []
+    for item in items:
+        candidate = line + '; '.join(taken + [item])
+        if taken and count_tokens(candidate) > budget:
+            break
+        taken.append(item)
+    return line + '; '.join(taken)
+
+
+def _section_lines(fields, data, raw, section_budget, field_budget, skip):
+    lines = []
+    used = 0
+
+    for label, source, key in fields:
+        remaining = min(section_budget - used, field_budget)
+        if remaining <= 0:
+            break
+
+        if source == 'column':
+            value = data.get(key)
+            if is_empty(value):
+                continue
+            line = truncate_tokens(f'{label}: {value}', remaining)
+        elif source == 'rated':
+            items = _rated_items(raw.get(key), skip.get(key, ()))
+            if not items:
+                continue
+            line = _fit_items(label, items, remaining)
+        else:
+            value = raw.get(key)
+            if is_empty(value) or is_empty(answer_text(value)):
+                continue
+            line = truncate_tokens(f'{label}: {answer_text(value)}', remaining)
+
+        if not line:
+            continue
+        lines.append(line)
+        used += count_tokens(line) + 1
+
+    return lines
+
+
+def build_profile(assessment_data, section_budget=None, field_budget=None, skip=None):
+    """
+    Compact, budgeted description of the answered assessment fields
+    (`skip`: {raw_answers key: [(text, rating), ...]} of rated items to leave out)
+
+    Returns:
+        str: one block per non-empty section
+    """
+    section_budget = section_budget or SECTION_TOKEN_BUDGET
+    field_budget = field_budget or FIELD_TOKEN_BUDGET
+
+    raw = assessment_data.get('raw_answers') or {}
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = {}
+
+    skip = {key: set(items) for key, items in (skip or {}).items()}
+
+    blocks = []
+    for title, fields in SECTIONS:
+        lines = _section_lines(fields, assessment_data, raw, section_budget, field_budget, skip)
+        if lines:
+            blocks.append(f'## {title}\n' + '\n'.join(lines))
+    return '\n'.join(blocks)
+
+
+def build_facts(facts):
+    """Block with the locally computed pre-analysis (see pre_analysis.py)"""
+    lines = ['## Vorauswertung (berechnet)']
+    for label, key in (('Stärken', 'strengths'), ('Schwächen', 'weaknesses'),
+                       ('Quick-Win-Kandidaten', 'quick_win_candidates')):
+        if facts.get(key):
+            lines.append(f"{label}: {'; '.join(facts[key])}")
+    for label, key in (('Stärkste Bereiche', 'strongest_areas'), ('Schwächste Bereiche', 'weakest_areas')):
+        if facts.get(key):
+            lines.append(f"{label}: {'; '.join(f'{area} (Ø {mean})' for area, mean in facts[key])}")
+    return '\n'.join(lines)
+
+
+@lru_cache(maxsize=32)
+def build_static_prefix(sections=None, with_facts=False):
+    """
+    System message: version, role, task and answer schema
+
+    Identical for every report with the same sections / pre-analysis setting,
+    so provider-side prompt caching can reuse it; bump PROMPT_VERSION whenever
+    any of its parts changes
+    """
+    instructions = INSTRUCTIONS
+    if with_facts:
+        instructions += '\nStärken, Schwächen und Quick Wins aus der Vorauswertung übernehmen und ausformulieren.'
+    if sections is not None:
+        instructions += '\nLiefere in dieser Antwort NUR die Felder aus dem Schema unten.'
+
+    return '\n\n'.join([
+        f'Prompt-Version {PROMPT_VERSION}',
+        SYSTEM_ROLE,
+        instructions,
+        build_schema(sections),
+    ])
+
+
+def build_assessment_block(assessment_data, section_budget=None, field_budget=None, facts=None):
+    """
+    User message: everything specific to one assessment
+    With `facts` (pre_analysis result) the rated items listed in its strengths,
+    weaknesses and quick-win candidates are replaced by those lists; all other
+    answers stay in the profile
+    """
+    score = facts['score'] if facts is not None else assessment_data.get('calculated_score', 50)
+
+    blocks = [build_profile(
+        assessment_data, section_budget, field_budget,
+        skip=facts['summarised'] if facts is not None else None
+    )]
+    if facts is not None:
+        blocks.append(build_facts(facts))
+    blocks.append(f'Score (bereits berechnet, 0-100): {score}')
+    return '\n\n'.join(blocks)
+
+
+def build_messages(assessment_data, section_budget=None, field_budget=None, sections=None, facts=None):
+    """
+    Chat messages for the analysis: the static prefix first, the variable
+    assessment block last. With `sections` (keys of the analysis) only those
+    parts are requested
+
+    Returns:
+        tuple: (messages, token count)
+    """
+    system = build_static_prefix(tuple(sections) if sections is not None else None, facts is not None)
+    user = build_assessment_block(assessment_data, section_budget, field_budget, facts)
+    messages = [
+        {'role': 'system', 'content': system},
+        {'role': 'user', 'content': user},
+    ]
+    return messages, count_tokens(system) + count_tokens(user)
@@ -0,0 +1,138 @@
+# myapp/rate_limit.py
+# Token-bucket limiter for the OpenAI requests-per-minute and tokens-per-minute limits
+#
+# Every call reserves one request and its estimated tokens (prompt + expected
+# completion) up front and waits until both buckets cover the reservation, so
+# parallel callers stay below the account limits instead of running into 429s
+# and the fallback report. Once the real usage is known the difference is
+# settled. The buckets are thread-safe and shared by the synchronous service
+# (pipeline threads) and the async service (event loop).
+#
+# The buckets live in one process and do not coordinate with other processes:
+# each process gets 1/AI_RATE_LIMIT_PROCESSES of the account limits.
+
+import time
+import asyncio
+import logging
+from threading import Lock
+
+from django.conf import settings
+
+from .prompt_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_request_tokens(request, completion_tokens=None):
+    """Estimated prompt + completion tokens of a chat completion request"""
+    prompt = sum(count_tokens(message.get('content') or '') + 4 for message in request.get('messages', []))
+    if completion_tokens is None:
+        completion_tokens = request.get('max_tokens') or getattr(settings, 'AI_EXPECTED_COMPLETION_TOKENS', 2500)
+    return prompt + completion_tokens
+
+
+class TokenBucket:
+    """
+    Bucket refilled continuously at `per_minute` / 60 per second
+    Reservations may overdraw it; the caller waits until the debt is repaid
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take `amount` and return the seconds to wait before using it"""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount, now):
+        """Give back (or, if negative, charge) tokens after the real usage is known"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Combined RPM / TPM limiter (either limit may be 0 to disable it)
+
+    Usage:
+        estimate = limiter.acquire(tokens)             # sync, blocks
+        estimate = await limiter.acquire_async(tokens) # async
+        ...
+        limiter.settle(estimate, response.usage.total_tokens)
+    """
+
+    def __init__(self, rpm=0, tpm=0, max_concurrency=0):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self._lock = Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def reserve(self, tokens):
+        """Reserve one request and `tokens` tokens; returns the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            self.acquired += 1
+            self.waited += wait
+        if wait:
+            logger.info(f"⏱️  Rate limit: waiting {wait:.1f}s for {tokens} tokens")
+        return wait
+
+    def acquire(self, tokens):
+        """Block until the request fits into both limits"""
+        time.sleep(self.reserve(tokens))
+        return tokens
+
+    async def acquire_async(self, tokens):
+        """Wait (without blocking the event loop) until the request fits into both limits"""
+        await asyncio.sleep(self.reserve(tokens))
+        return tokens
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket by the difference between estimate and real usage"""
+        if not self.tokens or actual is None:
+            return
+        with self._lock:
+            self.tokens.refund(estimated - actual, time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'acquired': self.acquired,
+                'waited_seconds': round(self.waited, 1),
+                'requests_available': int(self.requests.level) if self.requests else None,
+                'tokens_available': int(self.tokens.level) if self.tokens else None
+            }
+
+
+_rate_limiter = None
+
+def get_rate_limiter():
+    """
+    Get the process-wide limiter configured from settings
+    The account limits are split evenly across AI_RATE_LIMIT_PROCESSES processes
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        processes = max(1, getattr(settings, 'AI_RATE_LIMIT_PROCESSES', 1))
+        _rate_limiter = RateLimiter(
+            rpm=getattr(settings, 'AI_RATE_LIMIT_RPM', 0) / processes,
+            tpm=getattr(settings, 'AI_RATE_LIMIT_TPM', 0) / processes,
+            max_concurrency=getattr(settings, 'AI_MAX_CONCURRENCY', 0)
+        )
+    return _rate_limiter
@@ -0,0 +1,246 @@
+# myapp/resilience.py
+# Deadlines, hedged requests and a circuit breaker for the OpenAI calls
+#
+# - every call has a deadline (AI_REQUEST_DEADLINE_SECONDS), so a hung request
+#   cannot block a pipeline worker
+# - optionally a second, identical request is fired once the first one is
+#   slower than the observed p95 latency; whichever answers first wins.
+#   Plain requests are hedged on the time to the whole answer, streams on the
+#   time to their first chunk (the losing stream is closed before it emits)
+# - after AI_CIRCUIT_FAILURE_THRESHOLD consecutive failures the circuit opens
+#   and calls fail immediately with CircuitOpenError for AI_CIRCUIT_RESET_SECONDS
+#   (then a single probe decides whether it closes again). Callers either use
+#   the fallback analysis or defer the assessment (AI_CIRCUIT_OPEN_ACTION)
+
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import Lock
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """The AI provider should not be called right now; retry after `retry_after` seconds"""
+
+    def __init__(self, message, retry_after=60):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ProviderUnavailable):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+# What a LatencyTracker measures
+RESPONSE = 'response'        # until the whole answer arrived
+FIRST_CHUNK = 'first_chunk'  # until a stream delivered its first chunk
+
+
+class LatencyTracker:
+    """Sliding window of successful call durations"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        """p-th percentile in seconds, or None until enough samples were seen"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open -> closed)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self._lock = Lock()
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                # Let exactly one probe through
+                self.state = self.HALF_OPEN
+                logger.info("🔌 Circuit half-open, probing the AI provider")
+                return
+
+            self.short_circuited += 1
+            raise CircuitOpenError(
+                f"AI provider circuit is {self.state}",
+                retry_after=max(1, int(remaining if remaining > 0 else self.reset_timeout))
+            )
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("🔌 Circuit closed, AI provider healthy again")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"🔌 Circuit opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'short_circuited': self.short_circuited
+            }
+
+
+def hedged_call(call, deadline=None, hedge_after=None, discard=None):
+    """
+    Run `call()` with an overall deadline; if it has not finished after
+    `hedge_after` seconds, start an identical second call and return whichever
+    succeeds first. Raises DeadlineExceeded, or the last error if all calls failed
+
+    `discard(result)` is called for every result that is not returned (the
+    losing call, or all of them after the deadline), e.g. to close a stream
+    """
+    pool = ThreadPoolExecutor(max_workers=2)
+    started = time.monotonic()
+    futures = []
+    winner = None
+    try:
+        futures.append(pool.submit(call))
+        if hedge_after is not None and (deadline is None or hedge_after < deadline):
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                logger.info(f"🪁 No answer after {hedge_after:.1f}s, sending hedged request")
+                futures.append(pool.submit(call))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = None if deadline is None else deadline - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = future
+                    return future.result()
+                error = future.exception()
+
+        if pending or error is None:
+            raise DeadlineExceeded(f"AI request exceeded its {deadline}s deadline")
+        raise error
+    finally:
+        # Losers finish in the background (bounded by the client timeout)
+        if discard is not None:
+            for future in futures:
+                if future is not winner:
+                    future.add_done_callback(lambda f: _discard(discard, f))
+        pool.shutdown(wait=False)
+
+
+def _discard(discard, future):
+    if future.exception() is None:
+        try:
+            discard(future.result())
+        except Exception as e:
+            logger.warning(f"⚠️  Could not discard a hedged result: {str(e)}")
+
+
+async def hedged_call_async(make_call, deadline=None, hedge_after=None):
+    """Async counterpart of hedged_call; `make_call()` returns a new coroutine"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        if hedge_after is not None and (deadline is None or hedge_after < deadline):
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                logger.info(f"🪁 No answer after {hedge_after:.1f}s, sending hedged request")
+                tasks.append(asyncio.ensure_future(make_call()))
+
+        pending = set(tasks)
+        error = None
+        while pending:
+            remaining = None if deadline is None else deadline - (loop.time() - started)
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+
+        if pending or error is None:
+            raise DeadlineExceeded(f"AI request exceeded its {deadline}s deadline")
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+_circuit_breaker = None
+_latency_trackers = {}
+_trackers_lock = Lock()
+
+
+def get_circuit_breaker():
+    """Process-wide circuit breaker for the AI provider"""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'AI_CIRCUIT_RESET_SECONDS', 60)
+        )
+    return _circuit_breaker
+
+
+def get_latency_tracker(model, kind=RESPONSE):
+    """Latency window per model and measurement (RESPONSE / FIRST_CHUNK)"""
+    with _trackers_lock:
+        tracker = _latency_trackers.get((model, kind))
+        if tracker is None:
+            tracker = _latency_trackers[(model, kind)] = LatencyTracker(
+                min_samples=getattr(settings, 'AI_HEDGE_MIN_SAMPLES', 20)
+            )
+        return tracker
+
+
+def hedge_delay(model, kind=RESPONSE):
+    """Seconds after which to hedge a request to `model`, or None if hedging is off"""
+    if not getattr(settings, 'AI_HEDGE_ENABLED', False):
+        return None
+    return get_latency_tracker(model, kind).percentile(getattr(settings, 'AI_HEDGE_PERCENTILE', 95))
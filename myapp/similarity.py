@@ -0,0 +1,313 @@
+# myapp/similarity.py
+# Similarity index to reuse analyses of near-duplicate submissions
+#
+# Every analysed assessment is turned into a hashed feature vector
+# (categorical answers + rated raw_answers items weighted by their rating,
+# L2-normalised). A new submission is compared against all vectors of the
+# same industry, company size and score by brute force (one matrix-vector
+# product); above AI_SIMILARITY_THRESHOLD the earlier analysis is reused,
+# personalised with the new company name, instead of calling the model.
+#
+# The analysis can quote any prompt input, so inputs that are not in the
+# vector (score, free text, responsible person, lead / ticket volumes) must be
+# identical or empty on both sides: they are part of the hard partition, so
+# the narrative never cites another score or level than the report header and
+# one customer's details never end up in another customer's report.
+#
+# The index lives in memory per process and is bootstrapped from the
+# analysed rows of ki_check_submissions on first use.
+
+import re
+import copy
+import json
+import time
+import hashlib
+import logging
+from collections import deque
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+
+from .pre_analysis import CATEGORIES, parse_raw_answers, to_number
+from .prompt_builder import SECTIONS
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 1024
+
+# Categorical columns and their weight in the vector
+CATEGORICAL_FIELDS = (
+    ('industry', 2.0),
+    ('company_size', 2.0),
+    ('revenue', 1.0),
+    ('urgency', 1.0),
+    ('budget', 1.0),
+    ('crm_system', 1.0),
+    ('api_access', 0.5),
+    ('data_privacy_importance', 0.5),
+    ('team_acceptance', 0.5),
+)
+
+# Prompt inputs a reused analysis must match exactly: free text in raw_answers
+# and the columns that are neither vector features nor personalised
+EXACT_TEXT_KEYS = tuple(key for _, fields in SECTIONS for _, source, key in fields if source == 'text')
+EXACT_COLUMNS = tuple(
+    key for _, fields in SECTIONS for _, source, key in fields
+    if source == 'column' and key != 'company_name' and key not in dict(CATEGORICAL_FIELDS)
+)
+
+# Text of the fallback analysis; such analyses are never reused
+FALLBACK_MARKER = 'besteht gutes Potenzial für KI-Implementierung'
+
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', str(text).strip().lower())
+
+
+def _bucket(feature):
+    """Stable hash of a feature -> (index, sign)"""
+    digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+    value = int.from_bytes(digest, 'little')
+    return value % DIMENSIONS, 1.0 if value >> 63 else -1.0
+
+
+def feature_vector(assessment):
+    """L2-normalised hashed feature vector of an assessment"""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+
+    def add(feature, weight):
+        index, sign = _bucket(feature)
+        vector[index] += sign * weight
+
+    for field, weight in CATEGORICAL_FIELDS:
+        value = assessment.get(field)
+        if value not in (None, ''):
+            add(f'{field}={_normalize(value)}', weight)
+
+    raw = parse_raw_answers(assessment)
+    for key, _, _ in CATEGORIES:
+        items = raw.get(key)
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if isinstance(item, dict) and item.get('text'):
+                rating = to_number(item.get('value'))
+                add(f"{key}:{_normalize(item['text'])}", (rating or 3.0) / 5.0)
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _exact_inputs(assessment):
+    """Digest of the inputs that must be identical (see EXACT_TEXT_KEYS / EXACT_COLUMNS)"""
+    raw = parse_raw_answers(assessment)
+    values = [_normalize(assessment.get(key) or '') for key in EXACT_COLUMNS]
+    values += [_normalize(raw.get(key) or '') for key in EXACT_TEXT_KEYS]
+    return hashlib.blake2b(json.dumps(values).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _score(assessment):
+    """Score as reported (int), or None"""
+    score = to_number(assessment.get('calculated_score'))
+    return int(score) if score is not None else None
+
+
+def _group(assessment):
+    """
+    Hard partition: only the same industry, company size and score, and
+    identical (or equally empty) free text and exact-match columns can match
+    """
+    return (
+        f"{_normalize(assessment.get('industry') or '')}|{_normalize(assessment.get('company_size') or '')}|"
+        f"{_score(assessment)}|{_exact_inputs(assessment)}"
+    )
+
+
+def is_fallback(analysis):
+    return FALLBACK_MARKER in str((analysis or {}).get('executive_summary', ''))
+
+
+def personalize(analysis, old_company, assessment):
+    """Copy of a reused analysis with the new company name (the score is the same, see _group)"""
+    result = copy.deepcopy(analysis)
+    new_company = assessment.get('company_name') or ''
+
+    def replace(value):
+        if isinstance(value, str):
+            return value.replace(old_company, new_company) if old_company and new_company else value
+        if isinstance(value, list):
+            return [replace(item) for item in value]
+        if isinstance(value, dict):
+            return {key: replace(item) for key, item in value.items()}
+        return value
+
+    return replace(result)
+
+
+class SimilarityIndex:
+    """In-memory brute-force cosine index of analysed assessments"""
+
+    def __init__(self, threshold=0.98, max_entries=5000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self._groups = np.array([], dtype=object)
+        self._ids = []
+        self._companies = []
+        self._lock = Lock()
+        self.queries = 0
+        self.hits = 0
+        self._latencies = deque(maxlen=500)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, assessment_id, assessment):
+        """Index an analysed assessment (the oldest entries drop out beyond max_entries)"""
+        vector = feature_vector(assessment)
+        with self._lock:
+            if assessment_id in self._ids:
+                return
+            self._vectors = np.vstack([self._vectors, vector])[-self.max_entries:]
+            self._groups = np.append(self._groups, _group(assessment))[-self.max_entries:]
+            self._ids = (self._ids + [assessment_id])[-self.max_entries:]
+            self._companies = (self._companies + [assessment.get('company_name') or ''])[-self.max_entries:]
+
+    def add_many(self, assessments):
+        """Index many analysed assessments at once (bootstrap)"""
+        if not assessments:
+            return
+        vectors = np.vstack([feature_vector(a) for a in assessments])
+        with self._lock:
+            self._vectors = np.vstack([self._vectors, vectors])[-self.max_entries:]
+            self._groups = np.append(self._groups, [_group(a) for a in assessments])[-self.max_entries:]
+            self._ids = (self._ids + [a['id'] for a in assessments])[-self.max_entries:]
+            self._companies = (self._companies + [a.get('company_name') or '' for a in assessments])[-self.max_entries:]
+
+    def query(self, assessment):
+        """
+        Most similar indexed assessment above the threshold
+
+        Returns:
+            tuple: (assessment_id, company_name, similarity) or None
+        """
+        started = time.perf_counter()
+        vector = feature_vector(assessment)
+        match = None
+
+        with self._lock:
+            if self._ids:
+                similarities = self._vectors @ vector
+                similarities[self._groups != _group(assessment)] = -1.0
+                if assessment.get('id') in self._ids:
+                    similarities[self._ids.index(assessment['id'])] = -1.0
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    match = (self._ids[best], self._companies[best], float(similarities[best]))
+
+            self.queries += 1
+            self._latencies.append(time.perf_counter() - started)
+
+        return match
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'entries': len(self._ids),
+                'queries': self.queries,
+                'hits': self.hits,
+                'hit_rate': round(self.hits / self.queries, 3) if self.queries else 0.0,
+                'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+                'latency_ms_p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None
+            }
+
+
+_similarity_index = None
+_index_lock = Lock()
+
+
+def _bootstrap(index):
+    """Index the most recent analysed assessments (real analyses only)"""
+    from .supabase_client import get_supabase
+    from .submissions import TABLE, SIMILARITY_COLUMNS
+
+    try:
+        response = get_supabase().table(TABLE).select(SIMILARITY_COLUMNS).eq(
+            'analysis_completed', True
+        ).not_.like(
+            'chatgpt_analysis->>executive_summary', f'%{FALLBACK_MARKER}%'
+        ).order('created_at', desc=True).limit(index.max_entries).execute()
+        rows = list(reversed(response.data or []))
+        index.add_many(rows)
+        logger.info(f"🧭 Similarity index loaded with {len(rows)} analysed assessments")
+    except Exception as e:
+        logger.error(f"❌ Could not load similarity index: {str(e)}")
+
+
+def get_similarity_index():
+    """
+    Process-wide similarity index, bootstrapped from Supabase on first use
+    Returns None if AI_SIMILARITY_ENABLED is off
+    """
+    global _similarity_index
+    if not getattr(settings, 'AI_SIMILARITY_ENABLED', False):
+        return None
+    with _index_lock:
+        if _similarity_index is None:
+            _similarity_index = SimilarityIndex(
+                threshold=getattr(settings, 'AI_SIMILARITY_THRESHOLD', 0.98),
+                max_entries=getattr(settings, 'AI_SIMILARITY_MAX_ENTRIES', 5000)
+            )
+            _bootstrap(_similarity_index)
+    return _similarity_index
+
+
+def get_similarity_stats():
+    """Hit rate / latency of the index, or None if it has not been used yet"""
+    return _similarity_index.stats() if _similarity_index is not None else None
+
+
+def find_reusable_analysis(assessment):
+    """
+    Personalised analysis of a near-duplicate submission, or None
+
+    Fetches the stored analysis of the best match and rejects fallback reports
+    """
+    index = get_similarity_index()
+    if index is None:
+        return None
+
+    match = index.query(assessment)
+    if match is None:
+        return None
+
+    match_id, company, similarity = match
+    try:
+        from .supabase_client import get_supabase
+        from .submissions import TABLE
+
+        response = get_supabase().table(TABLE).select('chatgpt_analysis').eq('id', match_id).limit(1).execute()
+        analysis = (response.data or [{}])[0].get('chatgpt_analysis')
+    except Exception as e:
+        logger.error(f"❌ Could not load similar analysis {match_id[:8]}: {str(e)}")
+        return None
+
+    if not analysis or is_fallback(analysis):
+        return None
+
+    index.record_hit()
+    logger.info(f"🧭 Reusing analysis of {match_id[:8]} (similarity {similarity:.3f})")
+    return personalize(analysis, company, assessment)
+
+
+def remember_analysis(assessment):
+    """Add a freshly analysed assessment to the index"""
+    index = get_similarity_index()
+    if index is not None and assessment.get('id'):
+        index.add(assessment['id'], assessment)
@@ -0,0 +1,40 @@
+-- myapp/sql/001_assessment_leases.sql
+-- Lease columns and claim function for ki_check_submissions
+--
+-- Run once in the Supabase SQL editor (or psql against the project database).
+-- Every AssessmentProcessor claims rows through claim_assessments() so that
+-- several gunicorn workers / nodes never process the same assessment twice.
+
+alter table public.ki_check_submissions
+    add column if not exists claimed_by text,
+    add column if not exists lease_expires_at timestamptz;
+
+-- Speeds up the "not yet emailed" scan used by the processor
+create index if not exists ki_check_submissions_unsent_idx
+    on public.ki_check_submissions (created_at)
+    where email_sent is not true;
+
+-- Atomically claim up to p_limit unsent assessments for p_worker.
+-- Rows with an expired lease are reclaimed automatically.
+create or replace function public.claim_assessments(
+    p_worker text,
+    p_limit integer default 10,
+    p_lease_seconds integer default 600
+)
+returns table (id uuid, email text, company_name text, created_at timestamptz)
+language sql
+as $$
+    update public.ki_check_submissions s
+       set claimed_by = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+     where s.id in (
+               select c.id
+                 from public.ki_check_submissions c
+                where c.email_sent is not true
+                  and (c.claimed_by is null or c.lease_expires_at < now())
+                order by c.created_at
+                limit p_limit
+                  for update skip locked
+           )
+    returning s.id::uuid, s.email::text, s.company_name::text, s.created_at::timestamptz;
+$$;
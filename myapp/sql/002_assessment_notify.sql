@@ -0,0 +1,22 @@
+-- myapp/sql/002_assessment_notify.sql
+-- Wake up the assessment processor as soon as a submission is inserted
+--
+-- The processor LISTENs on this channel (see myapp/notifications.py) when
+-- SUPABASE_DB_URL is set. Any plain Postgres works as a local stand-in:
+-- create a ki_check_submissions table, run this file and INSERT a row.
+
+create or replace function public.notify_new_assessment()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform pg_notify('ki_check_submissions_new', new.id::text);
+    return new;
+end;
+$$;
+
+drop trigger if exists ki_check_submissions_notify on public.ki_check_submissions;
+
+create trigger ki_check_submissions_notify
+    after insert on public.ki_check_submissions
+    for each row execute function public.notify_new_assessment();
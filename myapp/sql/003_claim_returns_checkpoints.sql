@@ -0,0 +1,38 @@
+-- myapp/sql/003_claim_returns_checkpoints.sql
+-- claim_assessments() also returns the stage checkpoints, so the pipeline can
+-- fetch only the columns the next stage needs (see submissions.py projections)
+
+drop function if exists public.claim_assessments(text, integer, integer);
+
+create or replace function public.claim_assessments(
+    p_worker text,
+    p_limit integer default 10,
+    p_lease_seconds integer default 600
+)
+returns table (
+    id uuid,
+    email text,
+    company_name text,
+    created_at timestamptz,
+    email_sent boolean,
+    analysis_completed boolean,
+    pdf_generated boolean
+)
+language sql
+as $$
+    update public.ki_check_submissions s
+       set claimed_by = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+     where s.id in (
+               select c.id
+                 from public.ki_check_submissions c
+                where c.email_sent is not true
+                  and (c.claimed_by is null or c.lease_expires_at < now())
+                order by c.created_at
+                limit p_limit
+                  for update skip locked
+           )
+    returning s.id::uuid, s.email::text, s.company_name::text, s.created_at::timestamptz,
+              coalesce(s.email_sent, false), coalesce(s.analysis_completed, false),
+              coalesce(s.pdf_generated, false);
+$$;
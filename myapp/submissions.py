@@ -0,0 +1,190 @@
+# myapp/submissions.py
+# Data access helpers for the ki_check_submissions table (leases / claiming)
+#
+# Requires the columns and function from sql/001_assessment_leases.sql
+
+import os
+import socket
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+from .supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'ki_check_submissions'
+
+# Unique per process, so leases can be traced back to the worker holding them
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# Lease holders for rows waiting on a retry backoff or moved to dead letters
+RETRY_HOLDER = 'retry'
+DEAD_LETTER_HOLDER = 'dead-letter'
+
+
+# ============================================================
+# COLUMN PROJECTIONS
+# ============================================================
+# Fetch only what a stage needs: the raw_answers / chatgpt_analysis JSON
+# blobs are large and only required by the analysis and PDF stages.
+
+# Skip decisions and job status
+STATUS_COLUMNS = 'id, email_sent, analysis_completed, pdf_generated, claimed_by'
+
+# Listings in the processing views
+SUMMARY_COLUMNS = 'id, email, company_name, calculated_score, created_at'
+
+# Fields printed in the PDF and the email
+_REPORT_FIELDS = (
+    'email, company_name, industry, company_size, calculated_score, score_level'
+)
+
+# Analysis stage (+ PDF / email afterwards; the analysis itself is merged in memory)
+ANALYSIS_COLUMNS = (
+    f'{STATUS_COLUMNS}, {_REPORT_FIELDS}, revenue, urgency, budget, responsible_person, '
+    'crm_system, api_access, monthly_leads, monthly_tickets, data_privacy_importance, '
+    'team_acceptance, raw_answers'
+)
+
+# PDF / email stages when the analysis already exists
+REPORT_COLUMNS = f'{STATUS_COLUMNS}, {_REPORT_FIELDS}, chatgpt_analysis'
+
+# Features of the similarity index (see similarity.py)
+SIMILARITY_COLUMNS = (
+    'id, company_name, industry, company_size, revenue, urgency, budget, responsible_person, '
+    'crm_system, api_access, monthly_leads, monthly_tickets, data_privacy_importance, '
+    'team_acceptance, calculated_score, raw_answers'
+)
+
+
+def _lease_seconds(lease_seconds=None):
+    return int(lease_seconds or getattr(settings, 'ASSESSMENT_LEASE_SECONDS', 600))
+
+
+def _timestamp(value):
+    """Format a UTC datetime for PostgREST filters (no '+' to escape)"""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def claim_batch(limit, lease_seconds=None):
+    """
+    Atomically claim up to `limit` unsent assessments for this worker
+    Uses the claim_assessments RPC (UPDATE ... FOR UPDATE SKIP LOCKED)
+
+    Returns:
+        list: claimed rows (id, email, company_name, created_at)
+    """
+    response = get_supabase().rpc('claim_assessments', {
+        'p_worker': WORKER_ID,
+        'p_limit': int(limit),
+        'p_lease_seconds': _lease_seconds(lease_seconds)
+    }).execute()
+    return response.data or []
+
+
+def claim_one(assessment_id, lease_seconds=None):
+    """
+    Claim a single assessment through a conditional update
+    Succeeds only if the row is unclaimed, its lease expired, or we already hold it
+
+    Returns:
+        bool: True if this worker now holds the lease
+    """
+    now = datetime.now(timezone.utc)
+    expires = now + timedelta(seconds=_lease_seconds(lease_seconds))
+
+    response = get_supabase().table(TABLE).update({
+        'claimed_by': WORKER_ID,
+        'lease_expires_at': expires.isoformat()
+    }).eq('id', assessment_id).or_(
+        f'claimed_by.is.null,lease_expires_at.lt.{_timestamp(now)},claimed_by.eq."{WORKER_ID}"'
+    ).execute()
+
+    return bool(response.data)
+
+
+def update_row(assessment_id, fields):
+    """
+    Write fields to one row without asking for the row back (return=minimal)
+    Callers merge `fields` into their in-memory row instead of refetching it
+    """
+    get_supabase().table(TABLE).update(
+        fields, returning='minimal'
+    ).eq('id', assessment_id).execute()
+
+
+def release(assessment_id):
+    """Release our lease on an assessment (no-op if another worker holds it)"""
+    try:
+        get_supabase().table(TABLE).update({
+            'claimed_by': None,
+            'lease_expires_at': None
+        }).eq('id', assessment_id).eq('claimed_by', WORKER_ID).execute()
+    except Exception as e:
+        # The lease simply expires if we can't release it
+        logger.warning(f"⚠️  Could not release lease on {assessment_id}: {str(e)}")
+
+
+def hand_over(assessment_ids, holder, until):
+    """
+    Hand our lease on one or more rows over to another holder (a retry
+    backoff, a Batch API job, ...) until `until`; no worker can claim them before
+    """
+    if isinstance(assessment_ids, str):
+        assessment_ids = [assessment_ids]
+    get_supabase().table(TABLE).update({
+        'claimed_by': holder,
+        'lease_expires_at': until.isoformat()
+    }, returning='minimal').in_('id', list(assessment_ids)).eq('claimed_by', WORKER_ID).execute()
+
+
+def release_holder(assessment_ids, holder):
+    """Release rows held by `holder` (e.g. a finished batch) so workers can claim them"""
+    if not assessment_ids:
+        return
+    get_supabase().table(TABLE).update({
+        'claimed_by': None,
+        'lease_expires_at': None
+    }, returning='minimal').in_('id', list(assessment_ids)).eq('claimed_by', holder).execute()
+
+
+def defer(assessment_id, until):
+    """
+    Hand our lease over to the retry backoff: no worker on any node can
+    claim the row again before `until`
+    """
+    hand_over(assessment_id, RETRY_HOLDER, until)
+
+
+def park(assessment_id):
+    """Lease a dead-lettered row forever so it is never claimed again"""
+    get_supabase().table(TABLE).update({
+        'claimed_by': DEAD_LETTER_HOLDER,
+        'lease_expires_at': 'infinity'
+    }).eq('id', assessment_id).execute()
+
+
+def unpark(assessment_id):
+    """Make a dead-lettered row claimable again"""
+    get_supabase().table(TABLE).update({
+        'claimed_by': None,
+        'lease_expires_at': None
+    }).eq('id', assessment_id).eq('claimed_by', DEAD_LETTER_HOLDER).execute()
+
+
+def count_pending():
+    """
+    Measure backlog depth: number of claimable assessments whose email has not
+    been sent (rows in flight, backing off or dead-lettered are excluded)
+    Uses a HEAD request with an exact count, so no rows are transferred
+    """
+    now = _timestamp(datetime.now(timezone.utc))
+    response = get_supabase().table(TABLE).select(
+        'id', count='exact', head=True
+    ).not_.is_('email_sent', 'true').or_(
+        f'claimed_by.is.null,lease_expires_at.lt.{now}'
+    ).execute()
+    return response.count or 0
@@ -3,20 +3,41 @@
 
 import time
 import logging
-from threading import Thread
+from threading import Thread, Event
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+
 class AssessmentProcessor:
     """
-    Background processor that checks for new assessments every 30 seconds
-    and processes them automatically
+    Background processor that checks for new assessments and feeds them into
+    the staged AssessmentPipeline (analysis -> pdf -> email).
+    
+    Polling adapts to the backlog: batch size grows with the queue depth and
+    the loop polls back-to-back while work remains, then backs off
+    exponentially when idle. When SUPABASE_DB_URL is configured it is also
+    woken immediately by Postgres NOTIFY on insert.
     """
     
-    def __init__(self):
+    def __init__(self, min_batch_size=None, max_batch_size=None, stage_workers=None):
+        from .pipeline import AssessmentPipeline
+        
         self.running = False
         self.thread = None
-        logger.info("🔧 AssessmentProcessor initialized")
+        self.pipeline = AssessmentPipeline(stage_workers=stage_workers)
+        self.min_batch_size = min_batch_size or getattr(settings, 'ASSESSMENT_MIN_BATCH_SIZE', 5)
+        self.max_batch_size = max_batch_size or getattr(settings, 'ASSESSMENT_MAX_BATCH_SIZE', 25)
+        self.batch_size = self.min_batch_size
+        self.backlog = 0
+        self.unclaimed = 0
+        self.idle_interval = 0
+        self.open_batches = 0
+        self.last_batch_poll = 0
+        self.listener = None
+        self.wakeup = Event()
+        logger.info(f"🔧 AssessmentProcessor initialized (batch size {self.min_batch_size}-{self.max_batch_size})")
     
     def start(self):
         """Start the background processor thread"""
@@ -24,7 +45,16 @@ class AssessmentProcessor:
             logger.warning("⚠️  Processor already running, skipping start")
             return
         
+        from .job_queue import is_shared_database
+        if not is_shared_database():
+            logger.warning(
+                "⚠️  Job queue in the local SQLite file: attempts and batches are only "
+                "shared by processes on this machine (set DATABASE_URL for more)"
+            )
+        
         self.running = True
+        self.pipeline.start()
+        self._start_listener()
         self.thread = Thread(target=self._process_loop, daemon=True)
         self.thread.start()
         logger.info("🚀 Background assessment processor thread started")
@@ -33,108 +63,246 @@ class AssessmentProcessor:
     def stop(self):
         """Stop the background processor"""
         self.running = False
+        self.wakeup.set()
+        if self.listener:
+            self.listener.stop()
         if self.thread:
             logger.info("🛑 Assessment processor stopping...")
             print("🛑 Assessment processor stopping...")
+        # Workers finish their current job; queued jobs are handed back
+        self.pipeline.stop()
+    
+    def notify(self, payload=None):
+        """Wake the processing loop immediately (called on new submissions)"""
+        self.wakeup.set()
+    
+    def _start_listener(self):
+        """Start the LISTEN/NOTIFY listener if a direct database URL is configured"""
+        dsn = getattr(settings, 'SUPABASE_DB_URL', None)
+        if not dsn:
+            logger.info("ℹ️  SUPABASE_DB_URL not set - using polling only")
+            return
+        
+        from .notifications import AssessmentListener
+        
+        self.listener = AssessmentListener(
+            dsn,
+            getattr(settings, 'ASSESSMENT_NOTIFY_CHANNEL', 'ki_check_submissions_new'),
+            self.notify
+        )
+        self.listener.start()
+    
+    def _poll_interval(self, processed):
+        """
+        Seconds to wait before the next check, based on the last batch
+        - backlog left over: poll again immediately
+        - batch drained the queue: short pause
+        - idle: back off exponentially up to the maximum interval
+        """
+        min_interval = getattr(settings, 'ASSESSMENT_MIN_POLL_SECONDS', 2)
+        if self.listener and self.listener.connected:
+            max_interval = getattr(settings, 'ASSESSMENT_SAFETY_POLL_SECONDS', 900)
+        else:
+            max_interval = getattr(settings, 'ASSESSMENT_MAX_POLL_SECONDS', 300)
+        
+        if self.open_batches:
+            # Keep collecting Batch API results while batches are running
+            max_interval = min(max_interval, getattr(settings, 'AI_BATCH_POLL_SECONDS', 300))
+        
+        if processed:
+            self.idle_interval = 0
+            return 0 if self.unclaimed else min_interval
+        
+        self.idle_interval = min(max_interval, max(min_interval, self.idle_interval * 2))
+        return self.idle_interval
     
     def _process_loop(self):
         """
         Main processing loop
-        Checks every 30 seconds for new assessments
+        Checks for new assessments whenever notified, or after the poll interval
         """
-        logger.info("♻️  Processing loop started - checking every 30 seconds")
+        logger.info("♻️  Processing loop started")
         
         while self.running:
+            self.wakeup.clear()
+            processed = 0
+            
             try:
                 logger.info("🔍 Checking for new assessments...")
-                self._check_and_process()
+                processed = self._check_and_process()
                 
             except Exception as e:
                 logger.error(f"❌ Error in processing loop: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
             
-            # Wait 30 seconds before next check
+            # Wait for a notification, or poll again after the interval
             if self.running:  # Check if still running before sleeping
-                logger.info("⏳ Waiting 30 seconds until next check...")
-                time.sleep(30)
+                interval = self._poll_interval(processed)
+                if interval:
+                    logger.info(f"⏳ Waiting up to {interval} seconds until next check...")
+                    self.wakeup.wait(timeout=interval)
         
         logger.info("✋ Processing loop stopped")
     
     def _check_and_process(self):
         """
-        Check for NEW unprocessed assessments and process them
+        Check for NEW unprocessed assessments and queue them in the pipeline
         Only processes records where email_sent = false OR null
+        Rows are claimed with a lease first, so parallel workers never share a row
+        At most max_batch_size assessments are in the pipeline at any time
+        
+        Returns:
+            int: number of assessments claimed in this check
         """
         try:
-            from .supabase_client import get_supabase
-            from .views import process_single_assessment
+            from .submissions import claim_batch, count_pending
+            
+            self._collect_batches()
+            
+            # Size the batch to the backlog (a cheap HEAD count query)
+            self.backlog = count_pending()
+            if self.backlog == 0:
+                logger.info("✓ No new assessments to process")
+                return 0
             
-            supabase = get_supabase()
+            # Large backlog: analyse it through the Batch API instead of row by row
+            threshold = getattr(settings, 'AI_BATCH_BACKLOG_THRESHOLD', 0)
+            if threshold and self.backlog >= threshold and self._submit_batch():
+                self.backlog = count_pending()
+                if self.backlog == 0:
+                    return 0
             
-            # CRITICAL QUERY: Only get NEW unprocessed assessments
+            in_flight = self.pipeline.stats()['in_flight']
+            free = self.max_batch_size - in_flight
+            if free <= 0:
+                # _on_done wakes us up again as soon as a slot frees up
+                self.unclaimed = self.backlog
+                logger.info(f"⏸️  Pipeline full ({in_flight} in flight), waiting for capacity")
+                return 0
+            
+            self.batch_size = min(free, max(self.min_batch_size, min(self.max_batch_size, self.backlog)))
+            logger.info(f"📊 Backlog: {self.backlog} - claiming up to {self.batch_size}")
+            
+            # CRITICAL QUERY: Only claim NEW unprocessed assessments
             # This prevents re-sending emails to users who already received them
-            response = supabase.table('ki_check_submissions').select(
-                'id, email, company_name, email_sent, created_at'
-            ).or_(
-                'email_sent.is.null,email_sent.eq.false'
-            ).order('created_at', desc=False).limit(5).execute()
+            # and prevents other workers from picking up the same rows
+            response_data = claim_batch(self.batch_size)
             
             # Check if any new assessments found
-            if not response.data or len(response.data) == 0:
+            if not response_data:
                 logger.info("✓ No new assessments to process")
-                print("✓ No new assessments to process")
-                return
+                return 0
             
             # Found new assessments to process
-            count = len(response.data)
-            logger.info(f"📋 Found {count} NEW assessment(s) to process")
-            print(f"📋 Found {count} NEW assessment(s) to process")
+            count = len(response_data)
+            logger.info(f"📋 Claimed {count} NEW assessment(s) to process")
             
-            # Process each NEW assessment
-            for idx, assessment in enumerate(response.data, 1):
+            # Claimable rows left over after this batch
+            self.unclaimed = max(0, self.backlog - count)
+            
+            # Queue the batch; stages overlap across assessments in the pipeline
+            for assessment in response_data:
                 if not self.running:  # Stop if processor was stopped
                     logger.info("Processor stopped, aborting current batch")
                     break
                 
-                assessment_id = assessment['id']
-                
-                logger.info(f"\n{'='*60}")
-                logger.info(f"🔄 Processing {idx}/{count}: {assessment_id[:8]}...")
-                logger.info(f"   Company: {assessment.get('company_name', 'N/A')}")
-                logger.info(f"   Email: {assessment.get('email', 'N/A')}")
-                print(f"🔄 Processing: {assessment.get('company_name', 'N/A')}")
-                
-                try:
-                    # Process the assessment
-                    success = process_single_assessment(assessment_id)
-                    
-                    if success:
-                        logger.info(f"✅ Successfully processed: {assessment_id[:8]}")
-                        print(f"✅ Successfully processed: {assessment.get('company_name', 'N/A')}")
-                    else:
-                        logger.error(f"❌ Failed to process: {assessment_id[:8]}")
-                        print(f"❌ Failed to process: {assessment_id[:8]}")
-                        
-                except Exception as e:
-                    logger.error(f"❌ Error processing {assessment_id[:8]}: {str(e)}")
-                    print(f"❌ Failed to process: {assessment_id[:8]}")
-                    import traceback
-                    logger.error(traceback.format_exc())
+                if not self._begin_attempt(assessment['id']):
                     continue
                 
-                # Small delay between processing to avoid overwhelming the system
-                time.sleep(2)
+                logger.info(f"➡️  Queued: {assessment.get('company_name', 'N/A')} ({assessment['id'][:8]})")
+                self.pipeline.submit(assessment['id'], claimed=True, on_done=self._on_done, status=assessment)
             
-            logger.info(f"{'='*60}\n")
-            logger.info(f"✅ Batch processing complete - processed {count} assessment(s)")
-            print(f"✅ Batch processing complete")
+            logger.info(f"✅ Batch queued - {count} assessment(s) handed to the pipeline")
+            return count
                 
         except Exception as e:
             logger.error(f"❌ Error checking assessments: {str(e)}")
             print(f"❌ Error checking assessments: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
+            return 0
+    
+    def _collect_batches(self):
+        """Poll running Batch API jobs (at most every AI_BATCH_POLL_SECONDS)"""
+        from .batch_analysis import collect_batches, OPEN_STATUSES
+        from .models import AnalysisBatch
+        
+        now = time.monotonic()
+        if now - self.last_batch_poll < getattr(settings, 'AI_BATCH_POLL_SECONDS', 300):
+            return
+        self.last_batch_poll = now
+        
+        try:
+            applied = collect_batches()
+            if applied:
+                logger.info(f"📦 {applied} batch analyses applied, continuing with PDF / email")
+            self.open_batches = AnalysisBatch.objects.filter(status__in=OPEN_STATUSES).count()
+        except Exception as e:
+            logger.error(f"❌ Could not collect batches: {str(e)}")
+    
+    def _submit_batch(self):
+        """Move the backlog into a Batch API job; returns True if one was submitted"""
+        from .batch_analysis import submit_backlog_batch
+        
+        try:
+            record = submit_backlog_batch()
+        except Exception as e:
+            logger.error(f"❌ Batch submission failed, processing synchronously: {str(e)}")
+            return False
+        
+        if record is None:
+            return False
+        self.open_batches += 1
+        logger.info(f"📦 Backlog of {self.backlog} moved to batch {record.batch_id}")
+        return True
+    
+    def _begin_attempt(self, assessment_id):
+        """
+        Record the attempt in the durable job queue
+        Returns False (and hands the lease to the backoff) if the job may not run yet
+        """
+        from . import job_queue
+        from .models import AssessmentJob
+        from .submissions import defer, park
+        
+        job, started = job_queue.begin_attempt(assessment_id)
+        if started:
+            return True
+        
+        if job.status == AssessmentJob.STATUS_DEAD:
+            park(assessment_id)
+        else:
+            defer(assessment_id, job.next_attempt_at)
+        logger.info(f"⏭️  {assessment_id[:8]} is {job.status}, next attempt {job.next_attempt_at:%H:%M:%S}")
+        return False
+    
+    def _on_done(self, assessment_id, success, error=None):
+        """
+        Pipeline callback: record the outcome in the job queue, hold failed rows
+        until their backoff elapses, and pick up more work as capacity frees up
+        """
+        from . import job_queue
+        from .resilience import ProviderUnavailable
+        from .submissions import defer, park
+        
+        try:
+            if success:
+                job_queue.complete(assessment_id)
+            elif isinstance(error, ProviderUnavailable):
+                # Provider outage, not this assessment's fault: no attempt is used up
+                defer(assessment_id, job_queue.postpone(assessment_id, error.retry_after))
+            else:
+                retry_at = job_queue.fail(assessment_id, error)
+                if retry_at:
+                    defer(assessment_id, retry_at)
+                else:
+                    park(assessment_id)
+        except Exception as e:
+            logger.error(f"❌ Could not record job result for {assessment_id[:8]}: {str(e)}")
+        
+        if self.unclaimed and self.running:
+            self.wakeup.set()
 
 
 # ============================================================
@@ -143,16 +311,17 @@ class AssessmentProcessor:
 
 _processor = None
 
-def start_assessment_processor():
+def start_assessment_processor(**options):
     """
     Start the background assessment processor
-    Called from apps.py when Django starts
+    Called from apps.py when Django starts, or from the run_assessment_worker
+    command (options are passed to AssessmentProcessor)
     """
     global _processor
     
     if _processor is None:
         logger.info("Creating new AssessmentProcessor instance")
-        _processor = AssessmentProcessor()
+        _processor = AssessmentProcessor(**options)
     
     _processor.start()
     return _processor
@@ -171,10 +340,42 @@ def get_processor_status():
     Get the current status of the processor
     Useful for monitoring
     """
+    from .rate_limit import get_rate_limiter
+    from .resilience import get_circuit_breaker
+    from .similarity import get_similarity_stats
+    from .model_routing import get_tier_metrics
+    from .pdf_pool import get_pdf_pool_stats
+    
     global _processor
     if _processor:
         return {
             'running': _processor.running,
-            'thread_alive': _processor.thread.is_alive() if _processor.thread else False
+            'thread_alive': _processor.thread.is_alive() if _processor.thread else False,
+            'batch_size': _processor.batch_size,
+            'backlog': _processor.backlog,
+            'idle_interval': _processor.idle_interval,
+            'open_batches': _processor.open_batches,
+            'ai_circuit': get_circuit_breaker().stats(),
+            'ai_rate_limit': get_rate_limiter().stats(),
+            'ai_similarity': get_similarity_stats(),
+            'ai_model_tiers': get_tier_metrics().stats(),
+            'pdf_pool': get_pdf_pool_stats(),
+            'pipeline': _processor.pipeline.stats()
         }
-    return {'running': False, 'thread_alive': False}
\ No newline at end of file
+    return {'running': False, 'thread_alive': False}
+
+def is_processor_running():
+    """True if a processor runs in this process"""
+    return bool(_processor and _processor.running)
+
+def wake_assessment_processor():
+    """
+    Wake the background processor so a new submission is claimed immediately
+    Returns False if no processor runs in this process (a separate worker
+    then picks the row up via NOTIFY or its next poll)
+    """
+    global _processor
+    if _processor and _processor.running:
+        _processor.notify()
+        return True
+    return False
@@ -1,3 +1,1326 @@
-from django.test import TestCase
+import os
+import json
+import asyncio
+import time
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone as dt_timezone
+from queue import Queue, Empty
+from threading import Event
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import job_queue, submissions
+from .batch_analysis import collect_batches
+from .ai_service import AIReadinessService, AsyncAIReadinessService
+from .analysis_cache import AnalysisCache
+from .json_stream import IncrementalObjectParser
+from .model_routing import richness, route
+from .models import AnalysisBatch, AssessmentJob, DeadLetterJob
+from .notifications import AssessmentListener
+from .pdf_pool import PDFRenderPool, PDFRenderTimeout
+from .pipeline import AssessmentPipeline, get_section_progress, run_analysis_stage, run_analysis_stage_many
+from .pre_analysis import pre_analyze, pre_analyze_many
+from .prompt_builder import (
+    PROMPT_VERSION, SECTIONS, build_assessment_block, build_messages, count_tokens, truncate_tokens
+)
+from .rate_limit import TokenBucket, RateLimiter, get_rate_limiter
+from .resilience import (
+    FIRST_CHUNK, CircuitBreaker, CircuitOpenError, DeadlineExceeded, ProviderUnavailable,
+    get_latency_tracker, hedged_call
+)
+from .similarity import SimilarityIndex
+from .tasks import AssessmentProcessor
+
+
+# ============================================================
+# STAND-INS
+# ============================================================
+
+class FakeResponse:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """
+    The slice of the PostgREST query builder the app uses, on an in-memory
+    table: update / select with eq, in_, or_ and not_.is_ filters
+    """
+
+    def __init__(self, table, action, fields=None):
+        self.table = table
+        self.action = action
+        self.fields = fields
+        self.filters = []
+        self.negate = False
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        expected = {'null': None, 'true': True, 'false': False}[value]
+        negate, self.negate = self.negate, False
+        self.filters.append(lambda row: (row.get(column) == expected) != negate)
+        return self
+
+    def or_(self, conditions):
+        tests = [self._condition(condition) for condition in conditions.split(',')]
+        self.filters.append(lambda row: any(test(row) for test in tests))
+        return self
+
+    def single(self):
+        return self
+
+    def limit(self, count):
+        return self
+
+    @staticmethod
+    def _condition(condition):
+        column, operator, value = condition.split('.', 2)
+        value = value.strip('"')
+        if operator == 'is':
+            return lambda row: row.get(column) is None
+        if operator == 'eq':
+            return lambda row: row.get(column) == value
+        if operator == 'lt':
+            return lambda row: row.get(column) is not None and _as_time(row[column]) < _as_time(value)
+        raise ValueError(condition)
+
+    def execute(self):
+        rows = [row for row in self.table.values() if all(test(row) for test in self.filters)]
+        if self.action == 'update':
+            for row in rows:
+                row.update(self.fields)
+        return FakeResponse([dict(row) for row in rows], len(rows))
+
+
+def _as_time(value):
+    if value == 'infinity':
+        return datetime.max.replace(tzinfo=dt_timezone.utc)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def update(self, fields, returning=None):
+        return FakeQuery(self.rows, 'update', fields)
+
+    def select(self, columns='*', count=None, head=False):
+        return FakeQuery(self.rows, 'select')
+
+
+class FakeSupabase:
+    """In-memory ki_check_submissions table behind get_supabase()"""
+
+    def __init__(self, *ids):
+        self.rows = {
+            assessment_id: {'id': assessment_id, 'email_sent': False, 'claimed_by': None, 'lease_expires_at': None}
+            for assessment_id in ids
+        }
+
+    def table(self, name):
+        assert name == submissions.TABLE
+        return FakeTable(self.rows)
+
+
+class FakeNotify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class FakePostgres:
+    """
+    Stand-in for a psycopg2 connection that is LISTENing: select() waits on a
+    socket, send() queues a notification and makes the socket readable
+    """
+
+    def __init__(self):
+        self._reader, self._writer = socket.socketpair()
+        self._pending = Queue()
+        self.notifies = []
+        self.statements = []
+        self.closed = False
+
+    def send(self, payload):
+        self._pending.put(FakeNotify(payload))
+        self._writer.send(b'!')
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def set_isolation_level(self, level):
+        self.isolation_level = level
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def poll(self):
+        self._reader.recv(64)
+        while True:
+            try:
+                self.notifies.append(self._pending.get_nowait())
+            except Empty:
+                return
+
+    def close(self):
+        self.closed = True
+
+
+# ============================================================
+# STREAMED JSON
+# ============================================================
+
+class IncrementalObjectParserTests(SimpleTestCase):
+    ANSWER = {
+        'executive_summary': 'Ein "Zitat", {geschweifte} und [eckige] Klammern, Komma, Backslash \\',
+        'strengths': ['a, b', 'c}'],
+        'recommended_use_cases': [{'title': 'Chatbot', 'priority': 'Hoch'}],
+        'score': 64,
+    }
+
+    def feed_all(self, chunks):
+        parser = IncrementalObjectParser()
+        completed = []
+        for chunk in chunks:
+            completed.append(parser.feed(chunk))
+        return parser, completed
+
+    def test_members_complete_at_every_chunk_boundary(self):
+        text = '```json\n' + json.dumps(self.ANSWER, ensure_ascii=False) + '\n```'
+
+        for size in (1, 2, 3, 7, len(text)):
+            parser, completed = self.feed_all(text[i:i + size] for i in range(0, len(text), size))
+
+            self.assertTrue(parser.done)
+            self.assertEqual(parser.result, self.ANSWER)
+            self.assertEqual([pair for pairs in completed for pair in pairs], list(self.ANSWER.items()))
+
+    def test_member_is_emitted_as_soon_as_it_closes(self):
+        parser = IncrementalObjectParser()
+
+        self.assertEqual(parser.feed('{"a": "x, {y}"'), [])
+        self.assertEqual(parser.feed(', "b"'), [('a', 'x, {y}')])
+        self.assertEqual(parser.feed(': [1, 2]}'), [('b', [1, 2])])
+        self.assertTrue(parser.done)
+
+    def test_escaped_quote_split_across_chunks(self):
+        parser, completed = self.feed_all(['{"a": "sagt \\', '"hallo\\', '"", "b": 1}'])
+
+        self.assertEqual(parser.result, {'a': 'sagt "hallo"', 'b': 1})
+
+    def test_text_after_the_object_is_ignored(self):
+        parser = IncrementalObjectParser()
+        parser.feed('{"a": 1} {"b": 2}')
+
+        self.assertEqual(parser.result, {'a': 1})
+
+
+# ============================================================
+# RATE LIMIT / CIRCUIT BREAKER
+# ============================================================
+
+class TokenBucketTests(SimpleTestCase):
+    def test_reserve_waits_for_the_overdraft(self):
+        bucket = TokenBucket(60)  # 1 token per second
+        t = bucket.updated
+
+        self.assertEqual(bucket.reserve(40, now=t), 0.0)
+        self.assertAlmostEqual(bucket.reserve(30, now=t), 10.0)
+        # 10 seconds later the debt is repaid
+        self.assertEqual(bucket.reserve(0, now=t + 10), 0.0)
+
+    def test_reservation_larger_than_capacity_is_capped(self):
+        bucket = TokenBucket(60)
+        t = bucket.updated
+
+        self.assertEqual(bucket.reserve(500, now=t), 0.0)
+        self.assertEqual(bucket.level, 0.0)
+
+    def test_refund_settles_the_difference(self):
+        bucket = TokenBucket(60)
+        t = bucket.updated
+        bucket.reserve(50, now=t)
+
+        bucket.refund(30, now=t)  # used 20 of the estimated 50
+        self.assertEqual(bucket.level, 40.0)
+        bucket.refund(-50, now=t)  # used 50 more than estimated
+        self.assertAlmostEqual(bucket.reserve(0, now=t), 10.0)
+
+        bucket.refund(500, now=t)
+        self.assertEqual(bucket.level, 60.0)
+
+    def test_limiter_settles_against_the_token_bucket(self):
+        limiter = RateLimiter(rpm=60, tpm=6000)
+
+        self.assertEqual(limiter.reserve(5000), 0.0)
+        limiter.settle(5000, 2000)
+
+        self.assertAlmostEqual(limiter.tokens.level, 4000, delta=5)
+        self.assertEqual(limiter.stats()['acquired'], 1)
+
+    @override_settings(AI_RATE_LIMIT_RPM=500, AI_RATE_LIMIT_TPM=30000, AI_RATE_LIMIT_PROCESSES=4)
+    def test_account_limits_are_split_across_processes(self):
+        with mock.patch('myapp.rate_limit._rate_limiter', None):
+            limiter = get_rate_limiter()
+
+        self.assertEqual((limiter.requests.capacity, limiter.tokens.capacity), (125, 7500))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('myapp.resilience.time')
+        self.clock = patcher.start().monotonic
+        self.clock.return_value = 100.0
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def open_circuit(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.check()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.check()  # a success in between resets the count
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.check()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self.open_circuit()
+        self.clock.return_value = 130.0
+
+        self.breaker.check()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        self.assertEqual(self.breaker.stats()['short_circuited'], 1)
+
+    def test_successful_probe_closes_the_circuit(self):
+        self.open_circuit()
+        self.clock.return_value = 130.0
+        self.breaker.check()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.check()
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.open_circuit()
+        self.clock.return_value = 130.0
+        self.breaker.check()
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+
+
+def wait_for(condition, timeout=5):
+    ends = time.monotonic() + timeout
+    while not condition() and time.monotonic() < ends:
+        time.sleep(0.01)
+
+
+class HedgedCallTests(SimpleTestCase):
+    def test_returns_the_faster_call_and_discards_the_other(self):
+        release = Event()
+        answers = iter(['slow', 'fast'])
+        discarded = []
+
+        def call():
+            answer = next(answers)
+            if answer == 'slow':
+                release.wait(5)
+            return answer
+
+        self.assertEqual(hedged_call(call, deadline=5, hedge_after=0.05, discard=discarded.append), 'fast')
+        release.set()
+        wait_for(lambda: discarded)
+        self.assertEqual(discarded, ['slow'])
+
+    def test_deadline_is_enforced(self):
+        release = Event()
+        self.addCleanup(release.set)
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            hedged_call(lambda: release.wait(5), deadline=0.1)
+        self.assertLess(time.monotonic() - started, 1)
+
+
+def stream_chunk(text):
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeStream:
+    """Chat completion stream; `stall[i]` blocks before chunk i until `release` is set"""
+
+    def __init__(self, texts, release, stall=()):
+        self.chunks = [stream_chunk(text) for text in texts]
+        self.release = release
+        self.stall = set(stall)
+        self.position = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position in self.stall:
+            self.release.wait(5)
+        if self.closed or self.position >= len(self.chunks):
+            raise StopIteration
+        self.position += 1
+        return self.chunks[self.position - 1]
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingDeadlineTests(SimpleTestCase):
+    TEXTS = ['{"score": 80, ', '"summary": "gut"}']
+
+    def setUp(self):
+        self.release = Event()
+        self.addCleanup(self.release.set)
+        self.streams = []
+        self.model = f"test-{uuid.uuid4()}"
+        self.service = AIReadinessService.__new__(AIReadinessService)
+        self.service.client = mock.Mock(name='client')
+        self.service.bounded_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **kwargs: self.streams.pop(0)
+        )))
+        self.sections = []
+
+    def stream(self, deadline):
+        return self.service._complete_streaming(
+            {'model': self.model, 'messages': []}, lambda key, value: self.sections.append(key), deadline
+        )
+
+    def test_deadline_bounded_calls_skip_sdk_retries(self):
+        with mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'test'}):
+            service = AIReadinessService()
+        self.assertEqual(service._client(30).max_retries, 0)
+        self.assertIs(service._client(None), service.client)
+
+    def test_stall_between_chunks_hits_the_deadline(self):
+        stream = FakeStream(self.TEXTS, self.release, stall=[1])
+        self.streams.append(stream)
+
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            self.stream(deadline=0.2)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(stream.closed)
+
+    def test_slow_first_chunk_is_hedged(self):
+        slow = FakeStream(self.TEXTS, self.release, stall=[0])
+        fast = FakeStream(self.TEXTS, self.release)
+        self.streams.extend([slow, fast])
+
+        with mock.patch('myapp.ai_service.hedge_delay', return_value=0.05):
+            result, _ = self.stream(deadline=5)
+
+        self.assertEqual(result, {'score': 80, 'summary': 'gut'})
+        self.assertEqual(self.sections, ['score', 'summary'])
+        self.assertEqual(len(get_latency_tracker(self.model, FIRST_CHUNK).samples), 1)
+        self.release.set()
+        wait_for(lambda: slow.closed)
+        self.assertTrue(slow.closed)
+
+
+class FakeAsyncCompletions:
+    """AsyncOpenAI chat.completions answering with the score in the prompt"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, messages, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        content = json.dumps({'score': int(messages[0]['content'])})
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class AsyncAIServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.completions = FakeAsyncCompletions()
+        self.service = AsyncAIReadinessService.__new__(AsyncAIReadinessService)
+        self.service.bounded_client = self.service.client = SimpleNamespace(
+            chat=SimpleNamespace(completions=self.completions)
+        )
+        self.service._semaphores = {}
+        self.service.build_request = lambda assessment, sections=None: {
+            'model': 'test-model', 'messages': [{'role': 'user', 'content': str(assessment['score'])}]
+        }
+
+        patches = {
+            'find_reusable_analysis': None,
+            'remember_analysis': None,
+            'get_analysis_cache': None,
+            'get_rate_limiter': RateLimiter(max_concurrency=2),
+        }
+        for name, value in patches.items():
+            patcher = mock.patch(f'myapp.ai_service.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_analyze_many_keeps_the_order_and_the_concurrency_limit(self):
+        results = asyncio.run(self.service.analyze_many([{'score': score} for score in (80, 20, 55, 90)]))
+
+        self.assertEqual([r['score'] for r in results], [80, 20, 55, 90])
+        self.assertEqual([r['score_level'] for r in results], ['Hoch', 'Niedrig', 'Mittel', 'Hoch'])
+        self.assertEqual(self.completions.peak, 2)
+
+    def test_failed_analysis_is_returned_in_its_place(self):
+        with override_settings(AI_CIRCUIT_OPEN_ACTION='defer'), \
+                mock.patch.object(self.service, '_complete_async', side_effect=ProviderUnavailable('down')):
+            results = asyncio.run(self.service.analyze_many([{'score': 80}]))
+
+        self.assertIsInstance(results[0], ProviderUnavailable)
+
+
+class ConcurrentAnalysisStageTests(SimpleTestCase):
+    def setUp(self):
+        self.supabase = FakeSupabase('a', 'b', 'c')
+        patcher = mock.patch('myapp.submissions.get_supabase', return_value=self.supabase)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_analyses_are_stored_and_failures_left_for_a_retry(self):
+        service = mock.Mock()
+        service.analyze_many = mock.AsyncMock(return_value=[
+            {'score': 75, 'score_level': 'Hoch'}, ProviderUnavailable('down')
+        ])
+        service.close = mock.AsyncMock()
+        rows = [{'id': 'a'}, {'id': 'b'}, {'id': 'c', 'analysis_completed': True}, None]
+
+        with mock.patch('myapp.ai_service.AsyncAIReadinessService', return_value=service):
+            run_analysis_stage_many(rows)
+
+        self.assertEqual(service.analyze_many.await_args.args[0], rows[:2])
+        service.close.assert_awaited_once()
+        self.assertTrue(self.supabase.rows['a']['analysis_completed'])
+        self.assertEqual(self.supabase.rows['a']['calculated_score'], 75)
+        self.assertNotIn('analysis_completed', self.supabase.rows['b'])
+        self.assertTrue(rows[0]['analysis_completed'])
+
+
+class SectionMergeTests(SimpleTestCase):
+    ASSESSMENT = {'company_name': 'Alpha GmbH', 'calculated_score': 30}
+
+    def setUp(self):
+        self.service = AIReadinessService.__new__(AIReadinessService)
+        self.fallback = self.service._get_fallback_analysis(self.ASSESSMENT)
+        patcher = mock.patch('myapp.ai_service.remember_analysis')
+        self.remember = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_group_is_filled_from_the_fallback(self):
+        merged = self.service._merge_sections(self.ASSESSMENT, {
+            'assessment': {'score': 82, 'score_level': 'Niedrig', 'executive_summary': 'Gut',
+                           'strengths': ['CRM'], 'weaknesses': []},
+            'use_cases': ValueError('invalid JSON'),
+            'plan': {'quick_wins': [], 'strategic_steps': [], 'budget_recommendation': '10k', 'next_actions': []},
+        })
+
+        self.assertEqual((merged['score'], merged['score_level']), (82, 'Hoch'))
+        self.assertEqual(merged['recommended_use_cases'], self.fallback['recommended_use_cases'])
+        self.assertEqual(merged['budget_recommendation'], '10k')
+        self.remember.assert_not_called()  # a partly generic analysis is not reused
+
+    def test_keys_a_group_left_out_are_filled_from_the_fallback(self):
+        merged = self.service._merge_sections(self.ASSESSMENT, {
+            'assessment': {'score': 82, 'executive_summary': 'Gut', 'strengths': [], 'weaknesses': []},
+            'use_cases': {'recommended_use_cases': []},
+            'plan': {'quick_wins': [], 'strategic_steps': [], 'next_actions': []},
+        })
+
+        self.assertEqual(merged['budget_recommendation'], self.fallback['budget_recommendation'])
+        self.assertEqual(merged['score_level'], 'Hoch')
+        self.remember.assert_called_once_with(self.ASSESSMENT)
+
+    @override_settings(AI_CIRCUIT_OPEN_ACTION='defer')
+    def test_open_circuit_defers_instead_of_merging(self):
+        with self.assertRaises(ProviderUnavailable):
+            self.service._merge_sections(self.ASSESSMENT, {'assessment': ProviderUnavailable('down')})
+
+
+# ============================================================
+# JOB QUEUE / LEASES
+# ============================================================
+
+@override_settings(ASSESSMENT_MAX_ATTEMPTS=3, ASSESSMENT_RETRY_BASE_SECONDS=60, ASSESSMENT_RETRY_MAX_SECONDS=600)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.assessment_id = str(uuid.uuid4())
+        self.supabase = FakeSupabase(self.assessment_id)
+        patcher = mock.patch('myapp.submissions.get_supabase', return_value=self.supabase)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def attempt(self):
+        AssessmentJob.objects.filter(assessment_id=self.assessment_id).update(next_attempt_at=datetime.now(dt_timezone.utc))
+        job, started = job_queue.begin_attempt(self.assessment_id)
+        self.assertTrue(started)
+        return job
+
+    def test_backoff_delay_doubles_with_jitter_up_to_the_cap(self):
+        for attempts, base in ((1, 60), (2, 120), (3, 240), (10, 600)):
+            delay = job_queue.backoff_delay(attempts).total_seconds()
+            self.assertGreaterEqual(delay, base * 0.8)
+            self.assertLessEqual(delay, base * 1.2)
+
+    def test_no_attempt_while_backing_off(self):
+        self.attempt()
+        retry_at = job_queue.fail(self.assessment_id, 'timeout')
+
+        self.assertGreater(retry_at, datetime.now(dt_timezone.utc) + timedelta(seconds=40))
+        job, started = job_queue.begin_attempt(self.assessment_id)
+        self.assertFalse(started)
+        self.assertEqual(job.attempts, 1)
+
+    def test_dead_letter_after_max_attempts(self):
+        for attempt in (1, 2):
+            self.attempt()
+            self.assertIsNotNone(job_queue.fail(self.assessment_id, f'error {attempt}'))
+
+        self.attempt()
+        self.assertIsNone(job_queue.fail(self.assessment_id, 'error 3'))
+
+        job = AssessmentJob.objects.get(assessment_id=self.assessment_id)
+        self.assertEqual(job.status, AssessmentJob.STATUS_DEAD)
+        dead = DeadLetterJob.objects.get(assessment_id=self.assessment_id)
+        self.assertEqual((dead.attempts, dead.last_error), (3, 'error 3'))
+        self.assertFalse(job_queue.begin_attempt(self.assessment_id)[1])
+
+    def test_requeue_dead_resets_the_job_and_unparks_the_row(self):
+        for _ in range(3):
+            self.attempt()
+            job_queue.fail(self.assessment_id, 'error')
+        submissions.park(self.assessment_id)
+
+        job_queue.requeue_dead(self.assessment_id)
+
+        self.assertFalse(DeadLetterJob.objects.filter(assessment_id=self.assessment_id).exists())
+        self.assertIsNone(self.supabase.rows[self.assessment_id]['claimed_by'])
+        job = self.attempt()
+        self.assertEqual(job.attempts, 1)
+
+    def test_worker_needs_a_shared_database(self):
+        with self.assertRaisesMessage(CommandError, 'DATABASE_URL'), \
+                mock.patch('myapp.job_queue.is_shared_database', return_value=False), \
+                mock.patch('myapp.tasks.start_assessment_processor') as start:
+            call_command('run_assessment_worker')
+        self.assertFalse(start.called)
+
+
+class LeaseTests(SimpleTestCase):
+    def setUp(self):
+        self.supabase = FakeSupabase('a', 'b')
+        patcher = mock.patch('myapp.submissions.get_supabase', return_value=self.supabase)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def as_worker(self, worker_id):
+        return mock.patch('myapp.submissions.WORKER_ID', worker_id)
+
+    def test_only_one_worker_holds_the_lease(self):
+        with self.as_worker('node-1'):
+            self.assertTrue(submissions.claim_one('a'))
+            self.assertTrue(submissions.claim_one('a'))  # renewing our own lease
+        with self.as_worker('node-2'):
+            self.assertFalse(submissions.claim_one('a'))
+            self.assertTrue(submissions.claim_one('b'))
+
+        self.assertEqual(self.supabase.rows['a']['claimed_by'], 'node-1')
+
+    def test_expired_lease_can_be_taken_over(self):
+        with self.as_worker('node-1'):
+            submissions.claim_one('a')
+        expired = datetime.now(dt_timezone.utc) - timedelta(seconds=1)
+        self.supabase.rows['a']['lease_expires_at'] = expired.isoformat()
+
+        with self.as_worker('node-2'):
+            self.assertTrue(submissions.claim_one('a'))
+        self.assertEqual(self.supabase.rows['a']['claimed_by'], 'node-2')
+
+    def test_release_only_drops_our_own_lease(self):
+        with self.as_worker('node-1'):
+            submissions.claim_one('a')
+        with self.as_worker('node-2'):
+            submissions.release('a')
+        self.assertEqual(self.supabase.rows['a']['claimed_by'], 'node-1')
+
+        with self.as_worker('node-1'):
+            submissions.release('a')
+        with self.as_worker('node-2'):
+            self.assertTrue(submissions.claim_one('a'))
+
+    def test_parked_rows_are_never_claimed(self):
+        submissions.park('a')
+
+        with self.as_worker('node-1'):
+            self.assertFalse(submissions.claim_one('a'))
+        self.assertEqual(submissions.count_pending(), 1)
+
+
+class PipelineStopTests(SimpleTestCase):
+    def test_stop_with_full_queues_hands_the_jobs_back(self):
+        pipeline = AssessmentPipeline(stage_workers={'analysis': 2}, queue_size=2)
+        pipeline.running = True  # no workers: the queues stay full
+        done = []
+        for assessment_id in ('a', 'b'):
+            pipeline.submit(assessment_id, claimed=True, on_done=lambda *args: done.append(args))
+
+        with mock.patch('myapp.pipeline.release') as release:
+            pipeline.stop()
+
+        self.assertEqual([args[:2] for args in done], [('a', False), ('b', False)])
+        self.assertTrue(all(isinstance(args[2], ProviderUnavailable) for args in done))
+        self.assertEqual([call.args for call in release.call_args_list], [('a',), ('b',)])
+        self.assertEqual(pipeline.stats()['in_flight'], 0)
+        self.assertEqual(pipeline.stats()['failed'], 0)
+        self.assertEqual(pipeline.queues['analysis'].qsize(), 2)  # one stop marker per worker
+
+
+class PipelineLeaseTests(SimpleTestCase):
+    def setUp(self):
+        self.supabase = FakeSupabase('a')
+        patcher = mock.patch('myapp.submissions.get_supabase', return_value=self.supabase)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        submissions.claim_one('a')
+
+        for name in ('fetch_for_processing', 'run_analysis_stage', 'run_email_stage'):
+            patcher = mock.patch(f'myapp.pipeline.{name}', side_effect=lambda row, *args: row)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.fetch_for_processing.side_effect = lambda assessment_id, status: {'id': assessment_id}
+        self.run_email_stage.side_effect = lambda row, pdf: True
+
+    def process(self, render):
+        done = Queue()
+        pipeline = AssessmentPipeline()
+        pipeline.start()
+        self.addCleanup(pipeline.stop)
+        with mock.patch('myapp.pipeline.run_pdf_stage', side_effect=render):
+            pipeline.submit('a', claimed=True, on_done=lambda *args: done.put(args))
+            return done.get(timeout=5)
+
+    def test_lease_is_renewed_at_every_stage(self):
+        self.supabase.rows['a']['lease_expires_at'] = datetime.now(dt_timezone.utc).isoformat()
+
+        self.assertEqual(self.process(lambda row: None), ('a', True, None))
+        self.assertGreater(self.supabase.rows['a']['lease_expires_at'], datetime.now(dt_timezone.utc).isoformat())
+
+    def test_lost_lease_skips_the_email(self):
+        def render(row):
+            # The lease expired meanwhile and another worker took the row over
+            self.supabase.rows['a']['claimed_by'] = 'node-2'
+            self.supabase.rows['a']['lease_expires_at'] = (
+                datetime.now(dt_timezone.utc) + timedelta(minutes=10)
+            ).isoformat()
+
+        assessment_id, success, error = self.process(render)
+
+        self.assertFalse(success)
+        self.assertIsInstance(error, ProviderUnavailable)
+        self.run_email_stage.assert_not_called()
+        self.assertEqual(self.supabase.rows['a']['claimed_by'], 'node-2')
+
+
+@override_settings(SUPABASE_DB_URL='')
+class WebhookTests(TestCase):
+    def setUp(self):
+        self.pending, self.sent = str(uuid.uuid4()), str(uuid.uuid4())
+        self.supabase = FakeSupabase(self.pending, self.sent)
+        self.supabase.rows[self.sent]['email_sent'] = True
+        patcher = mock.patch('myapp.views.get_supabase', return_value=self.supabase)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, assessment_id):
+        return self.client.post(
+            reverse('webhook_new_assessment'),
+            json.dumps({'assessment_id': assessment_id}),
+            content_type='application/json'
+        )
+
+    def test_pending_assessment_is_queued(self):
+        with mock.patch('myapp.tasks.wake_assessment_processor', return_value=True):
+            response = self.post(self.pending)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status_url'], reverse('assessment_status', args=[self.pending]))
+        self.assertTrue(AssessmentJob.objects.filter(assessment_id=self.pending).exists())
+
+    def test_unknown_assessment_is_404(self):
+        response = self.post(str(uuid.uuid4()))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(AssessmentJob.objects.exists())
+
+    def test_already_sent_assessment_is_not_queued_again(self):
+        response = self.post(self.sent)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AssessmentJob.objects.exists())
+
+    def test_warns_when_nothing_will_pick_the_assessment_up(self):
+        with self.assertLogs('myapp.views', 'WARNING') as logs:
+            response = self.post(self.pending)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('waits for the next worker poll', logs.output[0])
+
+
+class AnalysisProgressTests(SimpleTestCase):
+    def setUp(self):
+        self.assessment_id = str(uuid.uuid4())
+        self.supabase = FakeSupabase(self.assessment_id)
+        self.supabase.rows[self.assessment_id]['claimed_by'] = 'node-1'
+
+    def test_streamed_sections_show_up_in_the_status(self):
+        statuses = []
+
+        def analyze_assessment(assessment, on_section):
+            for key in ('executive_summary', 'strengths'):
+                on_section(key, '...')
+                with mock.patch('myapp.views.get_supabase', return_value=self.supabase):
+                    statuses.append(self.client.get(reverse('assessment_status', args=[self.assessment_id])).json())
+            return {'score': 64, 'score_level': 'Mittel'}
+
+        service = mock.Mock(analyze_assessment=analyze_assessment)
+        with mock.patch('myapp.ai_service.get_ai_service', return_value=service), \
+                mock.patch('myapp.pipeline.update_row'), \
+                override_settings(AI_ANALYSIS_STREAMING=True):
+            assessment = run_analysis_stage({'id': self.assessment_id})
+
+        self.assertEqual([status['analysis_sections'] for status in statuses], [
+            ['executive_summary'], ['executive_summary', 'strengths']
+        ])
+        self.assertEqual(statuses[0]['state'], 'processing')
+        self.assertTrue(assessment['analysis_completed'])
+        self.assertIsNone(get_section_progress(self.assessment_id))
+
+
+class BatchBacklogTests(TestCase):
+    def setUp(self):
+        self.ids = [str(uuid.uuid4()) for _ in range(2)]
+        self.supabase = FakeSupabase(*self.ids)
+        for assessment_id in self.ids:
+            self.supabase.rows[assessment_id]['claimed_by'] = submissions.WORKER_ID
+
+        client = mock.Mock()
+        client.files.create.return_value = SimpleNamespace(id='file-in')
+        client.batches.create.return_value = SimpleNamespace(id='batch_1', status='validating')
+        self.client_stub = client
+        self.service = mock.Mock(
+            client=client,
+            build_request=lambda assessment: {'model': 'gpt-test', 'messages': [{'role': 'user', 'content': assessment['id']}]},
+            parse_result=json.loads
+        )
+
+        for patcher in (
+            mock.patch('myapp.submissions.get_supabase', return_value=self.supabase),
+            mock.patch('myapp.batch_analysis.get_supabase', return_value=self.supabase),
+            mock.patch('myapp.batch_analysis.claim_batch', return_value=[{'id': i} for i in self.ids]),
+            mock.patch('myapp.ai_service.get_ai_service', return_value=self.service),
+            mock.patch('myapp.job_queue.is_shared_database', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def result_line(self, assessment_id, status_code=200, analysis=None):
+        content = json.dumps(analysis or {'score': 70, 'score_level': 'Hoch'})
+        return json.dumps({
+            'custom_id': assessment_id,
+            'response': {'status_code': status_code, 'body': {'choices': [{'message': {'content': content}}]}},
+            'error': None if status_code == 200 else {'message': 'failed'}
+        })
+
+    def test_submit_collect_and_apply(self):
+        response = self.client.get(reverse('process_pending'), {'mode': 'batch', 'limit': 2})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['batch_id'], 'batch_1')
+        upload = self.client_stub.files.create.call_args.kwargs['file'][1].decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['custom_id'] for line in upload], self.ids)
+        self.assertEqual({row['claimed_by'] for row in self.supabase.rows.values()}, {'batch:batch_1'})
+
+        # Still running: nothing applied, rows stay with the batch
+        self.client_stub.batches.retrieve.return_value = SimpleNamespace(status='in_progress', output_file_id=None)
+        self.assertEqual(collect_batches(), 0)
+        self.assertEqual(AnalysisBatch.objects.get().status, 'in_progress')
+
+        self.client_stub.batches.retrieve.return_value = SimpleNamespace(status='completed', output_file_id='file-out')
+        self.client_stub.files.content.return_value = SimpleNamespace(
+            text='\n'.join([self.result_line(self.ids[0]), self.result_line(self.ids[1], status_code=500)])
+        )
+        self.assertEqual(collect_batches(), 1)
+
+        analysed, failed = (self.supabase.rows[i] for i in self.ids)
+        self.assertTrue(analysed['analysis_completed'])
+        self.assertEqual(analysed['chatgpt_analysis'], {'score': 70, 'score_level': 'Hoch'})
+        self.assertIsNone(analysed['claimed_by'])
+        self.assertNotIn('analysis_completed', failed)
+        self.assertIsNone(failed['claimed_by'])  # handed back to the pipeline
+
+        record = AnalysisBatch.objects.get()
+        self.assertEqual((record.status, record.succeeded, record.failed), ('completed', 1, 1))
+
+    def test_failed_upload_releases_the_rows(self):
+        self.client_stub.batches.create.side_effect = RuntimeError('upload rejected')
+
+        response = self.client.get(reverse('process_pending'), {'mode': 'batch'})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual({row['claimed_by'] for row in self.supabase.rows.values()}, {None})
+        self.assertFalse(AnalysisBatch.objects.exists())
+
+    def test_batch_needs_a_collector_that_sees_it(self):
+        # No processor in this process and a per-machine database
+        with mock.patch('myapp.job_queue.is_shared_database', return_value=False):
+            response = self.client.get(reverse('process_pending'), {'mode': 'batch'})
+
+            self.assertEqual(response.status_code, 503)
+            self.assertFalse(self.client_stub.batches.create.called)
+            with self.assertRaisesMessage(CommandError, 'DATABASE_URL'):
+                call_command('run_analysis_batch', '--submit')
+
+
+# ============================================================
+# EMBEDDED PROCESSOR
+# ============================================================
+
+class EmbeddedProcessorStartTests(SimpleTestCase):
+    def ready(self, *argv):
+        with mock.patch('sys.argv', list(argv)), mock.patch('myapp.tasks.start_assessment_processor') as start:
+            apps.get_app_config('myapp').ready()
+        return start.called
+
+    def test_web_server_starts_the_processor(self):
+        self.assertTrue(self.ready('/app/.venv/bin/gunicorn', 'bot.wsgi'))
+        self.assertTrue(self.ready('manage.py', 'runserver', '--noreload'))
+
+    def test_management_commands_never_start_it(self):
+        for command in ('run_analysis_batch', 'rescore_assessments', 'run_assessment_worker', 'migrate', 'test'):
+            with self.subTest(command=command):
+                self.assertFalse(self.ready('manage.py', command))
+
+
+@override_settings(ASSESSMENT_MIN_POLL_SECONDS=2, ASSESSMENT_MAX_POLL_SECONDS=300,
+                   ASSESSMENT_SAFETY_POLL_SECONDS=900, AI_BATCH_POLL_SECONDS=60)
+class PollIntervalTests(SimpleTestCase):
+    def setUp(self):
+        self.processor = AssessmentProcessor()
+
+    def test_backlog_is_polled_again_immediately(self):
+        self.processor.unclaimed = 12
+        self.assertEqual(self.processor._poll_interval(processed=5), 0)
+
+        self.processor.unclaimed = 0
+        self.assertEqual(self.processor._poll_interval(processed=5), 2)
+
+    def test_idle_polling_backs_off_up_to_the_maximum(self):
+        intervals = [self.processor._poll_interval(processed=0) for _ in range(10)]
+
+        self.assertEqual(intervals[:4], [2, 4, 8, 16])
+        self.assertEqual(intervals[-1], 300)
+        self.assertEqual(self.processor._poll_interval(processed=1), 2)
+        self.assertEqual(self.processor._poll_interval(processed=0), 2)  # back-off starts over
+
+    def test_connected_listener_only_needs_a_safety_poll(self):
+        self.processor.listener = SimpleNamespace(connected=True)
+        for _ in range(12):
+            interval = self.processor._poll_interval(processed=0)
+        self.assertEqual(interval, 900)
+
+    def test_open_batches_cap_the_interval(self):
+        self.processor.open_batches = 1
+        for _ in range(12):
+            interval = self.processor._poll_interval(processed=0)
+        self.assertEqual(interval, 60)
+
+
+# ============================================================
+# LISTEN / NOTIFY
+# ============================================================
+
+class AssessmentListenerTests(SimpleTestCase):
+    def test_notifications_wake_the_callback(self):
+        connection = FakePostgres()
+        received = Queue()
+        listener = AssessmentListener('postgresql://stand-in', 'ki_check_submissions_new', received.put)
+
+        with mock.patch('psycopg2.connect', return_value=connection):
+            listener.start()
+            try:
+                # One wake-up right after connecting, for anything missed meanwhile
+                self.assertIsNone(received.get(timeout=5))
+                self.assertTrue(listener.connected)
+                self.assertEqual(connection.statements, ['LISTEN "ki_check_submissions_new";'])
+
+                connection.send('1b9d6bcd-bbfd-4b2d-9b5d-ab8dfbbd4bed')
+                connection.send('6ec0bd7f-11c0-43da-975e-2a8ad9ebae0b')
+                self.assertEqual(received.get(timeout=5), '1b9d6bcd-bbfd-4b2d-9b5d-ab8dfbbd4bed')
+                self.assertEqual(received.get(timeout=5), '6ec0bd7f-11c0-43da-975e-2a8ad9ebae0b')
+            finally:
+                listener.stop()
+                connection.send('stop')  # wake the select so the thread sees stop()
+                listener.thread.join(timeout=5)
+
+        self.assertFalse(listener.thread.is_alive())
+        self.assertTrue(connection.closed)
+        self.assertFalse(listener.connected)
+
+
+# ============================================================
+# PDF WORKER PROCESSES
+# ============================================================
+
+class PDFRenderPoolTests(SimpleTestCase):
+    def make_pool(self, processes, timeout):
+        pool = PDFRenderPool(processes=processes, timeout=timeout, max_tasks_per_child=None)
+        self.addCleanup(pool.shutdown)
+        # Start every worker, so their start-up does not count in the timings below
+        with ThreadPoolExecutor(processes) as threads:
+            list(threads.map(lambda _: pool._run(time.sleep, 0.2), range(processes)))
+        return pool
+
+    def test_renders_a_report_into_a_spool_file(self):
+        pool = self.make_pool(1, timeout=60)
+
+        pdf = pool.render({'company_name': 'Beispiel GmbH', 'calculated_score': 64, 'score_level': 'Mittel',
+                           'chatgpt_analysis': {'executive_summary': 'Gute Ausgangslage.'}})
+        self.addCleanup(pdf.delete)
+
+        self.assertTrue(pdf.read().startswith(b'%PDF'))
+        self.assertEqual(len(pdf), os.path.getsize(pdf.path))
+
+    def test_waiting_for_a_free_worker_does_not_count_towards_the_timeout(self):
+        pool = self.make_pool(1, timeout=1.5)
+
+        with ThreadPoolExecutor(3) as threads:
+            results = list(threads.map(lambda _: pool._run(time.sleep, 1.0), range(3)))
+
+        self.assertEqual(results, [None] * 3)
+        self.assertEqual(pool.stats()['timeouts'], 0)
+
+    def test_timeout_leaves_the_other_renders_running(self):
+        pool = self.make_pool(2, timeout=3)
+        old = pool._pool
+
+        with ThreadPoolExecutor(2) as threads:
+            stuck = threads.submit(pool._run, time.sleep, 60)
+            time.sleep(1.5)
+            healthy = threads.submit(pool._run, time.sleep, 2.5)  # still running when `stuck` times out
+
+            with self.assertRaises(PDFRenderTimeout):
+                stuck.result()
+            self.assertIsNone(healthy.result())
+
+        self.assertEqual(pool.stats(), {'processes': 2, 'rendered': 0, 'timeouts': 1, 'crashes': 0, 'restarts': 1})
+        self.assertIsNone(pool._run(time.sleep, 0))  # new reports go to a fresh pool
+        self.assertIsNot(pool._pool, old)
+
+        # The old pool (and the stuck worker) is killed once `healthy` is done
+        for _ in range(50):
+            if old not in pool._in_flight:
+                break
+            time.sleep(0.1)
+        self.assertNotIn(old, pool._in_flight)
+
+    def test_crashed_worker_is_retried_once_in_a_new_pool(self):
+        pool = self.make_pool(1, timeout=30)
+
+        with self.assertRaises(BrokenProcessPool):
+            pool._run(os._exit, 1)
+
+        self.assertEqual((pool.stats()['crashes'], pool.stats()['restarts']), (2, 2))
+        self.assertIsNone(pool._run(time.sleep, 0))
+
+
+# ============================================================
+# PRE-ANALYSIS / PROMPT
+# ============================================================
+
+class PreAnalysisTests(SimpleTestCase):
+    def test_many_assessments_at_once(self):
+        first = {
+            'calculated_score': 72,
+            'raw_answers': {
+                'serviceTools': [{'text': 'Zendesk', 'value': 5}, {'text': 'Excel', 'value': 1}],
+                'painPoints': [{'text': 'Lange Antwortzeiten', 'value': 4}, {'text': 'Fehler', 'value': 2}],
+                'recurringTasks': [{'text': 'Angebote', 'value': 3}, {'text': 'Ablage', 'value': 1}],
+            }
+        }
+        second = {
+            'calculated_score': None,
+            'raw_answers': json.dumps({'dataSources': [{'text': 'CRM', 'value': '4.5'}, {'text': None, 'value': 5}]})
+        }
+
+        results = pre_analyze_many([first, second, {}])
+
+        self.assertEqual(results[0]['score_level'], 'Hoch')
+        self.assertEqual(results[0]['strengths'], ['Service-Tools: Zendesk (5)'])
+        self.assertEqual(results[0]['weaknesses'], [
+            'Schmerzpunkte: Lange Antwortzeiten (4)', 'Service-Tools: Excel (1)'
+        ])
+        self.assertEqual(results[0]['quick_win_candidates'], ['Wiederkehrende Aufgaben: Angebote (3)'])
+        # Mild pain points are no strength
+        self.assertEqual(results[0]['strongest_areas'], [('Service-Tools', 3.0)])
+        self.assertEqual(results[0]['weakest_areas'], [('Schmerzpunkte', 3.0)])
+        self.assertEqual(results[0]['summarised'], {
+            'serviceTools': [('Zendesk', 5.0), ('Excel', 1.0)],
+            'painPoints': [('Lange Antwortzeiten', 4.0)],
+            'recurringTasks': [('Angebote', 3.0)],
+        })
+
+        # Missing score counts as 50, answers may be a JSON string
+        self.assertEqual((results[1]['score'], results[1]['score_level']), (50, 'Mittel'))
+        self.assertEqual(results[1]['strengths'], ['Datenquellen: CRM (4.5)'])
+
+        self.assertEqual(results[2]['strengths'], [])
+        self.assertEqual(pre_analyze_many([]), [])
+
+    def test_prompt_keeps_the_items_the_facts_do_not_list(self):
+        assessment = {
+            'company_name': 'Muster GmbH',
+            'calculated_score': 55,
+            'raw_answers': {
+                'marketingTools': [{'text': 'HubSpot', 'value': 3}, {'text': 'Canva', 'value': 5}],
+                'serviceTools': ['Outlook'],
+                'dataSources': [{'text': 'ERP'}],
+                'painPoints': [{'text': 'Medienbrüche', 'value': 3}],
+                'recurringTasks': [{'text': 'Rechnungen', 'value': 2}],
+            }
+        }
+        facts = pre_analyze(assessment)
+
+        block = build_assessment_block(assessment, facts=facts)
+
+        self.assertIn('Marketing-Tools: HubSpot (3)\n', block)
+        self.assertIn('Service-Tools: Outlook', block)
+        self.assertIn('Datenquellen: ERP', block)
+        self.assertIn('Schmerzpunkte: Medienbrüche (3)', block)
+        self.assertIn('Wiederkehrende Aufgaben: Rechnungen (2)', block)
+        # Canva is listed as a strength instead of in the profile
+        self.assertEqual(block.count('Canva'), 1)
+        self.assertIn('Stärken: Marketing-Tools: Canva (5)', block)
+        self.assertIn('Stärkste Bereiche: Marketing-Tools (Ø 4.0)', block)
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    def submission(self, assessment_id, company, **fields):
+        raw_answers = {
+            'serviceTools': [{'text': 'Zendesk', 'value': 4}],
+            'painPoints': [{'text': 'Lange Antwortzeiten', 'value': 5}],
+            'detailedChallenges': 'Wir verlieren Anfragen im Postfach.',
+        }
+        raw_answers.update(fields.pop('raw_answers', {}))
+        assessment = {
+            'id': assessment_id, 'company_name': company, 'industry': 'Handel', 'company_size': '10-49',
+            'budget': '10.000-50.000', 'responsible_person': 'Geschäftsführung', 'calculated_score': 55,
+            'raw_answers': raw_answers,
+        }
+        assessment.update(fields)
+        return assessment
+
+    def setUp(self):
+        self.index = SimilarityIndex(threshold=0.98)
+        self.index.add('first', self.submission('first', 'Alpha GmbH'))
+
+    def test_identical_answers_are_reused(self):
+        match = self.index.query(self.submission('second', 'Beta GmbH'))
+
+        self.assertEqual(match[:2], ('first', 'Alpha GmbH'))
+
+    def test_different_free_text_prevents_reuse(self):
+        other = self.submission('second', 'Beta GmbH', raw_answers={
+            'detailedChallenges': 'Unser Lager in Leipzig meldet Bestände zu spät.'
+        })
+
+        self.assertIsNone(self.index.query(other))
+
+    def test_free_text_on_one_side_only_prevents_reuse(self):
+        other = self.submission('second', 'Beta GmbH', raw_answers={'biggestConcern': 'Datenschutz beim Betriebsrat'})
+
+        self.assertIsNone(self.index.query(other))
+
+    def test_different_exact_columns_prevent_reuse(self):
+        for field, value in (('responsible_person', 'Frau Schmidt (IT)'), ('monthly_leads', '500'), ('monthly_tickets', '2000')):
+            with self.subTest(field=field):
+                self.assertIsNone(self.index.query(self.submission('second', 'Beta GmbH', **{field: value})))
+
+    def test_different_score_prevents_reuse(self):
+        # The narrative may cite the score or its level
+        for score in (56, 72, None):
+            with self.subTest(score=score):
+                self.assertIsNone(self.index.query(self.submission('second', 'Beta GmbH', calculated_score=score)))
+
+
+class StaticPrefixTests(SimpleTestCase):
+    def test_prefix_is_the_same_for_every_assessment(self):
+        first, _ = build_messages({'company_name': 'Alpha GmbH', 'industry': 'Handel'})
+        second, _ = build_messages({'company_name': 'Beta AG', 'raw_answers': {'additionalInfo': 'Eilig'}})
+
+        self.assertEqual(first[0], second[0])
+        self.assertTrue(first[0]['content'].startswith(f'Prompt-Version {PROMPT_VERSION}'))
+        self.assertNotIn('Alpha', first[0]['content'])
+
+
+class TruncateTokensTests(SimpleTestCase):
+    def test_text_within_budget_is_unchanged(self):
+        self.assertEqual(truncate_tokens('Kurzer Text', 50), 'Kurzer Text')
+
+    def test_long_text_is_cut_at_a_word_boundary(self):
+        words = ' '.join(f'Wort{n}' for n in range(200))
+
+        cut = truncate_tokens(words, 40)
+
+        self.assertLessEqual(count_tokens(cut), 40)
+        self.assertTrue(cut.endswith(' …'))
+        self.assertTrue(words.startswith(cut[:-2] + ' '))
+
+    def test_text_without_spaces_is_cut_mid_word(self):
+        url = 'https://example.com/' + 'a' * 400
+
+        cut = truncate_tokens(url, 30)
+
+        self.assertLessEqual(count_tokens(cut), 30)
+        self.assertGreater(len(cut), 40)
+        self.assertTrue(url.startswith(cut[:-2]))
+
+
+# ============================================================
+# ANALYSIS CACHE
+# ============================================================
+
+class AnalysisCacheTests(SimpleTestCase):
+    REQUEST = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'Profil'}], 'temperature': 0.7}
+
+    def setUp(self):
+        patcher = mock.patch('myapp.analysis_cache.time')
+        self.clock = patcher.start().monotonic
+        self.clock.return_value = 100.0
+        self.addCleanup(patcher.stop)
+
+    def test_key_depends_on_the_request_not_its_key_order(self):
+        reordered = dict(reversed(list(self.REQUEST.items())))
+
+        self.assertEqual(AnalysisCache.make_key(reordered), AnalysisCache.make_key(self.REQUEST))
+        self.assertNotEqual(
+            AnalysisCache.make_key(dict(self.REQUEST, model='gpt-4o-mini')), AnalysisCache.make_key(self.REQUEST)
+        )
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = AnalysisCache(ttl=60)
+        cache.set('k', {'score': 70})
+
+        self.clock.return_value = 159.0
+        self.assertEqual(cache.get('k'), {'score': 70})
+        self.clock.return_value = 161.0
+        self.assertIsNone(cache.get('k'))
+        self.assertEqual(cache.stats(), {'entries': 0, 'hits': 1, 'shared_hits': 0, 'misses': 1})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = AnalysisCache(max_entries=2)
+        cache.set('a', {'score': 1})
+        cache.set('b', {'score': 2})
+        cache.get('a')
+        cache.set('c', {'score': 3})
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'score': 1})
+        self.assertEqual(cache.get('c'), {'score': 3})
+
+    def test_callers_get_a_copy(self):
+        cache = AnalysisCache()
+        cache.set('k', {'strengths': ['CRM']})
+
+        cache.get('k')['strengths'].append('geändert')
+
+        self.assertEqual(cache.get('k'), {'strengths': ['CRM']})
+
+
+# ============================================================
+# MODEL ROUTING
+# ============================================================
+
+@override_settings(AI_MODEL_ROUTING=True, AI_MODEL_TIERS=[
+    {'name': 'full', 'model': 'big', 'min_richness': 0.4},
+    {'name': 'light', 'model': 'small', 'min_richness': 0.0},
+])
+class ModelRoutingTests(SimpleTestCase):
+    def complete_assessment(self):
+        assessment, raw = {}, {}
+        for _, fields in SECTIONS:
+            for _, source, key in fields:
+                if source == 'column':
+                    assessment[key] = 'Ja'
+                elif source == 'rated':
+                    raw[key] = [{'text': 'Eintrag', 'value': 3}]
+                else:
+                    raw[key] = 'Wir bearbeiten jede Anfrage von Hand. ' * 10
+        assessment['raw_answers'] = raw
+        return assessment
+
+    def test_richness_of_empty_and_complete_submissions(self):
+        self.assertEqual(richness({}), 0)
+        self.assertEqual(richness(self.complete_assessment()), 1)
+
+    def test_unanswered_placeholders_do_not_count(self):
+        sparse = {'company_name': 'Alpha GmbH', 'raw_answers': {'painPoints': [], 'biggestConcern': '  '}}
+
+        self.assertLess(richness(sparse), richness({'company_name': 'Alpha GmbH', 'industry': 'Handel'}))
+
+    def test_sparse_submissions_go_to_the_light_tier(self):
+        self.assertEqual(route({'company_name': 'Alpha GmbH'})['model'], 'small')
+
+        tier = route(self.complete_assessment())
+        self.assertEqual((tier['name'], tier['richness']), ('full', 1))
+
+    @override_settings(AI_MODEL_ROUTING=False)
+    def test_without_routing_every_submission_gets_the_top_tier(self):
+        self.assertEqual(route({}), {'name': 'full', 'model': 'big', 'min_richness': 0.4, 'richness': None})
@@ -1,361 +1,3 @@
-"""
-Assessment Processing Views
-Uses modular ai_service.py and pdf_generator.py
-"""
-
-from django.shortcuts import render
-from django.http import JsonResponse
-from django.core.mail import EmailMessage
-from django.conf import settings
-from .supabase_client import get_supabase
-from .ai_service import get_ai_service
-from .pdf_generator import generate_assessment_pdf
-import logging
-from datetime import datetime
-
-logger = logging.getLogger(__name__)
-
-# ============================================================
-# EXISTING VIEWS (Keep these as they are)
-# ============================================================
-
-def list_tables(request):
-    """View to list all available tables in Supabase"""
-    try:
-        supabase = get_supabase()
-        response = supabase.rpc('get_tables').execute()
-        
-        context = {
-            'message': 'Available tables will be shown here',
-            'tables': response.data if response.data else []
-        }
-        return render(request, 'tables_list.html', context)
-    except Exception as e:
-        logger.error(f"Error listing tables: {str(e)}")
-        context = {
-            'message': 'Enter your table name manually',
-            'error': str(e)
-        }
-        return render(request, 'tables_list.html', context)
-
-def get_table_data(request, table_name):
-    """Read data from any Supabase table (READ ONLY)"""
-    try:
-        supabase = get_supabase()
-        limit = int(request.GET.get('limit', 100))
-        offset = int(request.GET.get('offset', 0))
-        
-        response = supabase.table(table_name).select("*").limit(limit).offset(offset).execute()
-        
-        context = {
-            'table_name': table_name,
-            'data': response.data,
-            'count': len(response.data),
-        }
-        return render(request, 'table_data.html', context)
-    
-    except Exception as e:
-        logger.error(f"Error reading from {table_name}: {str(e)}")
-        return render(request, 'table_data.html', {
-            'error': str(e),
-            'table_name': table_name
-        })
-
-def get_table_data_json(request, table_name):
-    """API endpoint to get table data as JSON"""
-    try:
-        supabase = get_supabase()
-        limit = int(request.GET.get('limit', 100))
-        offset = int(request.GET.get('offset', 0))
-        
-        response = supabase.table(table_name).select("*").limit(limit).offset(offset).execute()
-        
-        return JsonResponse({
-            'table_name': table_name,
-            'data': response.data,
-            'count': len(response.data)
-        })
-    
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        return JsonResponse({'error': str(e)}, status=500)
-
-def search_table(request, table_name):
-    """Search/filter data in a table"""
-    try:
-        supabase = get_supabase()
-        column = request.GET.get('column')
-        value = request.GET.get('value')
-        
-        if column and value:
-            response = supabase.table(table_name).select("*").eq(column, value).execute()
-        else:
-            response = supabase.table(table_name).select("*").limit(100).execute()
-        
-        context = {
-            'table_name': table_name,
-            'data': response.data,
-            'count': len(response.data),
-            'search_column': column,
-            'search_value': value
-        }
-        return render(request, 'table_data.html', context)
-    
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        return render(request, 'table_data.html', {
-            'error': str(e),
-            'table_name': table_name
-        })
-
-# ============================================================
-# NEW ASSESSMENT PROCESSING VIEWS
-# ============================================================
-
-def process_pending_assessments(request):
-    """
-    Process all pending assessments from ki_check_submissions table
-    WHERE analysis_completed = false
-    """
-    try:
-        supabase = get_supabase()
-        
-        # Get pending assessments
-        response = supabase.table('ki_check_submissions').select('*').eq(
-            'analysis_completed', False
-        ).order('created_at', desc=False).limit(10).execute()
-        
-        if not response.data or len(response.data) == 0:
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Keine neuen Bewertungen zum Verarbeiten',
-                'processed': 0
-            })
-        
-        logger.info(f"Found {len(response.data)} pending assessments to process")
-        
-        results = []
-        for assessment in response.data:
-            try:
-                success = process_single_assessment(assessment['id'])
-                results.append({
-                    'id': assessment['id'],
-                    'company': assessment.get('company_name', 'N/A'),
-                    'email': assessment.get('email', 'N/A'),
-                    'status': 'success' if success else 'failed'
-                })
-            except Exception as e:
-                logger.error(f"Error processing {assessment['id']}: {str(e)}")
-                results.append({
-                    'id': assessment['id'],
-                    'company': assessment.get('company_name', 'N/A'),
-                    'status': 'error',
-                    'error': str(e)
-                })
-        
-        success_count = sum(1 for r in results if r['status'] == 'success')
-        
-        return JsonResponse({
-            'status': 'success',
-            'message': f'{success_count}/{len(results)} Bewertungen erfolgreich verarbeitet',
-            'processed': len(results),
-            'successful': success_count,
-            'results': results
-        })
-        
-    except Exception as e:
-        logger.error(f"Error in process_pending_assessments: {str(e)}")
-        return JsonResponse({
-            'status': 'error',
-            'message': str(e)
-        }, status=500)
-
-def process_latest_assessment(request):
-    """
-    Process the most recent assessment (useful for testing)
-    """
-    try:
-        supabase = get_supabase()
-        
-        # Get latest assessment
-        response = supabase.table('ki_check_submissions').select('*').order(
-            'created_at', desc=True
-        ).limit(1).execute()
-        
-        if not response.data or len(response.data) == 0:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Keine Bewertungen in der Datenbank gefunden'
-            }, status=404)
-        
-        assessment = response.data[0]
-        logger.info(f"Processing latest assessment: {assessment['id']}")
-        
-        success = process_single_assessment(assessment['id'])
-        
-        if success:
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Bewertung erfolgreich verarbeitet!',
-                'assessment_id': assessment['id'],
-                'company': assessment.get('company_name', 'N/A'),
-                'email': assessment.get('email', 'N/A'),
-                'score': assessment.get('calculated_score', 'N/A')
-            })
-        else:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Fehler bei der Verarbeitung der Bewertung'
-            }, status=500)
-            
-    except Exception as e:
-        logger.error(f"Error in process_latest_assessment: {str(e)}")
-        return JsonResponse({
-            'status': 'error',
-            'message': str(e)
-        }, status=500)
-
-def process_assessment_by_id(request, assessment_id):
-    """
-    Process a specific assessment by ID
-    """
-    try:
-        logger.info(f"Processing assessment by ID: {assessment_id}")
-        
-        success = process_single_assessment(assessment_id)
-        
-        if success:
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Bewertung erfolgreich verarbeitet',
-                'assessment_id': assessment_id
-            })
-        else:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Fehler bei der Verarbeitung'
-            }, status=500)
-            
-    except Exception as e:
-        logger.error(f"Error processing assessment {assessment_id}: {str(e)}")
-        return JsonResponse({
-            'status': 'error',
-            'message': str(e)
-        }, status=500)
-
-# ============================================================
-# MAIN PROCESSING LOGIC
-# ============================================================
-
-def process_single_assessment(assessment_id):
-    """
-    Main workflow to process a single assessment
-    
-    Steps:
-    1. Fetch data from Supabase
-    2. Generate ChatGPT analysis (via ai_service.py)
-    3. Generate PDF (via pdf_generator.py)
-    4. Send email
-    5. Update Supabase status
-    
-    Args:
-        assessment_id (str): UUID of the assessment
-        
-    Returns:
-        bool: True if successful, False otherwise
-    """
-    try:
-        logger.info(f"\n{'='*60}")
-        logger.info(f"🔄 Processing Assessment: {assessment_id}")
-        logger.info('='*60)
-        
-        supabase = get_supabase()
-        
-        # ===== STEP 1: FETCH DATA =====
-        response = supabase.table('ki_check_submissions').select('*').eq(
-            'id', assessment_id
-        ).single().execute()
-        
-        if not response.data:
-            logger.error(f"❌ Assessment {assessment_id} not found")
-            return False
-        
-        assessment = response.data
-        logger.info(f"✓ Fetched: {assessment.get('company_name', 'N/A')}")
-        logger.info(f"  Email: {assessment.get('email', 'N/A')}")
-        
-        # ===== STEP 2: CHATGPT ANALYSIS =====
-        if not assessment.get('analysis_completed', False):
-            logger.info("⏳ Step 1/3: Generating ChatGPT analysis...")
-            
-            # Use ai_service.py
-            ai_service = get_ai_service()
-            analysis = ai_service.analyze_assessment(assessment)
-            
-            # Update Supabase with analysis
-            supabase.table('ki_check_submissions').update({
-                'calculated_score': analysis['score'],
-                'score_level': analysis['score_level'],
-                'chatgpt_analysis': analysis,
-                'analysis_completed': True
-            }).eq('id', assessment_id).execute()
-            
-            # Refresh data
-            response = supabase.table('ki_check_submissions').select('*').eq(
-                'id', assessment_id
-            ).single().execute()
-            assessment = response.data
-            
-            logger.info(f"✅ Analysis complete - Score: {analysis['score']}/100 ({analysis['score_level']})")
-        else:
-            logger.info("✓ Analysis already completed, skipping...")
-        
-        # ===== STEP 3: GENERATE PDF =====
-        logger.info("⏳ Step 2/3: Generating professional PDF...")
-        
-        # Use pdf_generator.py
-        pdf_buffer = generate_assessment_pdf(assessment)
-        
-        # Update PDF status
-        supabase.table('ki_check_submissions').update({
-            'pdf_generated': True,
-            'report_data': {
-                'generated_at': datetime.now().isoformat(),
-                'score': assessment['calculated_score'],
-                'score_level': assessment['score_level'],
-                'pdf_size_kb': len(pdf_buffer) // 1024
-            }
-        }).eq('id', assessment_id).execute()
-        
-        logger.info(f"✅ PDF created ({len(pdf_buffer) // 1024}KB)")
-        
-        # ===== STEP 4: SEND EMAIL =====
-        logger.info("⏳ Step 3/3: Sending email with PDF...")
-        
-        send_assessment_email(assessment, pdf_buffer)
-        
-        # Update email status
-        supabase.table('ki_check_submissions').update({
-            'email_sent': True
-        }).eq('id', assessment_id).execute()
-        
-        logger.info(f"✅ Email sent to: {assessment['email']}")
-        
-        # ===== COMPLETE =====
-        logger.info('='*60)
-        logger.info("✅ SUCCESS! Assessment processing completed")
-        logger.info('='*60 + "\n")
-        
-        return True
-        
-    except Exception as e:
-        logger.error(f"\n❌ ERROR processing assessment {assessment_id}:")
-        logger.error(f"   {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
-        logger.error('='*60 + "\n")
-        return False
-
 """
 Assessment Processing Views
 Uses modular ai_service.py and pdf_generator.py
@@ -367,10 +9,8 @@ from django.http import JsonResponse
 from django.core.mail import EmailMessage
 from django.conf import settings
 from .supabase_client import get_supabase
-from .ai_service import get_ai_service
-from .pdf_generator import generate_assessment_pdf
+from .submissions import SUMMARY_COLUMNS
 import logging
-from datetime import datetime
 import traceback
 
 logger = logging.getLogger(__name__)
@@ -521,12 +161,21 @@ def process_pending_assessments(request):
     """
     Process all pending assessments from ki_check_submissions table
     WHERE analysis_completed = false
+    
+    ?mode=batch submits the backlog (up to ?limit rows) as one OpenAI Batch
+    job instead; the processor writes the results back when it completes
+    
+    The analyses of the claimed rows run concurrently (async service, see
+    pipeline.run_analysis_stage_many); PDF and email follow one at a time
     """
+    if request.GET.get('mode') == 'batch':
+        return submit_pending_batch(request)
+    
     try:
         supabase = get_supabase()
         
-        # Get pending assessments
-        response = supabase.table('ki_check_submissions').select('*').eq(
+        # Get pending assessments (listing columns only - the pipeline fetches the rest)
+        response = supabase.table('ki_check_submissions').select(SUMMARY_COLUMNS).eq(
             'analysis_completed', False
         ).order('created_at', desc=False).limit(10).execute()
         
@@ -539,10 +188,28 @@ def process_pending_assessments(request):
         
         logger.info(f"Found {len(response.data)} pending assessments to process")
         
+        from .pipeline import fetch_for_processing, run_analysis_stage_many
+        from .submissions import claim_one
+        
+        claimed = [a['id'] for a in response.data if claim_one(a['id'])]
+        try:
+            run_analysis_stage_many([fetch_for_processing(assessment_id) for assessment_id in claimed])
+        except Exception as e:
+            # process_single_assessment runs the missing analyses one by one
+            logger.error(f"Concurrent analysis failed: {str(e)}")
+        
         results = []
         for assessment in response.data:
+            if assessment['id'] not in claimed:
+                logger.info(f"⏭️  Assessment {assessment['id']} is being processed by another worker, skipping")
+                results.append({
+                    'id': assessment['id'],
+                    'company': assessment.get('company_name', 'N/A'),
+                    'status': 'skipped'
+                })
+                continue
             try:
-                success = process_single_assessment(assessment['id'])
+                success = process_single_assessment(assessment['id'], claimed=True)
                 results.append({
                     'id': assessment['id'],
                     'company': assessment.get('company_name', 'N/A'),
@@ -575,6 +242,51 @@ def process_pending_assessments(request):
             'message': str(e)
         }, status=500)
 
+def submit_pending_batch(request):
+    """
+    Backlog mode: analyse pending assessments through the OpenAI Batch API
+    """
+    try:
+        from .batch_analysis import submit_backlog_batch
+        from .job_queue import is_shared_database
+        from .tasks import is_processor_running
+        
+        try:
+            limit = int(request.GET.get('limit', 0)) or None
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Ungültiges Limit'}, status=400)
+        
+        # The batch record must be visible to a processor that collects it:
+        # this process's own, or any other one through a shared database
+        if not is_processor_running() and not is_shared_database():
+            logger.error("❌ Batch mode without a processor here needs DATABASE_URL")
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Batch-Modus benötigt DATABASE_URL oder einen Prozessor in diesem Prozess'
+            }, status=503)
+        
+        batch = submit_backlog_batch(limit)
+        if batch is None:
+            return JsonResponse({
+                'status': 'success',
+                'message': 'Keine neuen Bewertungen zum Analysieren',
+                'submitted': 0
+            })
+        
+        return JsonResponse({
+            'status': 'accepted',
+            'message': f'{batch.request_count} Bewertungen als Batch eingereicht',
+            'batch_id': batch.batch_id,
+            'submitted': batch.request_count
+        }, status=202)
+        
+    except Exception as e:
+        logger.error(f"Error in submit_pending_batch: {str(e)}")
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
 def process_latest_assessment(request):
     """
     Process the most recent assessment (useful for testing)
@@ -583,7 +295,7 @@ def process_latest_assessment(request):
         supabase = get_supabase()
         
         # Get latest assessment
-        response = supabase.table('ki_check_submissions').select('*').order(
+        response = supabase.table('ki_check_submissions').select(SUMMARY_COLUMNS).order(
             'created_at', desc=True
         ).limit(1).execute()
         
@@ -652,27 +364,41 @@ def process_assessment_by_id(request, assessment_id):
 # MAIN PROCESSING LOGIC - UPDATED WITH BETTER ERROR HANDLING
 # ============================================================
 
-def process_single_assessment(assessment_id):
+def process_single_assessment(assessment_id, claimed=False):
     """
     FIXED VERSION: Removes references to non-existent columns
+    
+    Runs the pipeline stages (see pipeline.py) one after another for a single
+    assessment. The background processor uses AssessmentPipeline instead, so
+    the stages overlap across assessments.
+    
+    The assessment is leased to this worker while it is processed, so other
+    gunicorn workers / nodes skip it. Pass claimed=True if the caller already
+    holds the lease (e.g. rows returned by claim_batch).
     """
+    from .pipeline import fetch_for_processing, keep_lease, run_analysis_stage, run_pdf_stage, run_email_stage
+    from .pdf_artifacts import discard
+    from .submissions import claim_one, release
+    
+    if not claimed and not claim_one(assessment_id):
+        logger.info(f"⏭️  Assessment {assessment_id} is being processed by another worker, skipping")
+        return False
+    
+    assessment = None
+    pdf_buffer = None
+    
     try:
         logger.info(f"\n{'='*60}")
         logger.info(f"🔄 Processing Assessment: {assessment_id}")
         logger.info('='*60)
         
-        supabase = get_supabase()
+        # ===== STEP 1: FETCH DATA (only the columns the remaining stages need) =====
+        assessment = fetch_for_processing(assessment_id)
         
-        # ===== STEP 1: FETCH DATA =====
-        response = supabase.table('ki_check_submissions').select('*').eq(
-            'id', assessment_id
-        ).single().execute()
-        
-        if not response.data:
+        if not assessment:
             logger.error(f"❌ Assessment {assessment_id} not found")
             return False
         
-        assessment = response.data
         logger.info(f"✓ Fetched: {assessment.get('company_name', 'N/A')}")
         logger.info(f"  Email: {assessment.get('email', 'N/A')}")
         
@@ -682,92 +408,17 @@ def process_single_assessment(assessment_id):
             return True
         
         # ===== STEP 2: CHATGPT ANALYSIS =====
-        if not assessment.get('analysis_completed', False):
-            logger.info("⏳ Step 1/3: Generating ChatGPT analysis...")
-            
-            try:
-                from .ai_service import get_ai_service
-                
-                ai_service = get_ai_service()
-                analysis = ai_service.analyze_assessment(assessment)
-                
-                # FIXED: Only update columns that exist
-                supabase.table('ki_check_submissions').update({
-                    'calculated_score': analysis['score'],
-                    'score_level': analysis['score_level'],
-                    'chatgpt_analysis': analysis,
-                    'analysis_completed': True
-                }).eq('id', assessment_id).execute()
-                
-                # Refresh data
-                response = supabase.table('ki_check_submissions').select('*').eq(
-                    'id', assessment_id
-                ).single().execute()
-                assessment = response.data
-                
-                logger.info(f"✅ Analysis complete - Score: {analysis['score']}/100 ({analysis['score_level']})")
-                
-            except Exception as e:
-                logger.error(f"❌ ChatGPT analysis failed: {str(e)}")
-                import traceback
-                logger.error(traceback.format_exc())
-                raise
-        else:
-            logger.info("✓ Analysis already completed, skipping...")
+        assessment = run_analysis_stage(assessment)
         
         # ===== STEP 3: GENERATE PDF =====
-        logger.info("⏳ Step 2/3: Generating professional PDF...")
-        
-        try:
-            from .pdf_generator import generate_assessment_pdf
-            
-            pdf_buffer = generate_assessment_pdf(assessment)
-            
-            # FIXED: Only update columns that exist
-            supabase.table('ki_check_submissions').update({
-                'pdf_generated': True
-            }).eq('id', assessment_id).execute()
-            
-            logger.info(f"✅ PDF created ({len(pdf_buffer) // 1024}KB)")
-            
-        except Exception as e:
-            logger.error(f"❌ PDF generation failed: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            raise
+        if not keep_lease(assessment_id):
+            return False
+        pdf_buffer = run_pdf_stage(assessment)
         
         # ===== STEP 4: SEND EMAIL =====
-        logger.info("⏳ Step 3/3: Sending email with PDF...")
-        
-        try:
-            from .views import send_assessment_email
-            
-            email_sent = send_assessment_email(assessment, pdf_buffer)
-            
-            if email_sent:
-                # FIXED: Only update email_sent (which exists)
-                supabase.table('ki_check_submissions').update({
-                    'email_sent': True
-                }).eq('id', assessment_id).execute()
-                
-                logger.info(f"✅ Email sent successfully to {assessment.get('email')}")
-            else:
-                logger.error(f"❌ Failed to send email")
-                # Mark as not sent so it can be retried
-                supabase.table('ki_check_submissions').update({
-                    'email_sent': False
-                }).eq('id', assessment_id).execute()
-                
-        except Exception as e:
-            logger.error(f"❌ Email sending exception: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            
-            # Mark as failed
-            supabase.table('ki_check_submissions').update({
-                'email_sent': False
-            }).eq('id', assessment_id).execute()
-            
+        if not keep_lease(assessment_id):
+            return False
+        if not run_email_stage(assessment, pdf_buffer):
             # Don't fail entire process for email errors
             logger.warning("⚠️  Continuing despite email error")
         
@@ -785,35 +436,33 @@ def process_single_assessment(assessment_id):
         logger.error(traceback.format_exc())
         logger.error('='*60 + "\n")
         return False
+    
+    finally:
+        discard(pdf_buffer)
+        # The final status update already cleared the lease on success
+        if assessment is None or assessment.get('claimed_by'):
+            release(assessment_id)
 
 
 # ============================================================
 # EMAIL SENDING FUNCTION - COMPLETELY REWRITTEN
 # ============================================================
 
-def send_assessment_email(assessment, pdf_buffer):
+def build_assessment_email(assessment, pdf_buffer):
     """
-    Send email with PDF attachment
-    Returns True if successful, False otherwise
+    The report email with the PDF attached
+    `pdf_buffer` is a spooled PDFArtifact (encoded from disk) or the PDF bytes
     """
-    try:
-        from django.core.mail import EmailMessage
-        from django.conf import settings
-        
-        score = assessment.get('calculated_score', 0)
-        score_level = assessment.get('score_level', 'N/A')
-        company_name = assessment.get('company_name', 'Ihr Unternehmen')
-        recipient_email = assessment.get('email', '')
-        
-        if not recipient_email:
-            logger.error("❌ No recipient email found")
-            return False
-        
-        logger.info(f"   📧 Sending to: {recipient_email}")
-        
-        subject = f"Ihre KI-Readiness-Bewertung - Score: {score}/100 - {company_name}"
-        
-        body = f"""
+    from .pdf_artifacts import PDFArtifact
+    
+    score = assessment.get('calculated_score', 0)
+    score_level = assessment.get('score_level', 'N/A')
+    company_name = assessment.get('company_name', 'Ihr Unternehmen')
+    recipient_email = assessment.get('email', '')
+    
+    subject = f"Ihre KI-Readiness-Bewertung - Score: {score}/100 - {company_name}"
+    
+    body = f"""
 Sehr geehrte Damen und Herren,
 
 vielen Dank für Ihre Teilnahme an der KI-Readiness-Bewertung.
@@ -827,18 +476,39 @@ Das beigefügte PDF enthält Ihre detaillierte Analyse und Handlungsempfehlungen
 
 Mit freundlichen Grüßen
 Ihr KI-Readiness Team
-        """
+    """
+    
+    email = EmailMessage(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient_email]
+    )
+    
+    filename = f"KI_Readiness_{company_name.replace(' ', '_')}.pdf"
+    if isinstance(pdf_buffer, PDFArtifact):
+        email.attach(pdf_buffer.mime_attachment(filename))
+    else:
+        email.attach(filename, pdf_buffer, 'application/pdf')
+    
+    return email
+
+
+def send_assessment_email(assessment, pdf_buffer):
+    """
+    Send email with PDF attachment
+    Returns True if successful, False otherwise
+    """
+    try:
+        recipient_email = assessment.get('email', '')
         
-        email = EmailMessage(
-            subject=subject,
-            body=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[recipient_email]
-        )
+        if not recipient_email:
+            logger.error("❌ No recipient email found")
+            return False
         
-        filename = f"KI_Readiness_{company_name.replace(' ', '_')}.pdf"
-        email.attach(filename, pdf_buffer, 'application/pdf')
+        logger.info(f"   📧 Sending to: {recipient_email}")
         
+        email = build_assessment_email(assessment, pdf_buffer)
         result = email.send(fail_silently=False)
         
         if result == 1:
@@ -862,21 +532,24 @@ Ihr KI-Readiness Team
 
 
 
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
+import uuid
 
 @csrf_exempt  # Required for external webhooks
 @require_http_methods(["POST"])
 def webhook_new_assessment(request):
     """
-    Webhook endpoint that processes assessment immediately on form submission
+    Webhook endpoint called on form submission
     
-    INSTANT WORKFLOW:
+    NON-BLOCKING WORKFLOW:
     1. User submits form
     2. Your website calls this webhook
-    3. Assessment processed immediately
-    4. Email sent within 5-10 seconds
+    3. The assessment is queued and 202 Accepted is returned immediately
+    4. The background processor runs analysis, PDF and email
+    5. Poll the returned status_url to follow progress
     
     Usage from your website:
     POST http://your-django-server.com/webhook/new-assessment/
@@ -884,8 +557,15 @@ def webhook_new_assessment(request):
     """
     try:
         # Parse request
-        data = json.loads(request.body)
-        assessment_id = data.get('assessment_id')
+        try:
+            data = json.loads(request.body)
+        except (ValueError, TypeError):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid JSON body'
+            }, status=400)
+        
+        assessment_id = data.get('assessment_id') if isinstance(data, dict) else None
         
         if not assessment_id:
             return JsonResponse({
@@ -893,22 +573,57 @@ def webhook_new_assessment(request):
                 'message': 'assessment_id required'
             }, status=400)
         
+        try:
+            assessment_id = str(uuid.UUID(str(assessment_id)))
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'assessment_id must be a valid UUID'
+            }, status=400)
+        
         logger.info(f"🔔 WEBHOOK TRIGGERED: New assessment {assessment_id}")
         
-        # Process immediately
-        success = process_single_assessment(assessment_id)
+        from .submissions import TABLE, STATUS_COLUMNS
         
-        if success:
+        response = get_supabase().table(TABLE).select(STATUS_COLUMNS).eq(
+            'id', assessment_id
+        ).limit(1).execute()
+        
+        if not response.data:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Assessment not found'
+            }, status=404)
+        
+        if response.data[0].get('email_sent'):
             return JsonResponse({
                 'status': 'success',
-                'message': 'Assessment processed and email sent',
-                'assessment_id': assessment_id
+                'message': 'Assessment already processed',
+                'job_id': assessment_id,
+                'status_url': reverse('assessment_status', args=[assessment_id])
             })
-        else:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Processing failed'
-            }, status=500)
+        
+        # Record the job durably, then wake the background processor;
+        # it claims the row and runs the pipeline
+        from .job_queue import enqueue
+        from .tasks import wake_assessment_processor
+        enqueue(assessment_id)
+        
+        if not wake_assessment_processor() and not getattr(settings, 'SUPABASE_DB_URL', None):
+            # Without a local processor or a NOTIFY listener nothing reacts to
+            # this request; the row waits for the next poll of a separate worker
+            logger.warning(
+                f"⚠️  No processor running here and SUPABASE_DB_URL not set - "
+                f"{assessment_id[:8]} waits for the next worker poll"
+            )
+        
+        # The assessment id doubles as the job handle
+        return JsonResponse({
+            'status': 'accepted',
+            'message': 'Assessment queued for processing',
+            'job_id': assessment_id,
+            'status_url': reverse('assessment_status', args=[assessment_id])
+        }, status=202)
             
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}")
@@ -916,3 +631,61 @@ def webhook_new_assessment(request):
             'status': 'error',
             'message': str(e)
         }, status=500)
+
+
+@require_http_methods(["GET"])
+def assessment_status(request, assessment_id):
+    """
+    Job status for an assessment queued via the webhook
+    Derived from the stage checkpoints and the processing lease
+    """
+    try:
+        from .submissions import TABLE, RETRY_HOLDER, DEAD_LETTER_HOLDER
+        
+        response = get_supabase().table(TABLE).select(
+            'id, analysis_completed, pdf_generated, email_sent, claimed_by, lease_expires_at'
+        ).eq('id', assessment_id).limit(1).execute()
+        
+        if not response.data:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Assessment not found'
+            }, status=404)
+        
+        row = response.data[0]
+        
+        if row.get('email_sent'):
+            state = 'completed'
+        elif row.get('claimed_by') == DEAD_LETTER_HOLDER:
+            state = 'failed'
+        elif row.get('claimed_by') == RETRY_HOLDER:
+            state = 'retrying'
+        elif row.get('claimed_by'):
+            state = 'processing'
+        else:
+            state = 'queued'
+        
+        result = {
+            'status': 'success',
+            'job_id': assessment_id,
+            'state': state,
+            'analysis_completed': bool(row.get('analysis_completed')),
+            'pdf_generated': bool(row.get('pdf_generated')),
+            'email_sent': bool(row.get('email_sent'))
+        }
+        
+        # Sections of a streamed analysis already received (if it runs in this process)
+        if state == 'processing' and not row.get('analysis_completed'):
+            from .pipeline import get_section_progress
+            sections = get_section_progress(assessment_id)
+            if sections is not None:
+                result['analysis_sections'] = sections
+        
+        return JsonResponse(result)
+        
+    except Exception as e:
+        logger.error(f"Error reading status for {assessment_id}: {str(e)}")
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)